@@ -0,0 +1,206 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from board import WHITE, STARTING_FEN, Board
+from chess_game import AI_SEARCH_DEPTH, ENGINES
+from notation import move_to_san, parse_epd, parse_move, read_pgn, write_epd, write_pgn
+from search import MATE_BOUND, MATE_SCORE, Search
+
+TASKS_PER_WORKER = 2  # Tasks queued per worker process; bounds the results held in memory
+
+# Per-process state of the analysis workers: the board implementation and a search reused between tasks
+_worker_board_class = None
+_worker_search = None
+
+
+def _init_worker(engine: str):
+    """Create the worker's long-lived search, as ChessGame keeps one between AI moves."""
+    global _worker_board_class, _worker_search
+    _worker_board_class = ENGINES[engine]
+    _worker_search = Search()
+
+
+def format_score(score: float) -> str:
+    """Format a White-perspective score in pawns (e.g. '+0.35'), or as a mate distance in moves ('#3', '#-2')."""
+    if abs(score) > MATE_BOUND:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"#{int(moves)}" if score > 0 else f"#-{int(moves)}"
+    return f"{score / 100:+.2f}"
+
+
+def _evaluate(board: Board, depth: int, time_limit: Optional[float], node_limit: Optional[int]):
+    """Search a position with the worker's search; returns (score, SAN principal variation, nodes)."""
+    search = _worker_search
+    score, move = search.search(board, depth, time_limit, node_limit)
+    pv = []
+    for pv_move in search.pv or ([move] if move is not None else []):
+        pv.append(move_to_san(board, pv_move))
+        board.make_move(pv_move)
+    for _ in pv:
+        board.unmake_move()
+    return score, pv, search.nodes
+
+
+def analyse_epd(line: str, depth: int, time_limit: Optional[float], node_limit: Optional[int]) -> Tuple[str, dict]:
+    """Worker task: analyse one EPD record and return it annotated with the search result.
+
+    The acd (depth), acn (nodes), acs (seconds), ce (centipawns for the side to move) and pv operations
+    are added, plus dm (mate in moves) for a forced mate; the summary says whether the search found the
+    record's bm (best move) or avoided its am (avoid move). A record that cannot be read is returned
+    unchanged.
+    """
+    start = time.perf_counter()
+    summary = {'positions': 1, 'nodes': 0, 'solved': None, 'error': None}
+    try:
+        fen, operations = parse_epd(line)
+        board = _worker_board_class.from_fen(fen)
+    except ValueError as error:
+        summary['error'] = str(error)
+        return line, summary
+    score, pv, nodes = _evaluate(board, depth, time_limit, node_limit)
+    relative = score if board.side == WHITE else -score
+    annotated = dict(operations)
+    annotated.update(acd=str(_worker_search.depth_reached), acn=str(nodes),
+                     acs=str(round(time.perf_counter() - start)), ce=str(int(relative)), pv=' '.join(pv))
+    if relative > MATE_BOUND:
+        annotated['dm'] = str(int(MATE_SCORE - relative + 1) // 2)
+    summary['nodes'] = nodes
+    played = pv[0].rstrip('+#') if pv else None
+    if 'bm' in operations:
+        summary['solved'] = played in [move.rstrip('+#!?') for move in operations['bm'].split()]
+    elif 'am' in operations:
+        summary['solved'] = played not in [move.rstrip('+#!?') for move in operations['am'].split()]
+    return write_epd(fen, annotated), summary
+
+
+def analyse_game(tags: dict, moves: List[str], depth: int, time_limit: Optional[float],
+                 node_limit: Optional[int]) -> Tuple[str, dict]:
+    """Worker task: analyse every position of a PGN game and return the game with evaluation comments.
+
+    After each move a comment gives the evaluation of the position it reached (White's point of view)
+    and the search depth, plus the move the search preferred when it differs from the one played, e.g.
+    {+0.35/3 best Nf3}. Moves may be in SAN or coordinate notation; they are written in SAN. Analysis
+    stops at the first illegal move, which is noted in a comment.
+    """
+    summary = {'positions': 0, 'nodes': 0, 'solved': None, 'error': None}
+    fen = tags.get('FEN', STARTING_FEN)
+    try:
+        board = _worker_board_class.from_fen(fen)
+    except ValueError as error:
+        summary['error'] = str(error)
+        return write_pgn(tags, []), summary
+    played, comments = [], []
+    score, pv, nodes = _evaluate(board, depth, time_limit, node_limit)
+    summary['positions'] += 1
+    summary['nodes'] += nodes
+    for san in moves:
+        try:
+            move = parse_move(board, san)
+        except ValueError as error:
+            summary['error'] = str(error)
+            if comments:
+                comments[-1] = f"{comments[-1]}; {error}"
+            break
+        played.append(move_to_san(board, move))
+        best = pv[0] if pv else None
+        board.make_move(move)
+        score, pv, nodes = _evaluate(board, depth, time_limit, node_limit)
+        summary['positions'] += 1
+        summary['nodes'] += nodes
+        comment = f"{format_score(score)}/{_worker_search.depth_reached}"
+        if best is not None and best != played[-1]:
+            comment += f" best {best}"
+        comments.append(comment)
+    return write_pgn(tags, played, comments), summary
+
+
+def read_tasks(lines: Iterable[str], kind: str) -> Iterator[Tuple]:
+    """Yield the task arguments of an input file one record at a time: (EPD line,) or (tags, moves)."""
+    if kind == 'pgn':
+        yield from read_pgn(lines)
+        return
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            yield (stripped,)
+
+
+def analyse_stream(lines: Iterable[str], kind: str, out, engine: str = 'mailbox', workers: Optional[int] = None,
+                   depth: int = AI_SEARCH_DEPTH, time_limit: Optional[float] = None,
+                   node_limit: Optional[int] = None) -> dict:
+    """Analyse the records of a PGN or EPD stream over a pool of worker processes, in input order.
+
+    Records are read lazily and at most TASKS_PER_WORKER tasks per worker are in flight; each result is
+    written and flushed as soon as it and every record before it are done. Memory use therefore
+    depends on the worker count, not on the size of the input.
+    Returns totals over the stream.
+    """
+    task = analyse_epd if kind == 'epd' else analyse_game
+    workers = workers or os.cpu_count() or 1
+    totals = {'records': 0, 'positions': 0, 'nodes': 0, 'solved': 0, 'tested': 0, 'errors': 0}
+    pending = deque()
+
+    def write_oldest():
+        text, summary = pending.popleft().result()
+        out.write(text if kind == 'pgn' else text + '\n')
+        out.flush()
+        totals['records'] += 1
+        totals['positions'] += summary['positions']
+        totals['nodes'] += summary['nodes']
+        if summary['solved'] is not None:
+            totals['tested'] += 1
+            totals['solved'] += summary['solved']
+        if summary['error']:
+            totals['errors'] += 1
+            print(f"record {totals['records']}: {summary['error']}", file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine,)) as executor:
+        for record in read_tasks(lines, kind):
+            if len(pending) >= workers * TASKS_PER_WORKER:
+                write_oldest()
+            pending.append(executor.submit(task, *record, depth, time_limit, node_limit))
+        while pending:
+            write_oldest()
+    return totals
+
+
+def main():
+    """Command-line entry point: annotate every position of a PGN or EPD file with the AI's evaluation."""
+    parser = argparse.ArgumentParser(description="Analyse the positions of a PGN or EPD file in parallel.")
+    parser.add_argument('input', help="PGN or EPD file ('-' reads standard input)")
+    parser.add_argument('-o', '--output', help="annotated output file (default: standard output)")
+    parser.add_argument('--format', choices=('pgn', 'epd'), help="input format (default: from the file extension)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='mailbox', help="board implementation")
+    parser.add_argument('--depth', type=int, default=AI_SEARCH_DEPTH, help="search depth per position")
+    parser.add_argument('--time', type=float, help="seconds per position")
+    parser.add_argument('--nodes', type=int, help="node budget per position")
+    args = parser.parse_args()
+
+    kind = args.format or ('epd' if args.input.lower().endswith('.epd') else 'pgn')
+    source = sys.stdin if args.input == '-' else open(args.input, errors='replace')
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        start = time.perf_counter()
+        totals = analyse_stream(source, kind, out, args.engine, args.workers, args.depth, args.time, args.nodes)
+    finally:
+        for stream in (source, out):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+    elapsed = time.perf_counter() - start
+    report = (f"{totals['records']} records, {totals['positions']} positions, {totals['nodes']} nodes "
+              f"in {elapsed:.1f}s")
+    if totals['tested']:
+        report += f"; solved {totals['solved']}/{totals['tested']}"
+    if totals['errors']:
+        report += f"; {totals['errors']} with errors"
+    print(report, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+from board import BLACK, WHITE, STARTING_FEN, move_name
+from book import OpeningBook
+from chess_game import AI_SEARCH_DEPTH, ENGINES
+from notation import move_to_san, parse_coordinate, write_pgn
+from search import Search
+
+DEFAULT_MAX_PLIES = 400  # Games still running after this many plies are adjudicated as draws
+RESULT_POINTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+
+def random_opening(board, plies: int, rng: random.Random) -> List[int]:
+    """Play up to the given number of random legal moves on the board and return them."""
+    moves = []
+    for _ in range(plies):
+        legal = board.legal_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board.make_move(move)
+        moves.append(move)
+    # Do not hand the engines a finished game
+    while moves and not board.legal_moves():
+        board.unmake_move()
+        moves.pop()
+    return moves
+
+
+def play_game(game_id: int, seed: int, engine: str, players: dict, opening_plies: int, max_plies: int,
+              fen: str = STARTING_FEN, book_path: Optional[str] = None, tablebase: Optional[str] = None) -> dict:
+    """Worker task: play one engine-vs-engine game without any console output and return its record.
+
+    players maps 'white' and 'black' to search settings (depth, time_limit, node_limit); each side keeps
+    its own search, and so its own transposition table, for the whole game. With book_path both sides
+    play book moves while the game is in the opening book, and with tablebase both searches play
+    endings covered by the tables in that directory perfectly. move_times and move_nodes hold the time and
+    nodes of each searched move in order; book moves are left out of them and listed in book_plies (indices
+    into moves) instead.
+    """
+    board = ENGINES[engine].from_fen(fen)
+    rng = random.Random(seed)
+    opening = random_opening(board, opening_plies, rng)
+    searches = {WHITE: Search(tablebase=tablebase), BLACK: Search(tablebase=tablebase)}
+    settings = {WHITE: players['white'], BLACK: players['black']}
+    nodes = {WHITE: 0, BLACK: 0}
+    moves, move_times, move_nodes, book_plies = [], [], [], []
+    book = OpeningBook(book_path) if book_path else None
+    result, termination = '1/2-1/2', 'max plies'
+    start = time.perf_counter()
+    while len(opening) + len(moves) < max_plies:
+        if not board.legal_moves():
+            if board.in_check(board.side):
+                result, termination = ('0-1' if board.side == WHITE else '1-0'), 'checkmate'
+            else:
+                termination = 'stalemate'
+            break
+        reason = board.draw_reason()
+        if reason:
+            termination = reason
+            break
+        side = board.side
+        move = book.choose(board, rng) if book is not None else None
+        if move is not None:
+            book_plies.append(len(moves))
+        else:
+            options = settings[side]
+            search = searches[side]
+            move_start = time.perf_counter()
+            _, move = search.search(board, options['depth'], options.get('time_limit'), options.get('node_limit'))
+            move_times.append(round(time.perf_counter() - move_start, 4))
+            move_nodes.append(search.nodes)
+            nodes[side] += search.nodes
+        board.make_move(move)
+        moves.append(move)
+    if book is not None:
+        book.close()
+    for search in searches.values():
+        search.close()
+    return {
+        'game': game_id,
+        'seed': seed,
+        'engine': engine,
+        'fen': fen,
+        'white': players['white'],
+        'black': players['black'],
+        'result': result,
+        'termination': termination,
+        'opening': [move_name(move) for move in opening],
+        'moves': [move_name(move) for move in moves],
+        'plies': len(opening) + len(moves),
+        'book_moves': len(book_plies),
+        'book_plies': book_plies,
+        'nodes': {'white': nodes[WHITE], 'black': nodes[BLACK]},
+        'move_times': move_times,
+        'move_nodes': move_nodes,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def pgn_text(record: dict) -> str:
+    """Format a game record as a PGN game with its moves in standard algebraic notation."""
+    tags = {'Event': 'Batch', 'Site': 'headless', 'Round': str(record['game'] + 1),
+            'White': player_label(record['white']), 'Black': player_label(record['black']),
+            'Result': record['result'], 'Termination': record['termination']}
+    if record['fen'] != STARTING_FEN:
+        tags.update(SetUp='1', FEN=record['fen'])
+    board = ENGINES[record['engine']].from_fen(record['fen'])
+    moves = []
+    for name in record['opening'] + record['moves']:
+        move = parse_coordinate(board, name)
+        moves.append(move_to_san(board, move))
+        board.make_move(move)
+    return write_pgn(tags, moves)
+
+
+def player_label(options: dict) -> str:
+    """Describe a player's search settings, e.g. 'depth 3, 0.5s'."""
+    label = f"depth {options['depth']}"
+    if options.get('time_limit') is not None:
+        label += f", {options['time_limit']}s"
+    if options.get('node_limit') is not None:
+        label += f", {options['node_limit']} nodes"
+    return label
+
+
+def run_batch(games: int, workers: Optional[int], engine: str, players: dict, opening_plies: int,
+              max_plies: int, seed: int, jsonl=None, pgn=None, fen: str = STARTING_FEN,
+              book_path: Optional[str] = None, tablebase: Optional[str] = None) -> dict:
+    """Play the games over a pool of worker processes, writing each record as soon as its game ends.
+
+    Returns the tally of results from White's point of view.
+    """
+    tally = {'1-0': 0, '0-1': 0, '1/2-1/2': 0}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(play_game, game_id, seed + game_id, engine, players, opening_plies, max_plies,
+                                   fen, book_path, tablebase) for game_id in range(games)]
+        for future in as_completed(futures):
+            record = future.result()
+            tally[record['result']] += 1
+            if jsonl is not None:
+                jsonl.write(json.dumps(record) + '\n')
+                jsonl.flush()
+            if pgn is not None:
+                pgn.write(pgn_text(record))
+                pgn.flush()
+            print(f"game {record['game'] + 1:>5}: {record['result']:<7} {record['termination']:<10} "
+                  f"{record['plies']:>4} plies {record['seconds']:>8.2f}s", file=sys.stderr)
+    return tally
+
+
+def main():
+    """Command-line entry point: play a batch of AI-vs-AI games headless."""
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games in parallel without the console board.")
+    parser.add_argument('--games', type=int, default=10, help="number of games to play")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='mailbox', help="board implementation")
+    parser.add_argument('--depth', type=int, default=AI_SEARCH_DEPTH, help="search depth for both sides")
+    parser.add_argument('--time', type=float, help="seconds per move for both sides")
+    parser.add_argument('--nodes', type=int, help="node budget per move for both sides")
+    parser.add_argument('--white-depth', type=int, help="search depth for White (overrides --depth)")
+    parser.add_argument('--black-depth', type=int, help="search depth for Black (overrides --depth)")
+    parser.add_argument('--white-time', type=float, help="seconds per move for White (overrides --time)")
+    parser.add_argument('--black-time', type=float, help="seconds per move for Black (overrides --time)")
+    parser.add_argument('--opening-plies', type=int, default=4, help="random legal moves played before the engines")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES, help="adjudicate a draw after this many plies")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game's opening")
+    parser.add_argument('--fen', default=STARTING_FEN, help="start position of every game")
+    parser.add_argument('--book', help="opening book file both sides play from while in book")
+    parser.add_argument('--tablebase', help="directory of endgame tables both sides play from (see tablebase.py)")
+    parser.add_argument('--jsonl', help="append one JSON record per finished game to this file")
+    parser.add_argument('--pgn', help="append every finished game to this PGN file")
+    args = parser.parse_args()
+
+    players = {}
+    for color in ('white', 'black'):
+        depth = getattr(args, f"{color}_depth")
+        time_limit = getattr(args, f"{color}_time")
+        players[color] = {'depth': depth if depth is not None else args.depth,
+                          'time_limit': time_limit if time_limit is not None else args.time,
+                          'node_limit': args.nodes}
+
+    jsonl = open(args.jsonl, 'a') if args.jsonl else None
+    pgn = open(args.pgn, 'a') if args.pgn else None
+    try:
+        start = time.perf_counter()
+        tally = run_batch(args.games, args.workers, args.engine, players, args.opening_plies, args.max_plies,
+                          args.seed, jsonl, pgn, args.fen, args.book, args.tablebase)
+    finally:
+        for sink in (jsonl, pgn):
+            if sink is not None:
+                sink.close()
+    score = sum(RESULT_POINTS[result] * count for result, count in tally.items())
+    print(f"{args.games} games in {time.perf_counter() - start:.1f}s: +{tally['1-0']} -{tally['0-1']} "
+          f"={tally['1/2-1/2']} (White scores {score}/{args.games})")
+
+
+if __name__ == "__main__":
+    main()
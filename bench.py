@@ -0,0 +1,237 @@
+import argparse
+import time
+import timeit
+from typing import List
+
+from board import PIECE_VALUES, BOARD_SIZE, move_name
+from chess_game import ChessGame
+from profiler import PROFILE_CATEGORIES, Profiler
+from search import MAX_PLY, Search
+
+# Benchmark positions, reached from the initial position by coordinate moves
+BENCH_POSITIONS = {
+    'opening': ['e2e4', 'e7e5', 'g1f3', 'b8c6'],
+    'italian': ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1c4', 'f8c5', 'c2c3', 'g8f6', 'd2d4', 'e5d4'],
+    'middlegame': ['d2d4', 'd7d5', 'c2c4', 'e7e6', 'b1c3', 'g8f6', 'c1g5', 'f8e7', 'e2e3', 'b8d7',
+                   'g1f3', 'c7c6', 'f1d3', 'd5c4', 'd3c4', 'b7b5', 'c4d3', 'a7a6'],
+    'open_center': ['e2e4', 'd7d5', 'e4d5', 'd8d5', 'b1c3', 'd5a5', 'd2d4', 'g8f6', 'g1f3', 'c8f5',
+                    'f1c4', 'e7e6', 'c1d2', 'c7c6'],
+}
+
+
+def game_from_moves(moves: List[str], engine: str = 'mailbox') -> ChessGame:
+    """Create a game and play the given coordinate moves on it."""
+    game = ChessGame(engine=engine)
+    for text in moves:
+        from_pos, to_pos = game.parse_move(text)
+        if to_pos not in game.calculate_valid_moves(from_pos):
+            raise ValueError(f"Illegal benchmark move {text}")
+        game.make_move(from_pos, to_pos)
+    return game
+
+
+def bench_transposition_table(depth: int, engine: str):
+    """Compare nodes and time to a fixed depth with and without the transposition table."""
+    print(f"Transposition table (depth {depth}, {engine} board)")
+    print(f"  {'position':<12} {'nodes (no TT)':>14} {'nodes (TT)':>11} {'reduction':>10} {'hit rate':>9} "
+          f"{'time (no TT)':>13} {'time (TT)':>10}")
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        results = []
+        for use_tt in (False, True):
+            search = Search(use_tt=use_tt)
+            start = time.perf_counter()
+            search.search(game.position, depth)
+            results.append((search.nodes, time.perf_counter() - start, search.tt.hit_rate() if use_tt else 0.0))
+        (plain_nodes, plain_time, _), (tt_nodes, tt_time, hit_rate) = results
+        reduction = 1 - tt_nodes / plain_nodes
+        print(f"  {name:<12} {plain_nodes:>14} {tt_nodes:>11} {reduction:>10.1%} {hit_rate:>9.1%} "
+              f"{plain_time:>12.2f}s {tt_time:>9.2f}s")
+
+
+def bench_persistent_table(depth: int, engine: str, plies: int = 8):
+    """Play AI moves for both sides, keeping the table between turns versus starting fresh every turn."""
+    print(f"Table reuse across turns ({plies} plies at depth {depth}, {engine} board)")
+    for label, persistent in (('fresh table per turn', False), ('persistent table', True)):
+        game = game_from_moves(BENCH_POSITIONS['opening'], engine)
+        search = Search()
+        nodes = 0
+        start = time.perf_counter()
+        for _ in range(plies):
+            if not persistent:
+                search.tt.clear()
+            _, move = search.search(game.position, depth)
+            if move is None:
+                break
+            nodes += search.nodes
+            game.position.make_move(move)
+        print(f"  {label:<22} {nodes:>9} nodes {time.perf_counter() - start:>8.2f}s "
+              f"hit rate {search.tt.hit_rate():.1%}")
+
+
+def bench_move_ordering(depth: int, engine: str):
+    """Compare nodes to a fixed depth with plain, ordered and SEE-ordered move lists."""
+    configs = (('unordered', False, False), ('ordered', True, False), ('ordered+SEE', True, True))
+    print(f"Move ordering (depth {depth}, {engine} board; EBF = effective branching factor)")
+    print(f"  {'position':<12}" + ''.join(f" {label:>20}" for label, _, _ in configs))
+    totals = [0] * len(configs)
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        cells = []
+        for i, (_, use_ordering, use_see) in enumerate(configs):
+            search = Search(use_ordering=use_ordering, use_see=use_see)
+            search.search(game.position, depth)
+            totals[i] += search.nodes
+            cells.append(f"{search.nodes:>9} EBF {search.nodes ** (1 / depth):>5.2f}")
+        print(f"  {name:<12}" + ''.join(f" {cell:>20}" for cell in cells))
+    print(f"  {'total':<12}" + ''.join(f" {total:>20}" for total in totals))
+
+
+def bench_quiescence(depth: int, engine: str):
+    """Compare fixed-depth searches with and without the quiescence search at the leaves."""
+    print(f"Quiescence search ({engine} board)")
+    print(f"  {'position':<12} {'search':<18} {'nodes':>8} {'q-nodes':>8} {'time':>7} {'score':>6}  best move")
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        for label, search_depth, use_quiescence in ((f"depth {depth}", depth, False),
+                                                    (f"depth {depth - 1} + quiesce", depth - 1, True)):
+            search = Search(use_quiescence=use_quiescence)
+            start = time.perf_counter()
+            score, move = search.search(game.position, search_depth)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<12} {label:<18} {search.nodes:>8} {search.qnodes:>8} {elapsed:>6.2f}s {score:>6}  "
+                  f"{move_name(move) if move is not None else '-'}")
+
+
+# Search configurations compared by bench_pruning, each adding one technique to the previous one
+PRUNING_CONFIGS = (
+    ('alpha-beta', dict(use_pvs=False, use_null_move=False, use_lmr=False, use_check_extensions=False)),
+    ('+PVS', dict(use_null_move=False, use_lmr=False, use_check_extensions=False)),
+    ('+null move', dict(use_lmr=False, use_check_extensions=False)),
+    ('+LMR', dict(use_check_extensions=False)),
+    ('+check ext', dict()),
+)
+
+
+def bench_pruning(depth: int, engine: str, time_limit: float = 5.0):
+    """Compare nodes and time to a fixed depth as PVS, null-move pruning, LMR and check extensions are added.
+
+    Then report the depth that plain alpha-beta and the full search each complete within a time budget.
+    """
+    print(f"Pruning and reductions (depth {depth}, {engine} board)")
+    print(f"  {'position':<12}" + ''.join(f" {label:>20}" for label, _ in PRUNING_CONFIGS))
+    totals = [[0, 0.0] for _ in PRUNING_CONFIGS]
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        cells = []
+        for i, (_, options) in enumerate(PRUNING_CONFIGS):
+            search = Search(**options)
+            start = time.perf_counter()
+            search.search(game.position, depth)
+            elapsed = time.perf_counter() - start
+            totals[i][0] += search.nodes
+            totals[i][1] += elapsed
+            cells.append(f"{search.nodes:>9} {elapsed:>6.2f}s")
+        print(f"  {name:<12}" + ''.join(f" {cell:>20}" for cell in cells))
+    print(f"  {'total':<12}" + ''.join(f" {f'{nodes:>9} {seconds:>6.2f}s':>20}" for nodes, seconds in totals))
+    print(f"  Depth completed in {time_limit:g}s")
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        reached = []
+        for label, (_, options) in (('alpha-beta', PRUNING_CONFIGS[0]), ('all', PRUNING_CONFIGS[-1])):
+            search = Search(**options)
+            search.search(game.position, MAX_PLY, time_limit)
+            reached.append(f"{label} {search.depth_reached}")
+        print(f"  {name:<12} " + ', '.join(reached))
+
+
+def bench_search_stats(depth: int, engine: str):
+    """Report the search statistics of each position, then where the time goes with the profiler on."""
+    print(f"Search statistics (depth {depth}, {engine} board)")
+    print(f"  {'position':<12} {'nodes':>8} {'q-nodes':>8} {'nodes/s':>8} {'TT hits':>8} {'cutoffs':>8} "
+          f"{'1st move':>8}  time per depth")
+    for name, moves in BENCH_POSITIONS.items():
+        game = game_from_moves(moves, engine)
+        search = Search()
+        search.search(game.position, depth)
+        stats = search.stats
+        per_depth = ' '.join(f"{seconds:.2f}" for _, seconds, _, _ in stats.iterations)
+        print(f"  {name:<12} {stats.nodes:>8} {stats.qnodes:>8} {stats.nps:>8.0f} {stats.tt_hit_rate:>8.1%} "
+              f"{stats.cutoff_rate:>8.1%} {stats.first_move_cutoff_rate:>8.1%}  {per_depth}")
+    game = game_from_moves(BENCH_POSITIONS['middlegame'], engine)
+    search = Search()
+    profiler = Profiler()
+    profiler.install(type(game.position), search)
+    try:
+        search.search(game.position, depth)
+    finally:
+        profiler.uninstall()
+    report = profiler.report(search.stats.seconds)
+    print(f"  Profile of the middlegame search ({search.stats.seconds:.2f}s with timers)")
+    for category in list(PROFILE_CATEGORIES) + ['other']:
+        entry = report[category]
+        print(f"    {category:<16} {entry['calls']:>9} calls {entry['seconds']:>8.3f}s {entry['share']:>7.1%}")
+
+
+def material_scan(grid) -> int:
+    """The evaluation used before incremental updates: a full scan of the Piece grid summing PIECE_VALUES."""
+    score = 0
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            piece = grid[row][col]
+            if piece:
+                value = PIECE_VALUES[piece.type]
+                score += value if piece.color == 'white' else -value
+    return score
+
+
+def bench_evaluation(engine: str, number: int = 20000):
+    """Micro-benchmark the cost of one leaf evaluation and of the make/unmake updates that feed it."""
+    game = game_from_moves(BENCH_POSITIONS['middlegame'], engine)
+    board = game.position
+    move = board.legal_moves()[0]
+
+    def full_rescan():
+        board.refresh_evaluation()
+        return board.evaluate()
+
+    def make_unmake():
+        board.make_move(move)
+        board.unmake_move()
+
+    cases = (('material scan of the Piece grid (old)', lambda: material_scan(game.board)),
+             ('tapered PST eval rescanned from scratch', full_rescan),
+             ('incremental tapered PST eval', board.evaluate),
+             ('make_move + unmake_move (with updates)', make_unmake))
+    print(f"Leaf evaluation cost ({number} calls, {engine} board)")
+    for label, func in cases:
+        seconds = timeit.timeit(func, number=number)
+        print(f"  {label:<42} {seconds / number * 1e6:>8.2f} us/call")
+
+
+SECTIONS = {
+    'tt': lambda args: bench_transposition_table(args.depth, args.engine),
+    'reuse': lambda args: bench_persistent_table(args.depth - 1, args.engine),
+    'ordering': lambda args: bench_move_ordering(args.depth, args.engine),
+    'quiescence': lambda args: bench_quiescence(args.depth, args.engine),
+    'eval': lambda args: bench_evaluation(args.engine),
+    'stats': lambda args: bench_search_stats(args.depth, args.engine),
+    'pruning': lambda args: bench_pruning(args.depth, args.engine),
+}
+
+
+def main():
+    """Run the search benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the chess AI search.")
+    parser.add_argument('--depth', type=int, default=4, help="search depth in plies")
+    parser.add_argument('--engine', choices=['mailbox', 'bitboard'], default='mailbox', help="board implementation")
+    parser.add_argument('--only', choices=sorted(SECTIONS), action='append', help="run only these sections")
+    args = parser.parse_args()
+    for i, name in enumerate(args.only or SECTIONS):
+        if i:
+            print()
+        SECTIONS[name](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+from typing import List, Optional
+
+from board import (NUM_SQUARES, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, TYPE_MASK, COLOR_MASK,
+                   CASTLE_FLAG, EN_PASSANT_FLAG, PROMOTION_TYPES, CASTLING_RIGHTS, CASTLING_ROOKS, CASTLES,
+                   ALL_SQUARES, RAYS, Board, square_index)
+
+# Bit n of a bitboard is square n of the mailbox board (row * 8 + col, row 0 is rank 8)
+FULL = (1 << 64) - 1
+FILE_A = sum(1 << square_index(row, 0) for row in range(8))
+FILE_H = sum(1 << square_index(row, 7) for row in range(8))
+ROW_MASKS = tuple(0xFF << (8 * row) for row in range(8))
+
+
+def _flip(bitboard: int) -> int:
+    """Mirror a bitboard vertically (byte swap), the bit reversal used by hyperbola quintessence."""
+    return int.from_bytes((bitboard & FULL).to_bytes(8, 'little'), 'big')
+
+
+def _build_tables():
+    """Precompute leaper attacks, line masks and first-rank slider attacks."""
+    knight_steps = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+    king_steps = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+    def mask(row, col, steps):
+        return sum(1 << square_index(row + dr, col + dc) for dr, dc in steps
+                   if 0 <= row + dr < 8 and 0 <= col + dc < 8)
+
+    def line(row, col, dr, dc):
+        # Every square on the line through (row, col) except the square itself
+        bits = 0
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                bits |= 1 << square_index(r, c)
+                r, c = r + sign * dr, c + sign * dc
+        return bits
+
+    knight, king, files, diagonals, anti_diagonals = [], [], [], [], []
+    pawn_attacks = {WHITE: [], BLACK: []}
+    for sq in range(NUM_SQUARES):
+        row, col = sq >> 3, sq & 7
+        knight.append(mask(row, col, knight_steps))
+        king.append(mask(row, col, king_steps))
+        pawn_attacks[WHITE].append(mask(row, col, [(-1, -1), (-1, 1)]))
+        pawn_attacks[BLACK].append(mask(row, col, [(1, -1), (1, 1)]))
+        files.append(line(row, col, 1, 0))
+        diagonals.append(line(row, col, 1, 1))
+        anti_diagonals.append(line(row, col, 1, -1))
+
+    # Sliding attacks along a single rank, indexed by [col][inner six bits of the rank occupancy]
+    rank_attacks = []
+    for col in range(8):
+        table = []
+        for inner in range(64):
+            occupancy = inner << 1
+            bits = 0
+            for step in (1, -1):
+                c = col + step
+                while 0 <= c < 8:
+                    bits |= 1 << c
+                    if occupancy & (1 << c):
+                        break
+                    c += step
+            table.append(bits)
+        rank_attacks.append(tuple(table))
+    return (tuple(knight), tuple(king), {c: tuple(t) for c, t in pawn_attacks.items()},
+            tuple(files), tuple(diagonals), tuple(anti_diagonals), tuple(rank_attacks))
+
+
+(KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, FILE_MASKS, DIAGONAL_MASKS,
+ ANTI_DIAGONAL_MASKS, RANK_ATTACKS) = _build_tables()
+SQUARE_BITS = tuple(1 << sq for sq in range(NUM_SQUARES))
+FLIPPED_BITS = tuple(_flip(bit) for bit in SQUARE_BITS)
+
+
+def _line_attacks(occupied: int, mask: int, sq: int) -> int:
+    """Hyperbola quintessence: slider attacks along one line (file or diagonal) through sq."""
+    o = occupied & mask
+    forward = o - (SQUARE_BITS[sq] << 1)
+    reverse = _flip(_flip(o) - (FLIPPED_BITS[sq] << 1))
+    return (forward ^ reverse) & mask
+
+
+def _build_line_tables():
+    """Precompute hyperbola-quintessence attacks along every file and diagonal for each occupancy of the line.
+
+    A line holds at most seven other squares, so a square's table has at most 128 entries; looking the
+    attacks up by the masked occupancy saves the bit reversals on every call.
+    """
+    tables = []
+    for masks in (FILE_MASKS, DIAGONAL_MASKS, ANTI_DIAGONAL_MASKS):
+        per_square = []
+        for sq in range(NUM_SQUARES):
+            mask = masks[sq]
+            table = {}
+            subset = 0
+            while True:
+                table[subset] = _line_attacks(subset, mask, sq)
+                subset = (subset - mask) & mask  # Next subset of the mask (carry-rippler)
+                if not subset:
+                    break
+            per_square.append(table)
+        tables.append(tuple(per_square))
+    return tables
+
+
+FILE_ATTACKS, DIAGONAL_ATTACKS, ANTI_DIAGONAL_ATTACKS = _build_line_tables()
+
+
+def _build_between():
+    """BETWEEN[a][b]: the squares strictly between a and b when they share a line, else 0."""
+    between = [[0] * NUM_SQUARES for _ in range(NUM_SQUARES)]
+    for sq in range(NUM_SQUARES):
+        for direction in RAYS[sq]:
+            line = 0
+            for target in direction:
+                between[sq][target] = line
+                line |= 1 << target
+    return tuple(tuple(row) for row in between)
+
+
+BETWEEN = _build_between()
+# Squares that must be empty for each castling move
+CASTLING_PATHS = {right: sum(1 << sq for sq in between) for right, _, _, _, _, _, between in CASTLES}
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    """Return the rook attack set from sq given the occupancy."""
+    shift = sq & 56
+    rank = RANK_ATTACKS[sq & 7][(occupied >> (shift + 1)) & 63] << shift
+    return rank | FILE_ATTACKS[sq][occupied & FILE_MASKS[sq]]
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    """Return the bishop attack set from sq given the occupancy."""
+    return (DIAGONAL_ATTACKS[sq][occupied & DIAGONAL_MASKS[sq]] |
+            ANTI_DIAGONAL_ATTACKS[sq][occupied & ANTI_DIAGONAL_MASKS[sq]])
+
+
+class BitboardBoard(Board):
+    """Board that also keeps one 64-bit set per piece code and generates moves from attack tables."""
+
+    # bb[code] is the set of squares holding that piece code; the unused codes WHITE (0) and BLACK (8)
+    # hold the occupancy of each colour
+    __slots__ = ('bb',)
+
+    def __init__(self):
+        """Create an empty board with empty bitboards."""
+        super().__init__()
+        self.bb = [0] * 16
+
+    def refresh(self):
+        """Recompute every derived field, including the bitboards, after editing squares directly."""
+        super().refresh()
+        self.rebuild_bitboards()
+
+    def copy(self) -> 'BitboardBoard':
+        """Return an independent copy of the position including its bitboards."""
+        board = super().copy()
+        board.bb = list(self.bb)
+        return board
+
+    def rebuild_bitboards(self):
+        """Recompute every bitboard from the mailbox squares."""
+        bb = self.bb = [0] * 16
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                bb[piece] |= 1 << sq
+                bb[piece & COLOR_MASK] |= 1 << sq
+
+    def _toggle_move(self, move: int, piece: int, captured: int):
+        """XOR the changes of a move into the bitboards; toggling the same move again takes it back."""
+        bb = self.bb
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        to_bit = 1 << to_sq
+        move_bits = (1 << from_sq) | to_bit
+        color = piece & COLOR_MASK
+        if captured:
+            bb[captured] ^= to_bit
+            bb[captured & COLOR_MASK] ^= to_bit
+        bb[color] ^= move_bits
+        if not flag:
+            bb[piece] ^= move_bits
+        elif flag == EN_PASSANT_FLAG:
+            bb[piece] ^= move_bits
+            victim_bit = 1 << (to_sq + 8 if color == WHITE else to_sq - 8)
+            bb[piece ^ COLOR_MASK] ^= victim_bit
+            bb[color ^ COLOR_MASK] ^= victim_bit
+        elif flag == CASTLE_FLAG:
+            bb[piece] ^= move_bits
+            rook_from, rook_to = CASTLING_ROOKS[to_sq]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bb[ROOK | color] ^= rook_bits
+            bb[color] ^= rook_bits
+        else:
+            # Promotion: the pawn leaves the origin and the new piece appears on the target
+            bb[piece] ^= 1 << from_sq
+            bb[flag | color] ^= to_bit
+
+    def make_move(self, move: int):
+        """Play a move in place, updating the bitboards alongside the mailbox."""
+        squares = self.squares
+        self._toggle_move(move, squares[move & 63], squares[(move >> 6) & 63])
+        Board.make_move(self, move)
+
+    def unmake_move(self):
+        """Take back the last move, restoring the bitboards."""
+        move, captured = self.history[-1][:2]
+        Board.unmake_move(self)
+        self._toggle_move(move, self.squares[move & 63], captured)
+
+    def has_non_pawn_material(self, color: int) -> bool:
+        """Check whether the colour has a knight, bishop, rook or queen."""
+        bb = self.bb
+        return bool(bb[KNIGHT | color] | bb[BISHOP | color] | bb[ROOK | color] | bb[QUEEN | color])
+
+    def attackers_to(self, sq: int, by_color: int, occupied: int) -> int:
+        """Return the set of by_color pieces attacking sq, given an occupancy."""
+        bb = self.bb
+        queens = bb[QUEEN | by_color]
+        return ((KNIGHT_ATTACKS[sq] & bb[KNIGHT | by_color]) |
+                (KING_ATTACKS[sq] & bb[KING | by_color]) |
+                (PAWN_ATTACKS[by_color ^ COLOR_MASK][sq] & bb[PAWN | by_color]) |
+                (rook_attacks(sq, occupied) & (bb[ROOK | by_color] | queens)) |
+                (bishop_attacks(sq, occupied) & (bb[BISHOP | by_color] | queens))) & occupied
+
+    def is_attacked(self, square: int, by_color: int) -> bool:
+        """Check if the square is attacked by any piece of by_color."""
+        bb = self.bb
+        return bool(self.attackers_to(square, by_color, bb[WHITE] | bb[BLACK]))
+
+    def in_check(self, color: int) -> bool:
+        """Check if the king of the given colour is attacked."""
+        king = self.bb[KING | color]
+        return bool(king) and self.is_attacked(king.bit_length() - 1, color ^ COLOR_MASK)
+
+    def king_step_is_safe(self, king_sq: int, to_sq: int, enemy: int) -> bool:
+        """Check that the king may step to to_sq, removing it from the occupancy used for slider attacks."""
+        bb = self.bb
+        occupied = (bb[WHITE] | bb[BLACK]) & ~(1 << king_sq)
+        return not (self.attackers_to(to_sq, enemy, occupied) & ~(1 << to_sq))
+
+    def check_and_pins(self, color: int):
+        """Return (check mask, pins) for the given colour's king, as Board.check_and_pins, from attack sets.
+
+        Enemy sliders that would see the king through the colour's own pieces are found in one lookup;
+        the own pieces between each of them and the king then decide between a check and a pin.
+        """
+        bb = self.bb
+        king = bb[KING | color]
+        if not king:
+            return ALL_SQUARES, {}
+        king_sq = king.bit_length() - 1
+        enemy = color ^ COLOR_MASK
+        own = bb[color]
+        enemies = bb[enemy]
+        queens = bb[QUEEN | enemy]
+        checkers = (KNIGHT_ATTACKS[king_sq] & bb[KNIGHT | enemy]) | (PAWN_ATTACKS[color][king_sq] & bb[PAWN | enemy])
+        check_mask = checkers if checkers else ALL_SQUARES
+        count = 1 if checkers else 0
+        pins = {}
+        snipers = ((rook_attacks(king_sq, enemies) & (bb[ROOK | enemy] | queens)) |
+                   (bishop_attacks(king_sq, enemies) & (bb[BISHOP | enemy] | queens)))
+        between_king = BETWEEN[king_sq]
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            line = between_king[bit.bit_length() - 1]
+            blockers = line & own
+            if not blockers:
+                check_mask = line | bit
+                count += 1
+            elif not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = line | bit
+        if count > 1:
+            check_mask = 0
+        return check_mask, pins
+
+    def castling_moves(self, color: int, moves: List[int]):
+        """Append the castling moves of color whose path is empty and whose king does not start or pass in check."""
+        bb = self.bb
+        occupied = bb[WHITE] | bb[BLACK]
+        enemy = color ^ COLOR_MASK
+        rights = self.castling
+        for right, side, king_from, king_to, rook_from, rook_to, _ in CASTLES:
+            if (side != color or not rights & right or not (bb[KING | color] >> king_from) & 1
+                    or not (bb[ROOK | color] >> rook_from) & 1 or occupied & CASTLING_PATHS[right]):
+                continue
+            if self.attackers_to(king_from, enemy, occupied) or self.attackers_to(rook_to, enemy, occupied):
+                continue
+            moves.append(king_from | (king_to << 6) | (CASTLE_FLAG << 12))
+
+    def is_legal(self, move: int) -> bool:
+        """Check a pseudo-legal move against the king's safety without playing it."""
+        if move >> 12 == EN_PASSANT_FLAG or move >> 12 == CASTLE_FLAG:
+            return Board.is_legal(self, move)  # These move a second piece
+        bb = self.bb
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        piece = self.squares[from_sq]
+        color = piece & COLOR_MASK
+        to_bit = 1 << to_sq
+        # Occupancy after the move; a captured piece simply drops out of the attacker sets
+        occupied = ((bb[WHITE] | bb[BLACK]) & ~(1 << from_sq)) | to_bit
+        king = to_sq if piece & TYPE_MASK == KING else bb[KING | color].bit_length() - 1
+        if king < 0:
+            return True
+        return not (self.attackers_to(king, color ^ COLOR_MASK, occupied) & ~to_bit)
+
+    def _target_moves(self, from_sq: int, targets: int, moves: List[int]):
+        """Append a move from from_sq to every square in the targets set."""
+        append = moves.append
+        while targets:
+            bit = targets & -targets
+            append(from_sq | ((bit.bit_length() - 1) << 6))
+            targets ^= bit
+
+    def _pawn_moves(self, color: int, pawns: int, moves: List[int], captures_only: bool = False):
+        """Append pawn pushes and captures for a set of pawns using set-wise shifts.
+
+        With captures_only the quiescence moves are generated: captures (en passant included) and
+        promotions to a queen.
+        """
+        bb = self.bb
+        empty = ~(bb[WHITE] | bb[BLACK]) & FULL
+        enemies = bb[color ^ COLOR_MASK]
+        append = moves.append
+        if color == WHITE:
+            # White pawns move towards row 0 (bit index decreases by 8)
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_MASKS[5]) >> 8) & empty
+            sets = ((single, 8), (double, 16), (((pawns & ~FILE_A) >> 9) & enemies, 9),
+                    (((pawns & ~FILE_H) >> 7) & enemies, 7))
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & ROW_MASKS[2]) << 8) & empty
+            sets = ((single, -8), (double, -16), (((pawns & ~FILE_A) << 7) & FULL & enemies, -7),
+                    (((pawns & ~FILE_H) << 9) & FULL & enemies, -9))
+        promotion_row = ROW_MASKS[0] if color == WHITE else ROW_MASKS[7]
+        if captures_only:
+            sets = ((sets[0][0] & promotion_row, sets[0][1]),) + sets[2:]
+        for targets, offset in sets:
+            promotions = targets & promotion_row
+            targets ^= promotions
+            while targets:
+                bit = targets & -targets
+                to_sq = bit.bit_length() - 1
+                append((to_sq + offset) | (to_sq << 6))
+                targets ^= bit
+            while promotions:
+                bit = promotions & -promotions
+                to_sq = bit.bit_length() - 1
+                for kind in (QUEEN,) if captures_only else PROMOTION_TYPES:
+                    append((to_sq + offset) | (to_sq << 6) | (kind << 12))
+                promotions ^= bit
+        ep_square = self.ep_square
+        if ep_square >= 0:
+            # En passant: the pawns that attack the skipped square, found from the square's point of view
+            capturers = PAWN_ATTACKS[color ^ COLOR_MASK][ep_square] & pawns
+            while capturers:
+                bit = capturers & -capturers
+                append((bit.bit_length() - 1) | (ep_square << 6) | (EN_PASSANT_FLAG << 12))
+                capturers ^= bit
+
+    def pseudo_legal_moves(self, color: Optional[int] = None, captures_only: bool = False) -> List[int]:
+        """Return all pseudo-legal moves (or only the captures) for the given colour from the bitboards."""
+        if color is None:
+            color = self.side
+        bb = self.bb
+        own = bb[color]
+        enemies = bb[color ^ COLOR_MASK]
+        not_own = enemies if captures_only else ~own & FULL
+        occupied = own | enemies
+        moves = []
+        self._pawn_moves(color, bb[PAWN | color], moves, captures_only)
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = bb[kind | color]
+            while pieces:
+                bit = pieces & -pieces
+                from_sq = bit.bit_length() - 1
+                pieces ^= bit
+                if kind == KNIGHT:
+                    targets = KNIGHT_ATTACKS[from_sq]
+                elif kind == KING:
+                    targets = KING_ATTACKS[from_sq]
+                elif kind == BISHOP:
+                    targets = bishop_attacks(from_sq, occupied)
+                elif kind == ROOK:
+                    targets = rook_attacks(from_sq, occupied)
+                else:
+                    targets = rook_attacks(from_sq, occupied) | bishop_attacks(from_sq, occupied)
+                self._target_moves(from_sq, targets & not_own, moves)
+        if not captures_only and self.castling & CASTLING_RIGHTS[color]:
+            self.castling_moves(color, moves)
+        return moves
+
+    def pseudo_legal_captures(self, color: Optional[int] = None) -> List[int]:
+        """Return the pseudo-legal captures for the given colour from the bitboards."""
+        return self.pseudo_legal_moves(color, captures_only=True)
+
+    def _legal_moves(self, color: int, captures_only: bool) -> List[int]:
+        """Generate the legal moves (or captures) directly, in the order of pseudo_legal_moves.
+
+        Every piece's target set is cut down by the check mask and its pin ray before moves are
+        appended, so only king steps, castling and en passant need a test of their own.
+        """
+        check_mask, pins = self.check_and_pins(color)
+        bb = self.bb
+        own = bb[color]
+        enemy = color ^ COLOR_MASK
+        enemies = bb[enemy]
+        occupied = own | enemies
+        not_own = (enemies if captures_only else ~own & FULL) & check_mask
+        king = bb[KING | color]
+        king_sq = king.bit_length() - 1
+        moves = []
+        append = moves.append
+        if check_mask:
+            pawn_moves = []
+            self._pawn_moves(color, bb[PAWN | color], pawn_moves, captures_only)
+            for move in pawn_moves:
+                to_sq = (move >> 6) & 63
+                if move >> 12 == EN_PASSANT_FLAG:
+                    # Two pawns leave the rank at once, which the pin scan cannot see
+                    if self.is_legal(move):
+                        append(move)
+                elif (check_mask >> to_sq) & 1 and ((move & 63) not in pins or (pins[move & 63] >> to_sq) & 1):
+                    append(move)
+            for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+                pieces = bb[kind | color]
+                while pieces:
+                    bit = pieces & -pieces
+                    from_sq = bit.bit_length() - 1
+                    pieces ^= bit
+                    if kind == KNIGHT:
+                        targets = KNIGHT_ATTACKS[from_sq] & not_own
+                    elif kind == BISHOP:
+                        targets = bishop_attacks(from_sq, occupied) & not_own
+                    elif kind == ROOK:
+                        targets = rook_attacks(from_sq, occupied) & not_own
+                    else:
+                        targets = (rook_attacks(from_sq, occupied) | bishop_attacks(from_sq, occupied)) & not_own
+                    if from_sq in pins:
+                        targets &= pins[from_sq]
+                    while targets:
+                        bit = targets & -targets
+                        append(from_sq | ((bit.bit_length() - 1) << 6))
+                        targets ^= bit
+        if king:
+            # The king is lifted from the occupancy so it cannot hide behind itself from a slider
+            targets = KING_ATTACKS[king_sq] & (enemies if captures_only else ~own & FULL)
+            lifted = occupied ^ king
+            while targets:
+                bit = targets & -targets
+                to_sq = bit.bit_length() - 1
+                if not self.attackers_to(to_sq, enemy, lifted) & ~bit:
+                    append(king_sq | (to_sq << 6))
+                targets ^= bit
+            if not captures_only and check_mask == ALL_SQUARES and self.castling & CASTLING_RIGHTS[color]:
+                castles = []
+                self.castling_moves(color, castles)
+                for move in castles:
+                    if self.king_step_is_safe(king_sq, (move >> 6) & 63, enemy):
+                        append(move)
+        return moves
+
+    def legal_moves(self, color: Optional[int] = None) -> List[int]:
+        """Return all legal moves for the given colour (defaults to the side to move)."""
+        return self._legal_moves(self.side if color is None else color, False)
+
+    def legal_captures(self, color: Optional[int] = None) -> List[int]:
+        """Return the legal captures for the given colour (defaults to the side to move)."""
+        return self._legal_moves(self.side if color is None else color, True)
+
+    def piece_moves(self, from_sq: int, moves: Optional[List[int]] = None) -> List[int]:
+        """Append the pseudo-legal moves of the piece on from_sq to moves (ignoring checks)."""
+        if moves is None:
+            moves = []
+        piece = self.squares[from_sq]
+        if not piece:
+            return moves
+        color = piece & COLOR_MASK
+        kind = piece & TYPE_MASK
+        bb = self.bb
+        occupied = bb[WHITE] | bb[BLACK]
+        if kind == PAWN:
+            self._pawn_moves(color, 1 << from_sq, moves)
+            return moves
+        if kind == KNIGHT:
+            targets = KNIGHT_ATTACKS[from_sq]
+        elif kind == KING:
+            targets = KING_ATTACKS[from_sq]
+        else:
+            targets = 0
+            if kind != BISHOP:
+                targets |= rook_attacks(from_sq, occupied)
+            if kind != ROOK:
+                targets |= bishop_attacks(from_sq, occupied)
+        self._target_moves(from_sq, targets & ~bb[color] & FULL, moves)
+        if kind == KING and self.castling & CASTLING_RIGHTS[color]:
+            self.castling_moves(color, moves)
+        return moves
@@ -0,0 +1,902 @@
+import random
+from typing import List, Optional
+
+from pst import MIDDLEGAME, ENDGAME, PHASE_WEIGHTS, PHASE_TOTAL
+
+# Constants
+BOARD_SIZE = 8  # Size of the chessboard (8x8)
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+
+# Piece codes: the low three bits hold the piece type, bit 3 holds the colour
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 0, 8
+TYPE_MASK = 7
+COLOR_MASK = 8
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Translation tables between the compact codes and the names used by Piece
+PIECE_CODES = {'pawn': PAWN, 'knight': KNIGHT, 'bishop': BISHOP, 'rook': ROOK, 'queen': QUEEN, 'king': KING}
+PIECE_NAMES = {code: name for name, code in PIECE_CODES.items()}
+COLOR_CODES = {'white': WHITE, 'black': BLACK}
+COLOR_NAMES = {WHITE: 'white', BLACK: 'black'}
+# FEN letters (uppercase for White)
+FEN_CODES = {'p': PAWN | BLACK, 'n': KNIGHT | BLACK, 'b': BISHOP | BLACK, 'r': ROOK | BLACK, 'q': QUEEN | BLACK,
+             'k': KING | BLACK, 'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+FEN_LETTERS = {code: letter for letter, code in FEN_CODES.items()}
+
+# Dictionary to assign values to pieces for board evaluation in the AI's decision-making
+PIECE_VALUES = {
+    'pawn': 1,
+    'knight': 3,
+    'bishop': 3,
+    'rook': 5,
+    'queen': 9,
+    'king': 100
+}
+# The same values indexed by piece type code
+TYPE_VALUES = (0,) + tuple(PIECE_VALUES[PIECE_NAMES[kind]] for kind in range(PAWN, KING + 1))
+# Material in centipawns as used by the positional evaluation (the king is never traded, so it counts 0)
+MATERIAL_VALUES = tuple(value * 100 if kind != KING else 0 for kind, value in enumerate(TYPE_VALUES))
+
+
+def square_index(row: int, col: int) -> int:
+    """Convert a (row, col) pair into a 0-63 square index (row 0 is rank 8, like ChessGame.board)."""
+    return row * BOARD_SIZE + col
+
+
+def square_coords(square: int) -> List[int]:
+    """Convert a 0-63 square index back into a [row, col] pair."""
+    return [square >> 3, square & 7]
+
+
+def square_name(square: int) -> str:
+    """Return the algebraic name of a square index (e.g. 'e4')."""
+    return f"{chr(97 + (square & 7))}{8 - (square >> 3)}"
+
+
+def parse_square(name: str) -> int:
+    """Convert an algebraic square name (e.g. 'e4') into a square index."""
+    if len(name) != 2 or not name[1].isdigit():
+        raise ValueError(f"Invalid square: {name!r}")
+    col = ord(name[0].lower()) - ord('a')
+    row = 8 - int(name[1])
+    if not (0 <= col < 8 and 0 <= row < 8):
+        raise ValueError(f"Invalid square: {name!r}")
+    return square_index(row, col)
+
+
+def move_name(move: int) -> str:
+    """Format a packed move in coordinate notation (e.g. 'e2e4', or 'e7e8q' for a promotion)."""
+    return square_name(move & 63) + square_name((move >> 6) & 63) + PROMOTION_LETTERS.get(move >> 12, '')
+
+
+# Moves are packed into a single int: bits 0-5 origin square, bits 6-11 target square and bits 12-14 a
+# flag, which is the piece type a pawn promotes to (KNIGHT to QUEEN), CASTLE_FLAG or EN_PASSANT_FLAG
+CASTLE_FLAG = KING
+EN_PASSANT_FLAG = 7
+NULL_MOVE = 0  # Passing the turn (null-move pruning); a8-a8 is never a real move
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+PROMOTION_LETTERS = {QUEEN: 'q', ROOK: 'r', BISHOP: 'b', KNIGHT: 'n'}
+
+
+def encode_move(from_sq: int, to_sq: int, flag: int = 0) -> int:
+    """Pack an origin and target square (and a special-move flag) into a move int."""
+    return from_sq | (to_sq << 6) | (flag << 12)
+
+
+def move_from(move: int) -> int:
+    """Return the origin square of a packed move."""
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    """Return the target square of a packed move."""
+    return (move >> 6) & 63
+
+
+def move_flag(move: int) -> int:
+    """Return the special-move flag of a packed move (0 for an ordinary move)."""
+    return move >> 12
+
+
+def move_promotion(move: int) -> int:
+    """Return the piece type a move promotes to, or 0 if it is not a promotion."""
+    flag = move >> 12
+    return flag if KNIGHT <= flag <= QUEEN else 0
+
+
+def _build_tables():
+    """Precompute knight/king targets, pawn captures and sliding rays for every square."""
+    # Direction order: 0-3 orthogonal (used by rooks), 4-7 diagonal (used by bishops)
+    ray_dirs = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+    knight_steps = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+    knight, king, rays = [], [], []
+    pawn_captures = {WHITE: [], BLACK: []}
+    for sq in range(NUM_SQUARES):
+        row, col = sq >> 3, sq & 7
+        knight.append(tuple(square_index(row + dr, col + dc) for dr, dc in knight_steps
+                            if 0 <= row + dr < 8 and 0 <= col + dc < 8))
+        king.append(tuple(square_index(row + dr, col + dc) for dr, dc in ray_dirs
+                          if 0 <= row + dr < 8 and 0 <= col + dc < 8))
+        square_rays = []
+        for dr, dc in ray_dirs:
+            ray = []
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append(square_index(r, c))
+                r, c = r + dr, c + dc
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+        # White pawns move towards row 0, Black pawns towards row 7
+        for color, dr in ((WHITE, -1), (BLACK, 1)):
+            pawn_captures[color].append(tuple(square_index(row + dr, col + dc) for dc in (-1, 1)
+                                              if 0 <= row + dr < 8 and 0 <= col + dc < 8))
+    return tuple(knight), tuple(king), tuple(rays), {c: tuple(t) for c, t in pawn_captures.items()}
+
+
+KNIGHT_TARGETS, KING_TARGETS, RAYS, PAWN_CAPTURES = _build_tables()
+ORTHOGONAL_DIRS = (0, 1, 2, 3)
+DIAGONAL_DIRS = (4, 5, 6, 7)
+ALL_SQUARES = (1 << NUM_SQUARES) - 1
+SLIDER_DIRS = {BISHOP: DIAGONAL_DIRS, ROOK: ORTHOGONAL_DIRS, QUEEN: ORTHOGONAL_DIRS + DIAGONAL_DIRS}
+
+# Castling right bits (kept in Board.castling)
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_RIGHTS = {WHITE: WHITE_KINGSIDE | WHITE_QUEENSIDE, BLACK: BLACK_KINGSIDE | BLACK_QUEENSIDE}
+
+
+def _build_castling_tables():
+    """Describe each castling move and the rights every square's pieces hold."""
+    castles = []
+    keep = [15] * NUM_SQUARES
+    for right, row, color in ((WHITE_KINGSIDE, 7, WHITE), (WHITE_QUEENSIDE, 7, WHITE),
+                              (BLACK_KINGSIDE, 0, BLACK), (BLACK_QUEENSIDE, 0, BLACK)):
+        kingside = right in (WHITE_KINGSIDE, BLACK_KINGSIDE)
+        king_from, rook_from = square_index(row, 4), square_index(row, 7 if kingside else 0)
+        king_to, rook_to = square_index(row, 6 if kingside else 2), square_index(row, 5 if kingside else 3)
+        between = tuple(range(min(king_from, rook_from) + 1, max(king_from, rook_from)))
+        # (right, colour, king origin, king target, rook origin, rook target, squares that must be empty)
+        castles.append((right, color, king_from, king_to, rook_from, rook_to, between))
+        # Moving the king or the rook, or capturing the rook, gives the right up for good
+        keep[king_from] &= ~right
+        keep[rook_from] &= ~right
+    rooks = {king_to: (rook_from, rook_to) for _, _, _, king_to, rook_from, rook_to, _ in castles}
+    return tuple(castles), rooks, tuple(keep)
+
+
+# CASTLES: one entry per castling move; CASTLING_ROOKS[king target]: the rook's (origin, target);
+# CASTLING_KEEP[square]: the rights that survive a move from or to that square
+CASTLES, CASTLING_ROOKS, CASTLING_KEEP = _build_castling_tables()
+FIFTY_MOVE_PLIES = 100  # Plies without a capture or pawn move after which the game is drawn
+
+
+def _build_zobrist_keys():
+    """Generate the Zobrist keys from a fixed seed so hashes are stable across processes and runs."""
+    rng = random.Random(0x5EED)
+    pieces = tuple(tuple(rng.getrandbits(64) for _ in range(NUM_SQUARES)) for _ in range(16))
+    side = rng.getrandbits(64)
+    castling = tuple(rng.getrandbits(64) for _ in range(16))
+    ep_files = tuple(rng.getrandbits(64) for _ in range(BOARD_SIZE))
+    return pieces, side, castling, ep_files
+
+
+def _build_eval_tables():
+    """Fold material and piece-square values into signed per-code tables (positive for White)."""
+    middlegame = [(0,) * NUM_SQUARES for _ in range(16)]
+    endgame = [(0,) * NUM_SQUARES for _ in range(16)]
+    phase = [0] * 16
+    for name, kind in PIECE_CODES.items():
+        material = MATERIAL_VALUES[kind]
+        for color, sign, mirror in ((WHITE, 1, 0), (BLACK, -1, 56)):
+            # Black reads the tables upside down: square ^ 56 flips the row
+            middlegame[kind | color] = tuple(sign * (material + MIDDLEGAME[name][sq ^ mirror]) for sq in range(NUM_SQUARES))
+            endgame[kind | color] = tuple(sign * (material + ENDGAME[name][sq ^ mirror]) for sq in range(NUM_SQUARES))
+            phase[kind | color] = PHASE_WEIGHTS[name]
+    return tuple(middlegame), tuple(endgame), tuple(phase)
+
+
+# EVAL_MG[code][square] / EVAL_EG[code][square]: signed material plus piece-square value of a piece,
+# PHASE[code]: its game phase weight
+EVAL_MG, EVAL_EG, PHASE = _build_eval_tables()
+
+# ZOBRIST_PIECES[code][square], XORed in while Black is to move, per castling-rights set and per en-passant file
+ZOBRIST_PIECES, ZOBRIST_SIDE, ZOBRIST_CASTLING, ZOBRIST_EP_FILE = _build_zobrist_keys()
+
+
+class Board:
+    """Compact 64-square mailbox board with in-place make/unmake used by the search."""
+
+    __slots__ = ('squares', 'side', 'history', 'kings', 'castling', 'ep_square', 'halfmove', 'fullmove',
+                 'past_keys', 'hash', 'mg', 'eg', 'phase')
+
+    def __init__(self):
+        """Create an empty board with White to move."""
+        self.squares = bytearray(NUM_SQUARES)  # One small-int piece code per square
+        self.side = WHITE                       # Colour to move
+        # Undo stack of (move, captured piece, previous hash, mg, eg, phase, castling, ep_square, halfmove)
+        self.history = []
+        self.kings = [-1, -1]                   # King square per colour (indexed by color >> 3), -1 if absent
+        self.castling = 0                       # Castling right bits (WHITE_KINGSIDE | ...)
+        self.ep_square = -1                     # En-passant target square, -1 if none or no pawn can take
+        self.halfmove = 0                       # Plies since the last capture or pawn move (fifty-move rule)
+        self.fullmove = 1                       # Move number, increased after every Black move
+        self.past_keys = []                     # Hashes of the positions before the undo stack, oldest first
+        self.hash = 0                           # Zobrist hash, updated incrementally by make/unmake
+        self.mg = 0                             # Middlegame material + piece-square score (White minus Black)
+        self.eg = 0                             # Endgame material + piece-square score (White minus Black)
+        self.phase = 0                          # Sum of PHASE weights of the pieces on the board
+
+    @classmethod
+    def from_grid(cls, grid, side: str = 'white') -> 'Board':
+        """Build a compact board from an 8x8 grid of Piece objects (or None).
+
+        A castling right is kept while the king and that rook are on their starting squares and have
+        not moved (Piece.has_moved).
+        """
+        board = cls()
+        for row in range(BOARD_SIZE):
+            for col in range(BOARD_SIZE):
+                piece = grid[row][col]
+                if piece:
+                    board.squares[square_index(row, col)] = PIECE_CODES[piece.type] | COLOR_CODES[piece.color]
+        for right, color, king_from, _, rook_from, _, _ in CASTLES:
+            king = grid[king_from >> 3][king_from & 7]
+            rook = grid[rook_from >> 3][rook_from & 7]
+            if (board.squares[king_from] == KING | color and board.squares[rook_from] == ROOK | color
+                    and not king.has_moved and not rook.has_moved):
+                board.castling |= right
+        board.side = COLOR_CODES[side]
+        board.refresh()
+        return board
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Board':
+        """Build a board from a FEN string (the move counters are optional)."""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        board = cls()
+        rows = fields[0].split('/')
+        if len(rows) != BOARD_SIZE:
+            raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+        for row, text in enumerate(rows):
+            col = 0
+            for char in text:
+                if char.isdigit():
+                    col += int(char)
+                elif char in FEN_CODES and col < BOARD_SIZE:
+                    board.squares[square_index(row, col)] = FEN_CODES[char]
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+            if col != BOARD_SIZE:
+                raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+        if board.squares.count(KING | WHITE) != 1 or board.squares.count(KING | BLACK) != 1:
+            raise ValueError(f"Invalid FEN placement, each side needs one king: {fields[0]!r}")
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f"Invalid FEN side to move: {fields[1]!r}")
+        board.side = WHITE if fields[1] == 'w' else BLACK
+        rights = {'K': WHITE_KINGSIDE, 'Q': WHITE_QUEENSIDE, 'k': BLACK_KINGSIDE, 'q': BLACK_QUEENSIDE}
+        for char in fields[2]:
+            if char != '-':
+                if char not in rights:
+                    raise ValueError(f"Invalid FEN castling rights: {fields[2]!r}")
+                board.castling |= rights[char]
+        if fields[3] != '-':
+            # Like make_move, keep the en-passant square only when a pawn to move could take there
+            ep_square = parse_square(fields[3])
+            pawn = PAWN | board.side
+            if any(board.squares[sq] == pawn for sq in PAWN_CAPTURES[board.side ^ COLOR_MASK][ep_square]):
+                board.ep_square = ep_square
+        try:
+            board.halfmove = int(fields[4]) if len(fields) > 4 else 0
+            board.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+        board.refresh()
+        return board
+
+    def to_fen(self) -> str:
+        """Return the FEN string of the position."""
+        rows = []
+        for row in range(BOARD_SIZE):
+            text = ''
+            empty = 0
+            for col in range(BOARD_SIZE):
+                piece = self.squares[square_index(row, col)]
+                if piece:
+                    text += (str(empty) if empty else '') + FEN_LETTERS[piece]
+                    empty = 0
+                else:
+                    empty += 1
+            rows.append(text + (str(empty) if empty else ''))
+        rights = ''.join(letter for letter, bit in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE),
+                                                    ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+                         if self.castling & bit)
+        ep = square_name(self.ep_square) if self.ep_square >= 0 else '-'
+        return f"{'/'.join(rows)} {'w' if self.side == WHITE else 'b'} {rights or '-'} {ep} {self.halfmove} {self.fullmove}"
+
+    def copy(self) -> 'Board':
+        """Return an independent copy of the position (the undo stack is not copied, only its hashes)."""
+        board = type(self)()
+        board.squares[:] = self.squares
+        board.side = self.side
+        board.kings = list(self.kings)
+        board.castling = self.castling
+        board.ep_square = self.ep_square
+        board.halfmove = self.halfmove
+        board.fullmove = self.fullmove
+        board.past_keys = self.position_keys()
+        board.hash = self.hash
+        board.mg = self.mg
+        board.eg = self.eg
+        board.phase = self.phase
+        return board
+
+    def pack(self) -> bytes:
+        """Serialize the position (not the undo stack) into bytes.
+
+        68 bytes hold the squares, side, castling rights, en-passant square and halfmove clock; they are
+        followed by the 8-byte hashes of the positions since the last capture or pawn move, which
+        repetition detection needs.
+        """
+        halfmove = min(self.halfmove, 255)
+        keys = self.position_keys()[-halfmove:] if halfmove else []
+        return (bytes(self.squares) + bytes((self.side, self.castling, self.ep_square & 0xFF, halfmove)) +
+                b''.join(key.to_bytes(8, 'little') for key in keys))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'Board':
+        """Rebuild a position serialized with pack()."""
+        board = cls()
+        board.squares[:] = data[:NUM_SQUARES]
+        board.side, board.castling, ep_square, board.halfmove = data[NUM_SQUARES:NUM_SQUARES + 4]
+        board.ep_square = ep_square if ep_square < NUM_SQUARES else -1
+        board.past_keys = [int.from_bytes(data[i:i + 8], 'little') for i in range(NUM_SQUARES + 4, len(data), 8)]
+        board.refresh()
+        return board
+
+    def refresh(self):
+        """Recompute every derived field (king squares, hash, evaluation terms) after editing squares directly."""
+        self.locate_kings()
+        self.hash = self.compute_hash()
+        self.refresh_evaluation()
+
+    def refresh_evaluation(self):
+        """Recompute the incremental evaluation terms from scratch."""
+        self.mg = self.eg = self.phase = 0
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                self.mg += EVAL_MG[piece][sq]
+                self.eg += EVAL_EG[piece][sq]
+                self.phase += PHASE[piece]
+
+    def evaluate(self) -> int:
+        """Return the tapered material and piece-square score in centipawns (positive favours White)."""
+        phase = min(self.phase, PHASE_TOTAL)
+        return (self.mg * phase + self.eg * (PHASE_TOTAL - phase)) // PHASE_TOTAL
+
+    def locate_kings(self):
+        """Recompute the tracked king squares from the mailbox."""
+        self.kings = [self.squares.find(KING | WHITE), self.squares.find(KING | BLACK)]
+
+    def compute_hash(self) -> int:
+        """Compute the Zobrist hash of the position from scratch."""
+        key = 0
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                key ^= ZOBRIST_PIECES[piece][sq]
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+        return key
+
+    def make_move(self, move: int):
+        """Play a move in place and push the information needed to take it back."""
+        squares = self.squares
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        piece = squares[from_sq]
+        captured = squares[to_sq]
+        self.history.append((move, captured, self.hash, self.mg, self.eg, self.phase,
+                             self.castling, self.ep_square, self.halfmove))
+        key = self.hash ^ ZOBRIST_SIDE ^ ZOBRIST_PIECES[piece][from_sq]
+        self.mg -= EVAL_MG[piece][from_sq]
+        self.eg -= EVAL_EG[piece][from_sq]
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+            self.ep_square = -1
+        self.halfmove += 1
+        if captured:
+            key ^= ZOBRIST_PIECES[captured][to_sq]
+            self.mg -= EVAL_MG[captured][to_sq]
+            self.eg -= EVAL_EG[captured][to_sq]
+            self.phase -= PHASE[captured]
+            self.halfmove = 0
+        placed = piece
+        if flag:
+            if flag == EN_PASSANT_FLAG:
+                # The captured pawn stands beside the origin, behind the target square
+                victim_sq = to_sq + 8 if piece == PAWN | WHITE else to_sq - 8
+                victim = squares[victim_sq]
+                squares[victim_sq] = EMPTY
+                key ^= ZOBRIST_PIECES[victim][victim_sq]
+                self.mg -= EVAL_MG[victim][victim_sq]
+                self.eg -= EVAL_EG[victim][victim_sq]
+            elif flag == CASTLE_FLAG:
+                rook_from, rook_to = CASTLING_ROOKS[to_sq]
+                rook = squares[rook_from]
+                squares[rook_from] = EMPTY
+                squares[rook_to] = rook
+                key ^= ZOBRIST_PIECES[rook][rook_from] ^ ZOBRIST_PIECES[rook][rook_to]
+                self.mg += EVAL_MG[rook][rook_to] - EVAL_MG[rook][rook_from]
+                self.eg += EVAL_EG[rook][rook_to] - EVAL_EG[rook][rook_from]
+            else:
+                placed = flag | (piece & COLOR_MASK)
+                self.phase += PHASE[placed]
+        key ^= ZOBRIST_PIECES[placed][to_sq]
+        self.mg += EVAL_MG[placed][to_sq]
+        self.eg += EVAL_EG[placed][to_sq]
+        kind = piece & TYPE_MASK
+        if kind == PAWN:
+            self.halfmove = 0
+            if to_sq - from_sq == 16 or from_sq - to_sq == 16:
+                # The en-passant square only counts (and is hashed) when an enemy pawn could take there
+                ep_square = (from_sq + to_sq) >> 1
+                enemy_pawn = piece ^ COLOR_MASK
+                for sq in PAWN_CAPTURES[piece & COLOR_MASK][ep_square]:
+                    if squares[sq] == enemy_pawn:
+                        self.ep_square = ep_square
+                        key ^= ZOBRIST_EP_FILE[ep_square & 7]
+                        break
+        elif kind == KING:
+            self.kings[piece >> 3] = to_sq
+        castling = self.castling
+        if castling:
+            rights = castling & CASTLING_KEEP[from_sq] & CASTLING_KEEP[to_sq]
+            if rights != castling:
+                key ^= ZOBRIST_CASTLING[castling] ^ ZOBRIST_CASTLING[rights]
+                self.castling = rights
+        self.hash = key
+        squares[to_sq] = placed
+        squares[from_sq] = EMPTY
+        if self.side == BLACK:
+            self.fullmove += 1
+        self.side ^= COLOR_MASK
+
+    def unmake_move(self):
+        """Take back the last move played with make_move."""
+        (move, captured, self.hash, self.mg, self.eg, self.phase,
+         self.castling, self.ep_square, self.halfmove) = self.history.pop()
+        squares = self.squares
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        flag = move >> 12
+        piece = squares[to_sq]
+        if flag:
+            if flag == EN_PASSANT_FLAG:
+                if piece == PAWN | WHITE:
+                    squares[to_sq + 8] = PAWN | BLACK
+                else:
+                    squares[to_sq - 8] = PAWN | WHITE
+            elif flag == CASTLE_FLAG:
+                rook_from, rook_to = CASTLING_ROOKS[to_sq]
+                squares[rook_from] = squares[rook_to]
+                squares[rook_to] = EMPTY
+            else:
+                piece = PAWN | (piece & COLOR_MASK)
+        squares[from_sq] = piece
+        squares[to_sq] = captured
+        if piece & TYPE_MASK == KING:
+            self.kings[piece >> 3] = from_sq
+        self.side ^= COLOR_MASK
+        if self.side == BLACK:
+            self.fullmove -= 1
+
+    def make_null_move(self):
+        """Pass the turn without moving a piece, for null-move pruning; take it back with unmake_null_move.
+
+        The halfmove clock restarts, so no position from before the pass counts as a repetition.
+        """
+        self.history.append((NULL_MOVE, EMPTY, self.hash, self.mg, self.eg, self.phase,
+                             self.castling, self.ep_square, self.halfmove))
+        key = self.hash ^ ZOBRIST_SIDE
+        if self.ep_square >= 0:
+            key ^= ZOBRIST_EP_FILE[self.ep_square & 7]
+            self.ep_square = -1
+        self.hash = key
+        self.halfmove = 0
+        self.side ^= COLOR_MASK
+
+    def unmake_null_move(self):
+        """Take back a pass played with make_null_move."""
+        (_, _, self.hash, self.mg, self.eg, self.phase,
+         self.castling, self.ep_square, self.halfmove) = self.history.pop()
+        self.side ^= COLOR_MASK
+
+    def has_non_pawn_material(self, color: int) -> bool:
+        """Check whether the colour has a knight, bishop, rook or queen (a side without one risks zugzwang)."""
+        for piece in self.squares:
+            if piece & COLOR_MASK == color and KNIGHT <= piece & TYPE_MASK <= QUEEN:
+                return True
+        return False
+
+    def position_keys(self) -> List[int]:
+        """Return the hashes of every earlier position, oldest first."""
+        return self.past_keys + [entry[2] for entry in self.history]
+
+    def is_repetition(self, count: int = 1) -> bool:
+        """Check whether the current position occurred at least count times before.
+
+        Only positions since the last capture or pawn move can repeat, and only every second one has
+        the same side to move, so at most halfmove / 2 hashes are compared.
+        """
+        key = self.hash
+        history = self.history
+        past_keys = self.past_keys
+        played = len(history)
+        limit = min(self.halfmove, played + len(past_keys))
+        for back in range(2, limit + 1, 2):
+            earlier = history[played - back][2] if back <= played else past_keys[played - back]
+            if earlier == key:
+                count -= 1
+                if not count:
+                    return True
+        return False
+
+    def draw_reason(self) -> Optional[str]:
+        """Return why the position is drawn by rule ('fifty-move rule' or 'threefold repetition'), or None.
+
+        Checkmate takes precedence over the fifty-move rule, so callers test for it first.
+        """
+        if self.halfmove >= FIFTY_MOVE_PLIES:
+            return 'fifty-move rule'
+        if self.is_repetition(2):
+            return 'threefold repetition'
+        return None
+
+    def piece_moves(self, from_sq: int, moves: Optional[List[int]] = None) -> List[int]:
+        """Append the pseudo-legal moves of the piece on from_sq to moves (ignoring checks)."""
+        if moves is None:
+            moves = []
+        squares = self.squares
+        piece = squares[from_sq]
+        if not piece:
+            return moves
+        color = piece & COLOR_MASK
+        kind = piece & TYPE_MASK
+        append = moves.append
+
+        if kind == PAWN:
+            # Single step forward if empty, double step from the starting row if both squares are empty
+            step = -8 if color == WHITE else 8
+            to_sq = from_sq + step
+            promotes = from_sq >> 3 == (1 if color == WHITE else 6)
+            if 0 <= to_sq < NUM_SQUARES and not squares[to_sq]:
+                if promotes:
+                    for kind in PROMOTION_TYPES:
+                        append(from_sq | (to_sq << 6) | (kind << 12))
+                else:
+                    append(from_sq | (to_sq << 6))
+                    if from_sq >> 3 == (6 if color == WHITE else 1) and not squares[to_sq + step]:
+                        append(from_sq | ((to_sq + step) << 6))
+            # Diagonal captures, including en passant onto the square a pawn just skipped
+            for to_sq in PAWN_CAPTURES[color][from_sq]:
+                target = squares[to_sq]
+                if target and target & COLOR_MASK != color:
+                    if promotes:
+                        for kind in PROMOTION_TYPES:
+                            append(from_sq | (to_sq << 6) | (kind << 12))
+                    else:
+                        append(from_sq | (to_sq << 6))
+                elif to_sq == self.ep_square:
+                    append(from_sq | (to_sq << 6) | (EN_PASSANT_FLAG << 12))
+        elif kind == KNIGHT or kind == KING:
+            # Knights and kings jump to a fixed set of squares
+            for to_sq in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[from_sq]:
+                target = squares[to_sq]
+                if not target or target & COLOR_MASK != color:
+                    append(from_sq | (to_sq << 6))
+            if kind == KING and self.castling & CASTLING_RIGHTS[color]:
+                self.castling_moves(color, moves)
+        else:
+            # Sliders walk each ray until they hit a piece
+            rays = RAYS[from_sq]
+            for direction in SLIDER_DIRS[kind]:
+                for to_sq in rays[direction]:
+                    target = squares[to_sq]
+                    if not target:
+                        append(from_sq | (to_sq << 6))
+                    else:
+                        if target & COLOR_MASK != color:
+                            append(from_sq | (to_sq << 6))
+                        break
+        return moves
+
+    def pseudo_legal_moves(self, color: Optional[int] = None) -> List[int]:
+        """Return all pseudo-legal moves for the given colour (defaults to the side to move)."""
+        if color is None:
+            color = self.side
+        squares = self.squares
+        moves = []
+        for sq in range(NUM_SQUARES):
+            piece = squares[sq]
+            if piece and piece & COLOR_MASK == color:
+                self.piece_moves(sq, moves)
+        return moves
+
+    def castling_moves(self, color: int, moves: List[int]):
+        """Append the castling moves of color whose path is empty and whose king does not start or pass in check.
+
+        Whether the target square is attacked is left to the legality test, as for any king move.
+        """
+        squares = self.squares
+        enemy = color ^ COLOR_MASK
+        rights = self.castling
+        for right, side, king_from, king_to, rook_from, rook_to, between in CASTLES:
+            if (side != color or not rights & right or squares[king_from] != KING | color
+                    or squares[rook_from] != ROOK | color):
+                continue
+            if any(squares[sq] for sq in between):
+                continue
+            # The king crosses the rook's target square on its way
+            if self.is_attacked(king_from, enemy) or self.is_attacked(rook_to, enemy):
+                continue
+            moves.append(king_from | (king_to << 6) | (CASTLE_FLAG << 12))
+
+    def pseudo_legal_captures(self, color: Optional[int] = None) -> List[int]:
+        """Return the pseudo-legal captures for the given colour (defaults to the side to move).
+
+        These are the moves the quiescence search follows: captures, including en passant, and
+        promotions to a queen (with or without a capture); underpromotions are left out.
+        """
+        if color is None:
+            color = self.side
+        squares = self.squares
+        enemy = color ^ COLOR_MASK
+        moves = []
+        append = moves.append
+        for from_sq in range(NUM_SQUARES):
+            piece = squares[from_sq]
+            if not piece or piece & COLOR_MASK != color:
+                continue
+            kind = piece & TYPE_MASK
+            if kind == PAWN:
+                promotion = QUEEN << 12 if from_sq >> 3 == (1 if color == WHITE else 6) else 0
+                if promotion and not squares[from_sq + (-8 if color == WHITE else 8)]:
+                    append(from_sq | ((from_sq + (-8 if color == WHITE else 8)) << 6) | promotion)
+                for to_sq in PAWN_CAPTURES[color][from_sq]:
+                    target = squares[to_sq]
+                    if target and target & COLOR_MASK == enemy:
+                        append(from_sq | (to_sq << 6) | promotion)
+                    elif to_sq == self.ep_square:
+                        append(from_sq | (to_sq << 6) | (EN_PASSANT_FLAG << 12))
+            elif kind == KNIGHT or kind == KING:
+                for to_sq in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[from_sq]:
+                    target = squares[to_sq]
+                    if target and target & COLOR_MASK == enemy:
+                        append(from_sq | (to_sq << 6))
+            else:
+                # Only the first piece on each ray can be captured
+                rays = RAYS[from_sq]
+                for direction in SLIDER_DIRS[kind]:
+                    for to_sq in rays[direction]:
+                        target = squares[to_sq]
+                        if target:
+                            if target & COLOR_MASK == enemy:
+                                append(from_sq | (to_sq << 6))
+                            break
+        return moves
+
+    def king_square(self, color: int) -> int:
+        """Return the square of the given colour's king, or -1 if it is missing."""
+        return self.kings[color >> 3]
+
+    def is_attacked(self, square: int, by_color: int) -> bool:
+        """Check if the square is attacked by any piece of by_color, probing outward from the square."""
+        squares = self.squares
+        # Leapers: look for an attacker on the squares a knight or king could reach from here
+        knight = KNIGHT | by_color
+        for sq in KNIGHT_TARGETS[square]:
+            if squares[sq] == knight:
+                return True
+        king = KING | by_color
+        for sq in KING_TARGETS[square]:
+            if squares[sq] == king:
+                return True
+        # Pawns attack the squares an opposite-coloured pawn would capture on from here
+        pawn = PAWN | by_color
+        for sq in PAWN_CAPTURES[by_color ^ COLOR_MASK][square]:
+            if squares[sq] == pawn:
+                return True
+        # Sliders: the first piece along each ray must be a matching enemy slider
+        rays = RAYS[square]
+        queen = QUEEN | by_color
+        for direction in range(8):
+            slider = (ROOK if direction < 4 else BISHOP) | by_color
+            for sq in rays[direction]:
+                piece = squares[sq]
+                if piece:
+                    if piece == slider or piece == queen:
+                        return True
+                    break
+        return False
+
+    def in_check(self, color: int) -> bool:
+        """Check if the king of the given colour is attacked."""
+        king_sq = self.kings[color >> 3]
+        return king_sq >= 0 and self.is_attacked(king_sq, color ^ COLOR_MASK)
+
+    def is_legal(self, move: int) -> bool:
+        """Check that a pseudo-legal move does not leave the mover's king in check."""
+        color = self.squares[move & 63] & COLOR_MASK
+        self.make_move(move)
+        legal = not self.in_check(color)
+        self.unmake_move()
+        return legal
+
+    def check_and_pins(self, color: int):
+        """Return (check mask, pins) for the given colour's king.
+
+        The check mask is a bit set of the squares a non-king move must land on (every square when
+        not in check, the checker and the blocking squares for a single check, nothing for a double
+        check). pins maps each pinned piece's square to the bit set of squares it may still move to.
+        """
+        squares = self.squares
+        king_sq = self.kings[color >> 3]
+        if king_sq < 0:
+            return ALL_SQUARES, {}
+        enemy = color ^ COLOR_MASK
+        check_mask = ALL_SQUARES
+        checkers = 0
+        pins = {}
+        # Knight and pawn checks can only be answered by capturing the checker
+        knight = KNIGHT | enemy
+        for sq in KNIGHT_TARGETS[king_sq]:
+            if squares[sq] == knight:
+                check_mask = 1 << sq
+                checkers += 1
+        pawn = PAWN | enemy
+        for sq in PAWN_CAPTURES[color][king_sq]:
+            if squares[sq] == pawn:
+                check_mask = 1 << sq
+                checkers += 1
+        # Walk each ray from the king: an enemy slider behind zero own pieces checks, behind one it pins
+        rays = RAYS[king_sq]
+        queen = QUEEN | enemy
+        for direction in range(8):
+            slider = (ROOK if direction < 4 else BISHOP) | enemy
+            line = 0
+            blocker = -1
+            for sq in rays[direction]:
+                line |= 1 << sq
+                piece = squares[sq]
+                if not piece:
+                    continue
+                if piece & COLOR_MASK == color:
+                    if blocker >= 0:
+                        break
+                    blocker = sq
+                elif piece == slider or piece == queen:
+                    if blocker >= 0:
+                        pins[blocker] = line
+                    else:
+                        check_mask = line
+                        checkers += 1
+                    break
+                else:
+                    break
+        if checkers > 1:
+            check_mask = 0
+        return check_mask, pins
+
+    def king_step_is_safe(self, king_sq: int, to_sq: int, enemy: int) -> bool:
+        """Check that the king may step to to_sq; it is lifted first so it cannot block a slider's ray."""
+        squares = self.squares
+        king = squares[king_sq]
+        squares[king_sq] = EMPTY
+        safe = not self.is_attacked(to_sq, enemy)
+        squares[king_sq] = king
+        return safe
+
+    def filter_legal(self, moves: List[int], color: int) -> List[int]:
+        """Keep the legal moves of color from a list of its pseudo-legal moves in a single pass."""
+        check_mask, pins = self.check_and_pins(color)
+        king_sq = self.kings[color >> 3]
+        enemy = color ^ COLOR_MASK
+        legal = []
+        append = legal.append
+        for move in moves:
+            from_sq = move & 63
+            to_sq = (move >> 6) & 63
+            if from_sq == king_sq:
+                if self.king_step_is_safe(king_sq, to_sq, enemy):
+                    append(move)
+            elif move >> 12 == EN_PASSANT_FLAG:
+                # Two pawns leave the rank at once, which the pin scan cannot see: play it out
+                if self.is_legal(move):
+                    append(move)
+            elif (check_mask >> to_sq) & 1 and (from_sq not in pins or (pins[from_sq] >> to_sq) & 1):
+                append(move)
+        return legal
+
+    def legal_moves(self, color: Optional[int] = None) -> List[int]:
+        """Return all legal moves for the given colour (defaults to the side to move)."""
+        if color is None:
+            color = self.side
+        return self.filter_legal(self.pseudo_legal_moves(color), color)
+
+    def legal_captures(self, color: Optional[int] = None) -> List[int]:
+        """Return the legal captures for the given colour (defaults to the side to move)."""
+        if color is None:
+            color = self.side
+        return self.filter_legal(self.pseudo_legal_captures(color), color)
+
+    def legal_piece_moves(self, from_sq: int) -> List[int]:
+        """Return the legal moves of the piece on from_sq."""
+        piece = self.squares[from_sq]
+        if not piece:
+            return []
+        return self.filter_legal(self.piece_moves(from_sq), piece & COLOR_MASK)
+
+    def _least_valuable_attacker(self, square: int, color: int, removed: int) -> int:
+        """Return the square of color's cheapest piece attacking square, ignoring pieces in the removed bit set."""
+        squares = self.squares
+        for sq in PAWN_CAPTURES[color ^ COLOR_MASK][square]:
+            if squares[sq] == PAWN | color and not (removed >> sq) & 1:
+                return sq
+        for sq in KNIGHT_TARGETS[square]:
+            if squares[sq] == KNIGHT | color and not (removed >> sq) & 1:
+                return sq
+        # Sliders: the first piece on each ray that has not been exchanged off yet (this finds x-rays)
+        best_sq = -1
+        best_kind = KING + 1
+        rays = RAYS[square]
+        for direction in range(8):
+            slider = ROOK if direction < 4 else BISHOP
+            for sq in rays[direction]:
+                piece = squares[sq]
+                if not piece or (removed >> sq) & 1:
+                    continue
+                kind = piece & TYPE_MASK
+                if piece & COLOR_MASK == color and (kind == slider or kind == QUEEN) and kind < best_kind:
+                    best_sq, best_kind = sq, kind
+                break
+        if best_sq >= 0:
+            return best_sq
+        for sq in KING_TARGETS[square]:
+            if squares[sq] == KING | color and not (removed >> sq) & 1:
+                return sq
+        return -1
+
+    def static_exchange(self, move: int) -> int:
+        """Static exchange evaluation: the material the mover expects to gain on the target square.
+
+        Both sides keep recapturing on the target square with their least valuable attacker and may
+        stop whenever recapturing would lose material. Values come from PIECE_VALUES.
+        """
+        squares = self.squares
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        gain = [TYPE_VALUES[squares[to_sq] & TYPE_MASK]]
+        attacker_value = TYPE_VALUES[squares[from_sq] & TYPE_MASK]
+        removed = 1 << from_sq
+        color = (squares[from_sq] & COLOR_MASK) ^ COLOR_MASK
+        while True:
+            sq = self._least_valuable_attacker(to_sq, color, removed)
+            if sq < 0:
+                break
+            # Score for this side if it recaptures the piece that just landed on the square and stops there
+            gain.append(attacker_value - gain[-1])
+            removed |= 1 << sq
+            attacker_value = TYPE_VALUES[squares[sq] & TYPE_MASK]
+            color ^= COLOR_MASK
+        # Each side only recaptures when it pays off
+        for i in range(len(gain) - 1, 0, -1):
+            gain[i - 1] = -max(-gain[i - 1], gain[i])
+        return gain[0]
@@ -0,0 +1,169 @@
+import argparse
+import bisect
+import mmap
+import random
+import struct
+import sys
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from board import STARTING_FEN, Board, move_name
+from notation import parse_san, read_pgn
+
+# Polyglot-style entry: 64-bit position key, 16-bit move, 16-bit weight, 32-bit learn field, big-endian.
+# Keys are this engine's Zobrist hashes and moves its packed move ints, so the files are not
+# interchangeable with Polyglot books made for other programs.
+ENTRY = struct.Struct('>QHHI')
+ENTRY_SIZE = ENTRY.size  # 16 bytes
+DEFAULT_BOOK_PLIES = 16  # Plies of each game entered into a book
+MAX_WEIGHT = 0xFFFF
+
+
+class _KeyView:
+    """Sequence view over the keys of a mapped book, so bisect can search the file in place."""
+
+    __slots__ = ('data', 'count')
+
+    def __init__(self, data, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        return ENTRY.unpack_from(self.data, index * ENTRY_SIZE)[0]
+
+
+class OpeningBook:
+    """Read-only opening book: a file of entries sorted by key, searched by bisection through mmap.
+
+    Nothing is read up front; only the pages touched by a lookup are loaded, and processes mapping the
+    same file share them through the page cache.
+    """
+
+    def __init__(self, path: str):
+        """Map the book file at path."""
+        self.path = path
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        if size % ENTRY_SIZE:
+            self.file.close()
+            raise ValueError(f"Corrupt opening book {path!r}: size is not a multiple of {ENTRY_SIZE}")
+        # An empty file cannot be mapped; it is simply a book without entries
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.keys = _KeyView(self.data, size // ENTRY_SIZE)
+
+    def close(self):
+        """Unmap and close the book file."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def entries(self, key: int) -> List[Tuple[int, int]]:
+        """Return the (move, weight) entries stored for a position key."""
+        index = bisect.bisect_left(self.keys, key)
+        entries = []
+        while index < len(self.keys):
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            index += 1
+        return entries
+
+    def moves(self, board: Board) -> List[Tuple[int, int]]:
+        """Return the (move, weight) book entries that are legal in the position."""
+        legal = set(board.legal_moves())
+        # Checking legality guards against hash collisions and books built by older move encodings
+        return [(move, weight) for move, weight in self.entries(board.hash) if move in legal]
+
+    def choose(self, board: Board, rng: Optional[random.Random] = None) -> Optional[int]:
+        """Pick a book move for the position at random in proportion to its weight, or None if out of book."""
+        moves = [(move, weight) for move, weight in self.moves(board) if weight]
+        if not moves:
+            return None
+        rng = rng or random
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def build_book(pgn_lines: Iterable[str], path: str, plies: int = DEFAULT_BOOK_PLIES, min_games: int = 1,
+               board_class=Board) -> Tuple[int, int]:
+    """Compile the openings of a PGN collection into a book file.
+
+    Every (position, move) pair from the first plies of each game is counted; pairs played in fewer than
+    min_games games are dropped and the rest are weighted by their count, scaled to fit 16 bits.
+    A game is followed only while its moves can be read, and games from custom start positions are skipped.
+    Returns (games read, entries written).
+    """
+    counts = Counter()
+    games = 0
+    for tags, moves in read_pgn(pgn_lines):
+        games += 1
+        if tags.get('SetUp') == '1' and tags.get('FEN', STARTING_FEN) != STARTING_FEN:
+            continue
+        board = board_class.from_fen(STARTING_FEN)
+        for text in moves[:plies]:
+            try:
+                move = parse_san(board, text)
+            except ValueError:
+                break
+            counts[(board.hash, move)] += 1
+            board.make_move(move)
+
+    kept = [(key, move, count) for (key, move), count in counts.items() if count >= min_games]
+    scale = max((count for _, _, count in kept), default=1)
+    kept.sort(key=lambda entry: (entry[0], -entry[2], entry[1]))
+    with open(path, 'wb') as f:
+        for key, move, count in kept:
+            weight = max(1, count * MAX_WEIGHT // scale) if scale > MAX_WEIGHT else count
+            f.write(ENTRY.pack(key, move, weight, 0))
+    return games, len(kept)
+
+
+def main():
+    """Command-line entry point: build a book from PGN, or list the book moves of a position."""
+    parser = argparse.ArgumentParser(description="Build or query an opening book.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="compile a book from PGN files")
+    build.add_argument('pgn', nargs='+', help="PGN files ('-' reads standard input)")
+    build.add_argument('-o', '--output', required=True, help="book file to write")
+    build.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES, help="plies of each game to enter")
+    build.add_argument('--min-games', type=int, default=1, help="drop moves played in fewer games than this")
+    probe = commands.add_parser('probe', help="list the book moves of a position")
+    probe.add_argument('book', help="book file")
+    probe.add_argument('--fen', default=STARTING_FEN, help="position to look up")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        def lines():
+            for name in args.pgn:
+                if name == '-':
+                    yield from sys.stdin
+                else:
+                    with open(name, encoding='utf-8', errors='replace') as f:
+                        yield from f
+        games, entries = build_book(lines(), args.output, args.plies, args.min_games)
+        print(f"{games} games, {entries} entries written to {args.output}")
+    else:
+        with OpeningBook(args.book) as book:
+            board = Board.from_fen(args.fen)
+            moves = sorted(book.moves(board), key=lambda entry: -entry[1])
+            total = sum(weight for _, weight in moves) or 1
+            for move, weight in moves:
+                print(f"{move_name(move)}  weight {weight:>5}  {weight / total:>6.1%}")
+            if not moves:
+                print("Position not in book")
+
+
+if __name__ == "__main__":
+    main()
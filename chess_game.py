@@ -1,10 +1,17 @@
 import sys
+import json
 from typing import List, Tuple, Optional
 import random
-from copy import deepcopy
 
-# Constants
-BOARD_SIZE = 8  # Size of the chessboard (8x8)
+from board import (BOARD_SIZE, NUM_SQUARES, PIECE_CODES, PIECE_NAMES, COLOR_CODES, COLOR_NAMES,
+                   TYPE_MASK, COLOR_MASK, STARTING_FEN, CASTLE_FLAG, EN_PASSANT_FLAG, CASTLES, CASTLING_ROOKS,
+                   Board, square_index, square_coords, move_from, move_to, move_flag, move_promotion)
+from bitboard import BitboardBoard
+from search import Search, SearchStats
+from parallel import ParallelSearch
+from book import OpeningBook
+from notation import move_to_san, parse_san, read_pgn, write_pgn
+from profiler import Profiler
 
 # ANSI color codes for terminal display
 class Colors:
@@ -21,32 +28,93 @@ class Colors:
     BG_DARK = "\033[100m"  # Dark background for squares
 
 # AI Constants
-# Dictionary to assign values to pieces for board evaluation in the AI's decision-making
-PIECE_VALUES = {
-    'pawn': 1,
-    'knight': 3,
-    'bishop': 3,
-    'rook': 5,
-    'queen': 9,
-    'king': 100
-}
+AI_SEARCH_DEPTH = 3  # Default maximum plies searched by the AI
+
+# Letters accepted after a move to choose the promotion piece (e.g., 'e7e8n')
+PROMOTION_CHOICES = {'q': 'queen', 'r': 'rook', 'b': 'bishop', 'n': 'knight'}
 
 class Piece:
     def __init__(self, piece_type: str, color: str):
         """Initialize a chess piece with its type and color."""
         self.type = piece_type  # Type of the piece (e.g., 'pawn', 'king')
         self.color = color      # Color of the piece ('white' or 'black')
-        self.has_moved = False  # Track if the piece has moved (useful for castling or pawn double moves)
+        self.has_moved = False  # Track if the piece has moved (a king or rook that has moved can no longer castle)
+
+# Move generators selectable through ChessGame(engine=...)
+ENGINES = {
+    'mailbox': Board,         # 64-square array with precomputed rays
+    'bitboard': BitboardBoard  # 64-bit sets per piece with precomputed attack tables
+}
 
 class ChessGame:
-    def __init__(self):
-        """Initialize the chess game state."""
+    def __init__(self, engine: str = 'mailbox', max_depth: int = AI_SEARCH_DEPTH,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None, workers: int = 1,
+                 book: Optional[str] = None, fen: Optional[str] = None, stats_log: Optional[str] = None,
+                 profile: bool = False, tablebase: Optional[str] = None):
+        """Initialize the chess game state.
+
+        The AI deepens its search iteratively up to max_depth plies; time_limit (seconds per move)
+        and node_limit cap each search, in which case the deepest completed iteration is played.
+        With workers > 1 the root moves are searched in parallel by that many worker processes.
+        book is the path of an opening book file consulted before searching. The game starts from the
+        given FEN position, or from the initial position if there is none.
+        Every AI move leaves its search statistics in last_stats; with stats_log they are also appended
+        to that file as one JSON line per move. profile=True times move generation, check detection,
+        evaluation and board copies during the AI's searches (slow; see profiler.Profiler).
+        tablebase is a directory of endgame tables (see tablebase.py); once the material is covered by
+        them the AI plays perfectly.
+        """
+        self.board_class = ENGINES[engine]  # Compact board implementation used for move generation and search
         self.board = self._initial_board()  # Set up the initial chessboard
+        self.position = self.board_class.from_grid(self.board)  # Compact copy of the board used for move generation and search
         self.current_player = 'white'       # Start with White's turn
         self.move_history = []              # List to store the history of moves
+        self.san_history = []               # The same moves in standard algebraic notation, for PGN export
+        self.start_fen = STARTING_FEN       # Position the game started from
         self.is_check = False               # Flag to indicate if the current player is in check
         self.is_checkmate = False           # Flag to indicate if the game has ended in checkmate
         self.is_stalemate = False           # Flag to indicate if the game has ended in stalemate
+        self.draw_reason = None             # 'fifty-move rule' or 'threefold repetition' once the game is drawn by rule
+        # AI search, created on first use (see search); the single-process search keeps its
+        # transposition table between turns
+        self._search = None
+        self.workers = workers              # Worker processes of the AI search (1 searches in this process)
+        self.tablebase = tablebase          # Optional directory of endgame tables probed by the AI search
+        self.max_depth = max_depth          # Deepest iteration the AI searches
+        self.time_limit = time_limit        # Optional wall-clock budget per AI move, in seconds
+        self.node_limit = node_limit        # Optional node budget per AI move
+        self.book = OpeningBook(book) if book else None  # Optional memory-mapped opening book
+        self.stats_log = stats_log          # Optional file receiving one JSON line of search statistics per AI move
+        self.last_stats = None              # SearchStats of the last AI move (None for a book move)
+        # Opt-in timer of the board operations behind the search, installed only while the AI searches
+        self.profiler = Profiler() if profile else None
+        if fen is not None:
+            self.load_fen(fen)
+
+    @property
+    def search(self):
+        """The AI's search, created with its transposition table (or worker pool) when first needed.
+
+        Games that never search, such as the server's sessions, so never pay for one.
+        """
+        if self._search is None:
+            self._search = (ParallelSearch(self.workers, tablebase=self.tablebase) if self.workers > 1
+                            else Search(tablebase=self.tablebase))
+        return self._search
+
+    def close(self):
+        """Release the AI's resources: the worker processes of a parallel search and any open book or tables."""
+        if self._search is not None:
+            self._search.close()
+            self._search = None
+        if self.book is not None:
+            self.book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _initial_board(self):
         """Set up the initial chessboard with pieces in their starting positions."""
@@ -64,6 +132,73 @@ class ChessGame:
             board[7][i] = Piece(back_row[i], 'white')
         return board
 
+    @staticmethod
+    def _grid_from(position: Board):
+        """Build the 8x8 grid of Piece objects for a compact board.
+
+        Kings and rooks keep has_moved False only while they still hold a castling right, and pawns
+        while they stand on their starting rank.
+        """
+        board = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        for sq in range(NUM_SQUARES):
+            code = position.squares[sq]
+            if code:
+                row, col = square_coords(sq)
+                piece = Piece(PIECE_NAMES[code & TYPE_MASK], COLOR_NAMES[code & COLOR_MASK])
+                piece.has_moved = piece.type != 'pawn' or row != (6 if piece.color == 'white' else 1)
+                board[row][col] = piece
+        for right, _, king_from, _, rook_from, _, _ in CASTLES:
+            if position.castling & right:
+                for sq in (king_from, rook_from):
+                    board[sq >> 3][sq & 7].has_moved = False
+        return board
+
+    def load_fen(self, fen: str):
+        """Set the game up from a FEN string, clearing the move history.
+
+        Raises ValueError if the FEN is malformed.
+        """
+        self.position = self.board_class.from_fen(fen)
+        self.board = self._grid_from(self.position)
+        self.current_player = COLOR_NAMES[self.position.side]
+        self.start_fen = self.position.to_fen()
+        self.move_history = []
+        self.san_history = []
+        self._update_status()
+
+    def to_fen(self) -> str:
+        """Return the FEN string of the current position."""
+        return self.position.to_fen()
+
+    def load_pgn(self, text: str):
+        """Set the game up from the first game of a PGN text: its FEN tag (if any), then its main line.
+
+        Raises ValueError if the text holds no game or one of its moves is not legal.
+        """
+        games = read_pgn(text.splitlines())
+        tags, moves = next(games, (None, None))
+        if tags is None:
+            raise ValueError("No PGN game found")
+        self.load_fen(tags.get('FEN', STARTING_FEN))
+        for san in moves:
+            self._play(parse_san(self.position, san))
+
+    def result(self) -> str:
+        """Return the PGN result of the game: '1-0', '0-1', '1/2-1/2', or '*' while it is still going on."""
+        if self.is_checkmate:
+            return '0-1' if self.current_player == 'white' else '1-0'
+        if self.is_stalemate or self.draw_reason:
+            return '1/2-1/2'
+        return '*'
+
+    def to_pgn(self, tags: Optional[dict] = None) -> str:
+        """Return the game so far as PGN text; tags adds to or overrides the generated tag pairs."""
+        pgn_tags = {'Event': 'Console Chess', 'White': 'Player', 'Black': 'AI', 'Result': self.result()}
+        if self.start_fen != STARTING_FEN:
+            pgn_tags.update(SetUp='1', FEN=self.start_fen)
+        pgn_tags.update(tags or {})
+        return write_pgn(pgn_tags, self.san_history)
+
     def display_board(self):
         """Display the current state of the chessboard and game status in the console with enhanced formatting."""
         # Clear the console for a clean display (works on Unix-based systems and Windows)
@@ -137,9 +272,17 @@ class ChessGame:
             print(f"{Colors.RED}{Colors.BOLD}Checkmate! {winner} wins!{Colors.RESET}")
         elif self.is_stalemate:
             print(f"{Colors.YELLOW}{Colors.BOLD}Stalemate! Game is a draw!{Colors.RESET}")
+        elif self.draw_reason:
+            print(f"{Colors.YELLOW}{Colors.BOLD}Draw by the {self.draw_reason}!{Colors.RESET}")
         elif self.is_check:
             print(f"{Colors.RED}Check!{Colors.RESET}")
 
+        # Summarise the AI's last search
+        if self.last_stats is not None:
+            stats = self.last_stats
+            print(f"{Colors.CYAN}AI searched depth {stats.depth}: {stats.nodes} nodes in {stats.seconds:.2f}s "
+                  f"({stats.nps:.0f} nodes/s), score {stats.score}{Colors.RESET}")
+
         # Display move history with a cleaner format
         if self.move_history:
             print(f"\n{Colors.BLUE}{Colors.BOLD}Move History:{Colors.RESET}")
@@ -151,233 +294,189 @@ class ChessGame:
                 print(f"{Colors.CYAN}{move_num:2d}.{Colors.RESET} {Colors.WHITE}White: {white_move:<20}{Colors.RESET} {Colors.BLACK}Black: {black_move}{Colors.RESET}")
         print()
 
+    def _position_for(self, board) -> Board:
+        """Return a compact Board for the given board (the live game board maps to self.position)."""
+        if isinstance(board, Board):
+            return board
+        if board is None or board is self.board:
+            return self.position
+        return self.board_class.from_grid(board, self.current_player)
+
     def get_basic_moves(self, pos: Tuple[int, int], board) -> List[List[int]]:
         """Calculate all possible moves for a piece at the given position (ignoring checks)."""
-        row, col = pos
-        piece = board[row][col]
-        if not piece:
-            return []  # Return empty list if there's no piece at the position
-
-        moves = []  # List to store possible moves
-        # Define movement directions for pieces that move in straight or diagonal lines
-        directions = {
-            'rook': [(0, 1), (0, -1), (1, 0), (-1, 0)],  # Horizontal and vertical
-            'bishop': [(1, 1), (1, -1), (-1, 1), (-1, -1)],  # Diagonal
-            'queen': [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)],  # Both
-            'knight': [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)],  # L-shape
-            'king': [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]  # One square in any direction
-        }
-
-        # Handle pawn moves (forward moves and captures)
-        if piece.type == 'pawn':
-            direction = -1 if piece.color == 'white' else 1  # White moves up, Black moves down
-            # Single step forward if the square is empty
-            if 0 <= row + direction < 8 and not board[row + direction][col]:
-                moves.append([row + direction, col])
-                # Double step from starting position if both squares are empty
-                if ((piece.color == 'white' and row == 6) or 
-                    (piece.color == 'black' and row == 1)):
-                    if not board[row + 2 * direction][col]:
-                        moves.append([row + 2 * direction, col])
-            # Diagonal captures
-            for dcol in [-1, 1]:
-                new_row, new_col = row + direction, col + dcol
-                if (0 <= new_row < 8 and 0 <= new_col < 8 and 
-                    board[new_row][new_col] and 
-                    board[new_row][new_col].color != piece.color):
-                    moves.append([new_row, new_col])
-        
-        # Handle other pieces (rook, bishop, queen, knight, king)
-        elif piece.type in directions:
-            for dr, dc in directions[piece.type]:
-                if piece.type == 'knight':
-                    # Knights move in an L-shape and can jump over pieces
-                    new_row, new_col = row + dr, col + dc
-                    if (0 <= new_row < 8 and 0 <= new_col < 8):
-                        target = board[new_row][new_col]
-                        if not target or target.color != piece.color:
-                            moves.append([new_row, new_col])
-                else:
-                    # Rooks, bishops, queens, and kings move along their respective directions
-                    new_row, new_col = row + dr, col + dc
-                    while 0 <= new_row < 8 and 0 <= new_col < 8:
-                        target = board[new_row][new_col]
-                        if not target:
-                            moves.append([new_row, new_col])
-                        elif target.color != piece.color:
-                            moves.append([new_row, new_col])
-                            break
-                        else:
-                            break
-                        if piece.type == 'king':
-                            break  # Kings only move one square
-                        new_row, new_col = new_row + dr, new_col + dc
-
-        return moves
+        position = self._position_for(board)
+        moves = position.piece_moves(square_index(pos[0], pos[1]))
+        return self._targets(moves)
 
     def is_square_attacked(self, board, square: List[int], attacking_color: str) -> bool:
         """Check if the given square is attacked by any piece of the attacking color."""
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece = board[row][col]
-                if piece and piece.color == attacking_color:
-                    moves = self.get_basic_moves([row, col], board)
-                    if square in moves:
-                        return True
-        return False
+        position = self._position_for(board)
+        return position.is_attacked(square_index(square[0], square[1]), COLOR_CODES[attacking_color])
 
     def is_king_in_check(self, board, color: str) -> bool:
         """Check if the king of the given color is in check."""
-        king_pos = None
-        # Find the king's position
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece = board[row][col]
-                if piece and piece.type == 'king' and piece.color == color:
-                    king_pos = [row, col]
-                    break
-            if king_pos:
-                break
-        opponent_color = 'black' if color == 'white' else 'white'
-        return self.is_square_attacked(board, king_pos, opponent_color)
+        return self._position_for(board).in_check(COLOR_CODES[color])
 
     def calculate_valid_moves(self, pos: Tuple[int, int], board=None) -> List[List[int]]:
         """Calculate all legal moves for a piece at the given position (considering checks)."""
-        if board is None:
-            board = self.board
-        row, col = pos
-        piece = board[row][col]
-        if not piece:
-            return []
-
-        # Get all possible moves
-        moves = self.get_basic_moves(pos, board)
-        legal_moves = []
-        # Filter moves to ensure they don't leave the king in check
+        position = self._position_for(board)
+        # Legality is tested by making and unmaking each move in place, no board copies needed
+        moves = position.legal_piece_moves(square_index(pos[0], pos[1]))
+        return self._targets(moves)
+
+    @staticmethod
+    def _targets(moves: List[int]) -> List[List[int]]:
+        """Return the target squares of packed moves as [row, col] pairs, once each (promotions share one)."""
+        targets = []
         for move in moves:
-            test_board = deepcopy(board)
-            test_board[move[0]][move[1]] = test_board[row][col]
-            test_board[row][col] = None
-            if not self.is_king_in_check(test_board, piece.color):
-                legal_moves.append(move)
-        return legal_moves
+            target = square_coords(move_to(move))
+            if target not in targets:
+                targets.append(target)
+        return targets
 
     def is_checkmate_or_stalemate(self, board, color: str) -> Tuple[bool, bool]:
         """Check if the current position is checkmate or stalemate for the given color."""
-        has_legal_moves = False
-        # Check if the player has any legal moves
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece = board[row][col]
-                if piece and piece.color == color:
-                    moves = self.calculate_valid_moves([row, col], board)
-                    if moves:
-                        has_legal_moves = True
-                        break
-            if has_legal_moves:
-                break
-        is_check = self.is_king_in_check(board, color)
+        position = self._position_for(board)
+        code = COLOR_CODES[color]
+        has_legal_moves = any(position.is_legal(move) for move in position.pseudo_legal_moves(code))
+        is_check = position.in_check(code)
         # Checkmate: in check and no legal moves; Stalemate: not in check and no legal moves
         return (is_check and not has_legal_moves, not is_check and not has_legal_moves)
 
     def evaluate_board(self, board) -> float:
-        """Evaluate the board for the AI by summing piece values (positive for White, negative for Black)."""
-        score = 0
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece = board[row][col]
-                if piece:
-                    value = PIECE_VALUES[piece.type]
-                    score += value if piece.color == 'white' else -value
-        return score
+        """Evaluate the board for the AI in centipawns (positive for White, negative for Black).
+
+        Material and tapered middlegame/endgame piece-square scores are kept up to date by the compact
+        board on every move, so this is a constant-time lookup rather than a scan of the board.
+        """
+        return self._position_for(board).evaluate()
 
     def get_all_moves(self, board, color: str) -> List[Tuple[List[int], List[int]]]:
         """Get all possible legal moves for the given color."""
-        moves = []
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece = board[row][col]
-                if piece and piece.color == color:
-                    valid_moves = self.calculate_valid_moves([row, col], board)
-                    moves.extend([([row, col], move) for move in valid_moves])
-        return moves
-
-    def make_ai_move(self):
-        """Make a move for the AI using the Min-Max algorithm with Alpha-Beta Pruning."""
-        def minimax(board, depth: int, alpha: float, beta: float, maximizing: bool) -> Tuple[float, Optional[Tuple[List[int], List[int]]]]:
-            """Min-Max algorithm with Alpha-Beta Pruning to find the best move."""
-            if depth == 0:
-                return self.evaluate_board(board), None  # Base case: evaluate the board
-
-            if maximizing:
-                # Maximizing player (White)
-                max_eval = float('-inf')
-                best_move = None
-                for from_pos, to_pos in self.get_all_moves(board, 'white'):
-                    new_board = deepcopy(board)
-                    new_board[to_pos[0]][to_pos[1]] = new_board[from_pos[0]][from_pos[1]]
-                    new_board[from_pos[0]][from_pos[1]] = None
-                    eval, _ = minimax(new_board, depth - 1, alpha, beta, False)
-                    if eval > max_eval:
-                        max_eval = eval
-                        best_move = (from_pos, to_pos)
-                    alpha = max(alpha, eval)
-                    if beta <= alpha:
-                        break  # Alpha-Beta pruning
-                return max_eval, best_move
-            else:
-                # Minimizing player (Black)
-                min_eval = float('inf')
-                best_move = None
-                for from_pos, to_pos in self.get_all_moves(board, 'black'):
-                    new_board = deepcopy(board)
-                    new_board[to_pos[0]][to_pos[1]] = new_board[from_pos[0]][from_pos[1]]
-                    new_board[from_pos[0]][from_pos[1]] = None
-                    eval, _ = minimax(new_board, depth - 1, alpha, beta, True)
-                    if eval < min_eval:
-                        min_eval = eval
-                        best_move = (from_pos, to_pos)
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break  # Alpha-Beta pruning
-                return min_eval, best_move
+        position = self._position_for(board)
+        # A promotion is listed once; make_move promotes to a queen unless told otherwise
+        return [(square_coords(move_from(move)), square_coords(move_to(move)))
+                for move in position.legal_moves(COLOR_CODES[color])
+                if move_promotion(move) in (0, PIECE_CODES['queen'])]
+
+    def make_ai_move(self) -> Optional[SearchStats]:
+        """Make a move for the AI using the Min-Max algorithm with Alpha-Beta Pruning.
 
+        Returns the statistics of the search, or None if the move came from the opening book.
+        """
         print(f"{Colors.BLUE}AI is thinking...{Colors.RESET}")
-        # Use Min-Max with a depth of 3 to find the best move for Black
-        _, best_move = minimax(self.board, 3, float('-inf'), float('inf'), False)
-        if best_move:
-            from_pos, to_pos = best_move
-            self.make_move(from_pos, to_pos)
+        fen, ply = self.position.to_fen(), len(self.san_history)
+        # Play from the opening book while the position is in it
+        book_move = self.book.choose(self.position) if self.book else None
+        if book_move is not None:
+            self.last_stats = None
+            self._play(book_move)
+            self._log_stats(fen, ply, None)
+            return None
+        # Search the compact board in place; the transposition table is reused from earlier turns
+        # The timers patch the board class for the whole process, so they come off again after the search
+        if self.profiler is not None:
+            self.profiler.install(self.board_class, self.search if isinstance(self.search, Search) else None)
+        try:
+            _, best_move = self.search.search(self.position, self.max_depth, self.time_limit, self.node_limit)
+        finally:
+            if self.profiler is not None:
+                self.profiler.uninstall()
+        stats = self.search.stats
+        if self.profiler is not None:
+            stats.profile = self.profiler.report(stats.seconds)
+        self.last_stats = stats
+        if best_move is not None:
+            self._play(best_move)
         else:
             # Fallback: if no best move is found, choose a random move
-            moves = self.get_all_moves(self.board, 'black')
+            moves = self.get_all_moves(self.board, self.current_player)
             if moves:
                 from_pos, to_pos = random.choice(moves)
                 self.make_move(from_pos, to_pos)
-
-    def make_move(self, from_pos: List[int], to_pos: List[int]):
-        """Execute a move on the board and update the game state."""
+        self._log_stats(fen, ply, stats)
+        return stats
+
+    def _log_stats(self, fen: str, ply: int, stats: Optional[SearchStats]):
+        """Append one JSON line describing the AI move played from the given position to the statistics log."""
+        if not self.stats_log:
+            return
+        played = self.san_history[-1] if len(self.san_history) > ply else None
+        record = {'ply': ply, 'fen': fen, 'move': played, 'book': stats is None}
+        if stats is not None:
+            record.update(stats.to_dict())
+        with open(self.stats_log, 'a') as log:
+            log.write(json.dumps(record) + '\n')
+
+    def make_move(self, from_pos: List[int], to_pos: List[int], promotion: str = 'queen'):
+        """Execute a move on the board and update the game state.
+
+        A pawn reaching the last rank is promoted to the given piece type; moving the king two squares
+        castles.
+        """
+        from_sq = square_index(*from_pos)
+        to_sq = square_index(*to_pos)
+        for move in self.position.legal_piece_moves(from_sq):
+            if move_to(move) == to_sq and move_promotion(move) in (0, PIECE_CODES[promotion]):
+                self._play(move)
+                return
+        raise ValueError(f"Illegal move {from_pos} -> {to_pos}")
+
+    def _play(self, move: int):
+        """Play a legal packed move on the Piece grid and the compact board and update the game state."""
+        from_pos = square_coords(move_from(move))
+        to_pos = square_coords(move_to(move))
         piece = self.board[from_pos[0]][from_pos[1]]
         self.board[to_pos[0]][to_pos[1]] = piece  # Move the piece to the new position
         self.board[from_pos[0]][from_pos[1]] = None  # Clear the original position
         piece.has_moved = True
-        
+        flag = move_flag(move)
+        suffix = ""
+        if flag == CASTLE_FLAG:
+            # The rook jumps over the king
+            rook_from, rook_to = (square_coords(sq) for sq in CASTLING_ROOKS[move_to(move)])
+            rook = self.board[rook_from[0]][rook_from[1]]
+            self.board[rook_to[0]][rook_to[1]] = rook
+            self.board[rook_from[0]][rook_from[1]] = None
+            rook.has_moved = True
+            suffix = " (castles)"
+        elif flag == EN_PASSANT_FLAG:
+            # The captured pawn stands beside the origin square
+            self.board[from_pos[0]][to_pos[1]] = None
+            suffix = " (en passant)"
+        elif move_promotion(move):
+            promoted = Piece(PIECE_NAMES[move_promotion(move)], piece.color)
+            promoted.has_moved = True
+            self.board[to_pos[0]][to_pos[1]] = promoted
+            suffix = f" (promotes to {promoted.type})"
+        self.san_history.append(move_to_san(self.position, move))
+        self.position.make_move(move)  # Keep the compact board in sync
+
         # Record the move in the history
         from_notation = f"{chr(97 + from_pos[1])}{8 - from_pos[0]}"
         to_notation = f"{chr(97 + to_pos[1])}{8 - to_pos[0]}"
-        self.move_history.append(f"{piece.type} {from_notation}-{to_notation}")
-        
+        self.move_history.append(f"{piece.type} {from_notation}-{to_notation}{suffix}")
+
         # Switch the current player
         self.current_player = 'black' if self.current_player == 'white' else 'white'
-        
-        # Update game state (check, checkmate, stalemate)
+
+        self._update_status()
+
+    def _update_status(self):
+        """Update the game state of the side to move (check, checkmate, stalemate, draws by rule)."""
         self.is_check = self.is_king_in_check(self.board, self.current_player)
         self.is_checkmate, self.is_stalemate = self.is_checkmate_or_stalemate(self.board, self.current_player)
+        self.draw_reason = None if self.is_checkmate or self.is_stalemate else self.position.draw_reason()
 
     def parse_move(self, move: str) -> Optional[Tuple[List[int], List[int]]]:
-        """Parse a move in algebraic notation (e.g., 'e2e4') and return the from and to positions."""
-        if len(move) != 4:
-            return None  # Move must be exactly 4 characters
+        """Parse a move in algebraic notation (e.g., 'e2e4') and return the from and to positions.
+
+        A fifth letter choosing the promotion piece (e.g., 'e7e8n') is accepted; see promotion_choice.
+        Standard algebraic notation of a legal move of the side to move (e.g., 'Nf3', 'O-O') is also
+        understood.
+        """
+        if len(move) not in (4, 5) or (len(move) == 5 and move[4].lower() not in PROMOTION_CHOICES):
+            return self._parse_san(move)  # Move must be 4 characters, plus an optional promotion letter
         
         try:
             # Convert algebraic notation to board coordinates
@@ -386,28 +485,48 @@ class ChessGame:
             to_file = ord(move[2].lower()) - ord('a')
             to_rank = 8 - int(move[3])
             
-            # Validate coordinates
+            # Validate coordinates; SAN with a rank disambiguator (e.g., 'R1a3') also has four characters
             if not (0 <= from_file < 8 and 0 <= from_rank < 8 and 0 <= to_file < 8 and 0 <= to_rank < 8):
-                return None
+                return self._parse_san(move)
                 
             from_pos = [from_rank, from_file]
             to_pos = [to_rank, to_file]
             
             return from_pos, to_pos
         except (ValueError, IndexError):
+            return self._parse_san(move)
+
+    def _parse_san(self, move: str) -> Optional[Tuple[List[int], List[int]]]:
+        """Return the from and to positions of a legal move written in SAN, or None."""
+        try:
+            packed = parse_san(self.position, move)
+        except ValueError:
             return None
+        return square_coords(move_from(packed)), square_coords(move_to(packed))
+
+    @staticmethod
+    def promotion_choice(move: str) -> str:
+        """Return the piece type named by a move's promotion letter (a queen if there is none).
+
+        The letter follows the squares in coordinate notation ('e7e8n') and the target square in SAN
+        ('e8=N').
+        """
+        san = move.rstrip('+#!?')
+        if len(san) > 2 and san[-1] in 'NBRQ' and (san[-2] == '=' or san[-2].isdigit()):
+            return PROMOTION_CHOICES[san[-1].lower()]
+        return PROMOTION_CHOICES.get(move[4:].lower(), 'queen')
 
     def run(self):
         """Main game loop to run the chess game in the console."""
         print(f"{Colors.BOLD}{Colors.CYAN}Welcome to Console Chess!{Colors.RESET}")
-        print(f"{Colors.YELLOW}You are White (uppercase pieces). Enter moves in algebraic notation (e.g., 'e2e4').{Colors.RESET}")
+        print(f"{Colors.YELLOW}You are White (uppercase pieces). Enter moves in algebraic notation (e.g., 'e2e4' or 'Nf3').{Colors.RESET}")
         print(f"{Colors.YELLOW}Type 'quit' to exit.{Colors.RESET}\n")
         
         while True:
             self.display_board()  # Show the current board state
             
-            # End the game if checkmate or stalemate is detected
-            if self.is_checkmate or self.is_stalemate:
+            # End the game if checkmate, stalemate or a draw by rule is detected
+            if self.is_checkmate or self.is_stalemate or self.draw_reason:
                 print(f"{Colors.GREEN}Game Over! Press Enter to exit.{Colors.RESET}")
                 input()
                 break
@@ -423,7 +542,7 @@ class ChessGame:
                     
                 move = self.parse_move(move_input)
                 if not move:
-                    print(f"{Colors.RED}Invalid move format. Use algebraic notation like 'e2e4'.{Colors.RESET}")
+                    print(f"{Colors.RED}Invalid move format. Use algebraic notation like 'e2e4' or 'Nf3'.{Colors.RESET}")
                     continue
                     
                 from_pos, to_pos = move
@@ -440,12 +559,12 @@ class ChessGame:
                     print(f"{Colors.RED}Invalid move: That move is not legal.{Colors.RESET}")
                     continue
                     
-                self.make_move(from_pos, to_pos)
+                self.make_move(from_pos, to_pos, self.promotion_choice(move_input))
             else:
                 # AI's turn (Black)
                 self.make_ai_move()
 
 if __name__ == "__main__":
     """Entry point to start the chess game."""
-    game = ChessGame()
-    game.run()
\ No newline at end of file
+    with ChessGame(book=sys.argv[1] if len(sys.argv) > 1 else None) as game:
+        game.run()
\ No newline at end of file
@@ -0,0 +1,244 @@
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from board import (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, TYPE_MASK, CASTLE_FLAG, EN_PASSANT_FLAG, STARTING_FEN,
+                   Board, parse_square, square_name, move_name, move_promotion)
+
+SAN_PIECES = {'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+SAN_LETTERS = {kind: letter for letter, kind in SAN_PIECES.items()}
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+# Movetext tokens: comments, variations, NAGs, move numbers and moves/results
+_TOKEN_PATTERN = re.compile(r'\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.(?:\.\.)?|[^\s(){};]+')
+_TAG_PATTERN = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]\s*$')
+# EPD operations: an opcode followed by operands (quoted strings may hold ';') up to the next ';'
+_EPD_OPERATION = re.compile(r'\s*([A-Za-z]\w*)((?:[^;"]|"[^"]*")*)(?:;|$)')
+
+# Tags every PGN game carries, in their required order, with the values used when unknown
+SEVEN_TAG_ROSTER = (('Event', '?'), ('Site', '?'), ('Date', '????.??.??'), ('Round', '?'), ('White', '?'),
+                    ('Black', '?'), ('Result', '*'))
+PGN_LINE_LENGTH = 80
+
+
+def parse_san(board: Board, text: str) -> int:
+    """Return the legal move of the side to move written in standard algebraic notation (e.g. 'Nf3', 'exd5').
+
+    Raises ValueError if the text is malformed or does not name exactly one legal move.
+    """
+    san = text.rstrip('+#!?')
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        # Castling: the king moves two files towards the g-file or the c-file
+        target_file = 6 if len(san) == 3 else 2
+        for move in board.legal_moves():
+            if move >> 12 == CASTLE_FLAG and (move >> 6) & 7 == target_file:
+                return move
+        raise ValueError(f"Illegal SAN move: {text!r}")
+    match = SAN_PATTERN.match(san)
+    if not match:
+        raise ValueError(f"Invalid SAN move: {text!r}")
+    piece_letter, from_file, from_rank, target, promotion = match.groups()
+    kind = SAN_PIECES[piece_letter] if piece_letter else PAWN
+    promotion = SAN_PIECES[promotion] if promotion else 0
+    to_sq = parse_square(target)
+    candidates = []
+    for move in board.legal_moves():
+        from_sq = move & 63
+        if (move >> 6) & 63 != to_sq or board.squares[from_sq] & TYPE_MASK != kind:
+            continue
+        # Castling is only ever written O-O / O-O-O, and the promotion piece must match
+        if move >> 12 == CASTLE_FLAG or move_promotion(move) != promotion:
+            continue
+        if from_file and from_sq & 7 != ord(from_file) - ord('a'):
+            continue
+        if from_rank and 8 - (from_sq >> 3) != int(from_rank):
+            continue
+        candidates.append(move)
+    if len(candidates) != 1:
+        reason = "Illegal" if not candidates else "Ambiguous"
+        raise ValueError(f"{reason} SAN move: {text!r}")
+    return candidates[0]
+
+
+def move_to_san(board: Board, move: int) -> str:
+    """Return the standard algebraic notation of a legal move of the side to move (e.g. 'Nbd7', 'exd8=Q+').
+
+    The origin file, rank or both are added only when another piece of the same kind can reach the
+    target square; the check and mate suffixes are found by playing the move and taking it back.
+    """
+    from_sq, to_sq, flag = move & 63, (move >> 6) & 63, move >> 12
+    kind = board.squares[from_sq] & TYPE_MASK
+    if flag == CASTLE_FLAG:
+        san = 'O-O' if to_sq & 7 == 6 else 'O-O-O'
+    else:
+        capture = 'x' if board.squares[to_sq] or flag == EN_PASSANT_FLAG else ''
+        if kind == PAWN:
+            san = (square_name(from_sq)[0] if capture else '') + capture + square_name(to_sq)
+            if move_promotion(move):
+                san += '=' + SAN_LETTERS[move_promotion(move)]
+        else:
+            rivals = [other & 63 for other in board.legal_moves()
+                      if (other >> 6) & 63 == to_sq and other & 63 != from_sq
+                      and board.squares[other & 63] & TYPE_MASK == kind]
+            origin = ''
+            if rivals:
+                if all(sq & 7 != from_sq & 7 for sq in rivals):
+                    origin = square_name(from_sq)[0]
+                elif all(sq >> 3 != from_sq >> 3 for sq in rivals):
+                    origin = square_name(from_sq)[1]
+                else:
+                    origin = square_name(from_sq)
+            san = SAN_LETTERS[kind] + origin + capture + square_name(to_sq)
+    board.make_move(move)
+    if board.in_check(board.side):
+        san += '+' if board.legal_moves() else '#'
+    board.unmake_move()
+    return san
+
+
+def parse_coordinate(board: Board, text: str) -> int:
+    """Return the legal move of the side to move written in coordinate notation (e.g. 'e2e4', 'e7e8q').
+
+    Raises ValueError if the text does not name a legal move.
+    """
+    name = text.lower()
+    for move in board.legal_moves():
+        if move_name(move) == name:
+            return move
+    raise ValueError(f"Illegal coordinate move: {text!r}")
+
+
+def parse_move(board: Board, text: str) -> int:
+    """Return the legal move named in either coordinate notation or SAN.
+
+    Raises ValueError if the text names no legal move (or, in SAN, more than one).
+    """
+    try:
+        return parse_coordinate(board, text)
+    except ValueError:
+        return parse_san(board, text)
+
+
+def read_pgn(lines: Iterable[str]) -> Iterator[Tuple[dict, List[str]]]:
+    """Yield (tags, SAN moves) for each game of a PGN text, one game at a time.
+
+    Comments, variations, NAGs, move numbers and the result token are dropped from the moves; a game
+    without a Result tag gets the result that ends its movetext.
+    """
+    tags, tokens = {}, []
+    in_movetext = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('%'):
+            continue  # Escaped line
+        tag = _TAG_PATTERN.match(stripped)
+        if tag:
+            if in_movetext:
+                yield _game(tags, tokens)
+                tags, tokens = {}, []
+                in_movetext = False
+            tags[tag.group(1)] = tag.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif stripped:
+            in_movetext = True
+            tokens.append(line)
+    if tags or tokens:
+        yield _game(tags, tokens)
+
+
+def _game(tags: dict, lines: List[str]) -> Tuple[dict, List[str]]:
+    """Return (tags, main-line moves) of a game, taking a missing Result tag from the movetext."""
+    moves, result = _main_line(lines)
+    if result is not None and 'Result' not in tags:
+        tags['Result'] = result
+    return tags, moves
+
+
+def _main_line(lines: List[str]) -> Tuple[List[str], Optional[str]]:
+    """Extract the main-line moves and the result token ending them (None if there is none) from movetext lines."""
+    moves = []
+    result = None
+    depth = 0
+    for token in _TOKEN_PATTERN.findall(' '.join(lines)):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in '{;$' or token[0].isdigit() and token.endswith('.'):
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return moves, result
+
+
+def pgn_tag_value(value: str) -> str:
+    """Escape a tag value for writing between double quotes."""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def write_pgn(tags: dict, moves: List[str], comments: Optional[List[Optional[str]]] = None) -> str:
+    """Format one game as PGN text: the tag pairs, a blank line, then the movetext wrapped at 80 columns.
+
+    The Seven Tag Roster comes first ('?' where a tag is missing), followed by the other tags in their
+    order. Move numbers start from the FEN tag's position when there is one, comments[i] is written in
+    braces after the i-th move, and the movetext ends with the Result tag.
+    """
+    tags = dict(tags)
+    ordered = [(name, tags.pop(name, default)) for name, default in SEVEN_TAG_ROSTER] + list(tags.items())
+    result = ordered[6][1]
+    # An unreadable FEN tag (such a game is passed through with an error) numbers the moves from 1, White first
+    fields = dict(ordered).get('FEN', STARTING_FEN).split()
+    white_first = len(fields) < 2 or fields[1] != 'b'
+    fullmove = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() and int(fields[5]) > 0 else 1
+    tokens = []
+    for i, san in enumerate(moves):
+        ply = i if white_first else i + 1
+        if ply % 2 == 0:
+            tokens.append(f"{fullmove + ply // 2}.")
+        elif i == 0 or comments and comments[i - 1]:
+            tokens.append(f"{fullmove + ply // 2}...")
+        tokens.append(san)
+        if comments and comments[i]:
+            tokens.append('{' + comments[i].replace('}', ')') + '}')
+    tokens.append(result)
+    lines, line = [], ''
+    for token in tokens:
+        if line and len(line) + len(token) >= PGN_LINE_LENGTH:
+            lines.append(line)
+            line = ''
+        line = f"{line} {token}" if line else token
+    lines.append(line)
+    header = ''.join(f'[{name} "{pgn_tag_value(value)}"]\n' for name, value in ordered)
+    return header + '\n' + '\n'.join(lines) + '\n\n'
+
+
+def parse_epd(line: str) -> Tuple[str, dict]:
+    """Split an EPD record into a FEN string and its operations (opcode -> operand text, quotes kept).
+
+    The hmvc and fmvn operations, when present, give the FEN's move counters.
+    Raises ValueError if the record has fewer than the four position fields.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"Invalid EPD record: {line.strip()!r}")
+    operations = {}
+    for opcode, operands in _EPD_OPERATION.findall(fields[4] if len(fields) > 4 else ''):
+        operations[opcode] = operands.strip()
+    fen = ' '.join(fields[:4] + [operations.get('hmvc', '0'), operations.get('fmvn', '1')])
+    return fen, operations
+
+
+def read_epd(lines: Iterable[str]) -> Iterator[Tuple[str, dict]]:
+    """Yield (FEN, operations) for each EPD record, one line at a time; blank and '#' lines are skipped."""
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            yield parse_epd(stripped)
+
+
+def write_epd(fen: str, operations: dict) -> str:
+    """Format an EPD record: the FEN's four position fields followed by the operations."""
+    position = ' '.join(fen.split()[:4])
+    return position + ''.join(f" {opcode} {operands};" if operands else f" {opcode};"
+                              for opcode, operands in operations.items())
@@ -0,0 +1,184 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from board import WHITE, Board
+from search import MATE_BOUND, MATE_SCORE, Search, SearchStats, tablebase_score
+from tablebase import Tablebase
+
+# Long-lived search of each worker process, reset between root moves when deterministic=True
+_worker_search = None
+
+
+def _init_worker(search_options: dict):
+    """Create the long-lived search of a worker process."""
+    global _worker_search
+    _worker_search = Search(**search_options)
+
+
+def _search_batch(board_class, packed: bytes, moves: List[int], depth: int, alpha: float, beta: float,
+                  time_limit: Optional[float], node_limit: Optional[int], deterministic: bool):
+    """Worker task: search a batch of root moves of a packed position.
+
+    Deterministic batches reset the worker's search before every move and give each the same window,
+    so its result depends only on the move and the arguments (late-move reductions and null-move
+    pruning make scores depend on the window and on the killer and history tables); otherwise the
+    search keeps its transposition table across the whole batch, narrowing the window as it goes.
+    """
+    board = board_class.unpack(packed)
+    search = _worker_search
+    if not deterministic:
+        results = search.search_root_moves(board, moves, depth, alpha, beta, time_limit, node_limit)
+        return results, search.stats
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    results, stats = [], SearchStats()
+    for move in moves:
+        search.reset()
+        remaining_time = deadline - time.perf_counter() if deadline is not None else None
+        remaining_nodes = node_limit - stats.nodes if node_limit is not None else None
+        results += search.search_root_moves(board, [move], depth, alpha, beta, remaining_time, remaining_nodes)
+        stats.add(search.stats)
+        if search.aborted:
+            stats.aborted = True
+            break
+    return results, stats
+
+
+class ParallelSearch:
+    """Root-split iterative deepening over a pool of worker processes.
+
+    Every iteration searches the first root move (the previous iteration's best) with a full window,
+    then shares its score as the bound for the remaining moves, which are dealt round-robin into one
+    batch per worker. The best move is the highest score, ties going to the earlier root move, so
+    with a fixed depth the same position and settings always give the same move whatever the worker
+    count or timing (deterministic=True searches every root move with fresh search state and the
+    shared bound, resetting the worker's search state in between, to guarantee this). With deterministic=False each batch reuses its worker's tables
+    and tightens the bound further as it finds better moves, which searches fewer nodes.
+    """
+
+    def __init__(self, workers: Optional[int] = None, deterministic: bool = True, **search_options):
+        """Start a pool of workers (defaults to the CPU count); search_options are passed to Search."""
+        self.workers = workers or os.cpu_count() or 1
+        self.deterministic = deterministic
+        self.search_options = search_options
+        # Orders the root moves; with empty killer and history tables that is by captures alone
+        self.orderer = Search(use_tt=False, use_see=search_options.get('use_see', False))
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(search_options,))
+        self.nodes = 0           # Nodes visited by the last search, over all workers
+        self.depth_reached = 0   # Depth of the last completed iteration
+        self.aborted = False     # Whether the last search stopped mid-iteration
+        self.stats = SearchStats()  # Statistics of the last search, counters summed over all workers
+        # The root is looked up here; the workers open the tables themselves for the rest of the tree
+        tablebase = search_options.get('tablebase')
+        self.tablebase = Tablebase(tablebase) if tablebase else None
+
+    def close(self):
+        """Shut the worker pool down."""
+        self.executor.shutdown()
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, board: Board, depth: int, time_limit: Optional[float] = None,
+               node_limit: Optional[int] = None) -> Tuple[float, Optional[int]]:
+        """Search the position and return (score, best move) for the side to move.
+
+        time_limit (seconds) caps the whole search; node_limit caps each worker task.
+        """
+        self.nodes = 0
+        self.depth_reached = 0
+        self.aborted = False
+        self.stats = SearchStats()
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        maximizing = board.side == WHITE
+        root_moves = self.orderer.order_moves(board, board.legal_moves(), 0)
+        if not root_moves:
+            score = (-MATE_SCORE if maximizing else MATE_SCORE) if board.in_check(board.side) else 0
+            self.stats.score = score
+            self.stats.seconds = time.perf_counter() - started
+            return score, None
+        probed = self.tablebase.best_move(board) if self.tablebase is not None else None
+        if probed is not None:
+            move, wdl, dtm = probed
+            score = tablebase_score(wdl, dtm, 0)
+            score = score if maximizing else -score
+            self.depth_reached = depth
+            self.stats.tb_hits = 1
+            self.stats.seconds = time.perf_counter() - started
+            self.stats.depth, self.stats.score, self.stats.pv = depth, score, [move]
+            return score, move
+
+        packed = board.pack()
+        result = (board.evaluate(), root_moves[0])
+        for iteration in range(1, depth + 1):
+            iteration_start, iteration_nodes = time.perf_counter(), self.nodes
+            # The first move gets a full window; its score bounds everybody else
+            first = self._run(board, packed, [[root_moves[0]]], iteration, float('-inf'), float('inf'),
+                              deadline, node_limit)
+            if first is None:
+                break
+            _, best_score, _ = first[0]
+            scores = {root_moves[0]: best_score}
+            rest = root_moves[1:]
+            batches = [rest[i::self.workers] for i in range(min(self.workers, len(rest)))]
+            alpha, beta = (best_score, float('inf')) if maximizing else (float('-inf'), best_score)
+            results = self._run(board, packed, batches, iteration, alpha, beta, deadline, node_limit)
+            if results is None:
+                break
+            # Highest score wins; only exact scores qualify and ties keep the earlier root move
+            index = {move: i for i, move in enumerate(root_moves)}
+            best_move = root_moves[0]
+            for move, score, exact in results:
+                scores[move] = score
+                if not exact:
+                    continue
+                better = score > best_score if maximizing else score < best_score
+                if better or (score == best_score and index[move] < index[best_move]):
+                    best_score, best_move = score, move
+            result = (best_score, best_move)
+            self.depth_reached = iteration
+            self.stats.iterations.append((iteration, time.perf_counter() - iteration_start,
+                                          self.nodes - iteration_nodes, best_score))
+            # Next iteration: best move first, the rest by this iteration's scores (stable for ties)
+            others = sorted((move for move in root_moves if move != best_move),
+                            key=lambda move: -scores[move] if maximizing else scores[move])
+            root_moves = [best_move] + others
+            if abs(best_score) > MATE_BOUND:
+                break
+        stats = self.stats
+        stats.seconds = time.perf_counter() - started
+        stats.depth = self.depth_reached
+        stats.score, best = result
+        stats.pv = [best]  # Workers only report scores, so the variation stops at the root move
+        stats.aborted = self.aborted
+        return result
+
+    def _run(self, board: Board, packed: bytes, batches: List[List[int]], depth: int, alpha: float,
+             beta: float, deadline: Optional[float], node_limit: Optional[int]):
+        """Search the batches in parallel; returns the merged results, or None if the budget ran out."""
+        time_limit = None
+        if depth == 1:
+            node_limit = None  # The first iteration always completes so there is a move to play
+        elif deadline is not None:
+            time_limit = deadline - time.perf_counter()
+            if time_limit <= 0:
+                self.aborted = True
+                return None
+        futures = [self.executor.submit(_search_batch, type(board), packed, batch, depth, alpha, beta,
+                                        time_limit, node_limit, self.deterministic) for batch in batches]
+        merged = []
+        for future in futures:
+            results, stats = future.result()
+            self.nodes += stats.nodes
+            self.stats.add(stats)
+            self.aborted = self.aborted or stats.aborted
+            merged.extend(results)
+        return None if self.aborted else merged
@@ -0,0 +1,126 @@
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+from board import STARTING_FEN, Board, move_name
+from chess_game import ENGINES
+
+# Reference positions with their published leaf counts per depth (name, FEN, {depth: nodes}); together
+# they exercise castling, en passant, promotions and pins
+REFERENCE_POSITIONS = [
+    ('initial', STARTING_FEN, {1: 20, 2: 400, 3: 8902, 4: 197281}),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     {1: 48, 2: 2039, 3: 97862}),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', {1: 14, 2: 191, 3: 2812, 4: 43238}),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', {1: 6, 2: 264, 3: 9467}),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', {1: 44, 2: 1486, 3: 62379}),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     {1: 46, 2: 2079, 3: 89890}),
+]
+
+DEFAULT_TOLERANCE = 0.25  # Allowed nodes-per-second drop against the baseline before flagging a regression
+
+
+def perft(board: Board, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree to the given depth."""
+    if depth <= 0:
+        return 1
+    moves = board.legal_moves()
+    if depth == 1:
+        return len(moves)  # Bulk counting: the leaves do not need to be played
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board: Board, depth: int) -> Dict[str, int]:
+    """Return the perft count below each root move, keyed by coordinate notation."""
+    counts = {}
+    for move in board.legal_moves():
+        board.make_move(move)
+        counts[move_name(move)] = perft(board, depth - 1)
+        board.unmake_move()
+    return counts
+
+
+def run_suite(engine: str, max_depth: Optional[int], baseline: Optional[dict], tolerance: float) -> List[dict]:
+    """Run perft on every reference position and compare node counts and speed against expectations."""
+    board_class = ENGINES[engine]
+    results = []
+    for name, fen, expected in REFERENCE_POSITIONS:
+        for depth, count in sorted(expected.items()):
+            if max_depth is not None and depth > max_depth:
+                continue
+            board = board_class.from_fen(fen)
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            elapsed = time.perf_counter() - start
+            nps = nodes / elapsed if elapsed > 0 else float('inf')
+            key = f"{engine}/{name}/{depth}"
+            reference_nps = (baseline or {}).get(key)
+            result = {
+                'key': key, 'nodes': nodes, 'expected': count, 'seconds': elapsed, 'nps': nps,
+                'mismatch': nodes != count,
+                'slow': reference_nps is not None and nps < reference_nps * (1 - tolerance),
+                'baseline_nps': reference_nps,
+            }
+            results.append(result)
+            flags = []
+            if result['mismatch']:
+                flags.append(f"MISMATCH expected {count}")
+            if result['slow']:
+                flags.append(f"SLOW baseline {reference_nps:,.0f} n/s")
+            print(f"{key:<28} {nodes:>10} {elapsed:>8.2f}s {nps:>12,.0f} n/s  {' '.join(flags) or 'ok'}")
+    return results
+
+
+def main():
+    """Command-line entry point for perft, divide and the regression suite."""
+    parser = argparse.ArgumentParser(description="Count and time move-generator leaf nodes (perft).")
+    parser.add_argument('--fen', default=STARTING_FEN, help="position to search (default: initial position)")
+    parser.add_argument('--depth', type=int, default=3, help="perft depth")
+    parser.add_argument('--divide', action='store_true', help="print the count below every root move")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='mailbox', help="board implementation")
+    parser.add_argument('--suite', action='store_true', help="run the bundled reference positions")
+    parser.add_argument('--max-depth', type=int, help="skip suite entries deeper than this")
+    parser.add_argument('--baseline', help="JSON file of nodes per second to check the suite against, saved earlier on the same "
+                             "machine with --save-baseline (none is shipped, since speeds depend on the machine)")
+    parser.add_argument('--save-baseline', help="write the suite's nodes per second to this JSON file")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative speed drop against the baseline")
+    args = parser.parse_args()
+
+    if args.suite:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        results = run_suite(args.engine, args.max_depth, baseline, args.tolerance)
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as f:
+                json.dump({result['key']: round(result['nps']) for result in results}, f, indent=2)
+        mismatches = sum(result['mismatch'] for result in results)
+        regressions = sum(result['slow'] for result in results)
+        print(f"{len(results)} runs, {mismatches} node-count mismatches, {regressions} speed regressions")
+        sys.exit(1 if mismatches or regressions else 0)
+
+    board = ENGINES[args.engine].from_fen(args.fen)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(board, args.depth)
+        for move, count in sorted(counts.items()):
+            print(f"{move}: {count}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(board, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}  Time: {elapsed:.2f}s  NPS: {nodes / elapsed if elapsed > 0 else 0:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
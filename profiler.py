@@ -0,0 +1,110 @@
+import functools
+import inspect
+import time
+from typing import Optional
+
+# Board methods timed under each category. They back the game's get_basic_moves / calculate_valid_moves
+# (move generation), is_king_in_check / is_square_attacked (check detection) and evaluate_board
+# (evaluation), plus the paths that copy positions and the make/unmake updates.
+PROFILE_CATEGORIES = {
+    'move_generation': ('legal_moves', 'legal_captures', 'legal_piece_moves', 'pseudo_legal_moves',
+                        'pseudo_legal_captures', 'piece_moves', 'castling_moves', 'filter_legal'),
+    'check_detection': ('in_check', 'is_attacked', 'is_legal', 'check_and_pins', 'king_step_is_safe'),
+    'evaluation': ('evaluate',),
+    'copy': ('copy', 'pack', 'unpack', 'from_grid', 'from_fen'),
+    'make_unmake': ('make_move', 'unmake_move'),
+}
+
+
+class Profiler:
+    """Opt-in timer of the board operations a search spends its time in.
+
+    install() wraps the methods listed in PROFILE_CATEGORIES on a board class (and, given a search,
+    its evaluation function) with timers. Each call is charged to its category minus the time of the
+    timed calls it makes itself, so legality checks made during move generation count as check
+    detection and the categories add up without double counting. The timers slow the search down
+    several times over, so profile to find where the time goes, not to measure absolute speed.
+    Only the calling process is profiled, not the workers of a parallel search.
+    """
+
+    def __init__(self):
+        self.calls = {category: 0 for category in PROFILE_CATEGORIES}
+        self.seconds = {category: 0.0 for category in PROFILE_CATEGORIES}
+        self._stack = []       # Time spent in timed calls made by each timed call in progress
+        self._installed = []   # (owner, attribute name, attribute it replaced or None if inherited)
+        self._started = time.perf_counter()
+
+    def _timed(self, category: str, function):
+        """Wrap a function so its calls are counted and timed under the category."""
+        calls, seconds, stack = self.calls, self.seconds, self._stack
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                seconds[category] += elapsed - stack.pop()
+                calls[category] += 1
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    def install(self, board_class, search=None):
+        """Start timing the board class's methods, and the search's evaluation function if given.
+
+        The methods are replaced on the class itself, so every board of that class in the process is
+        timed until uninstall() puts the originals back. Installing again first uninstalls.
+        """
+        self.uninstall()
+        for category, names in PROFILE_CATEGORIES.items():
+            for name in names:
+                attribute = inspect.getattr_static(board_class, name, None)
+                if attribute is None:
+                    continue
+                if isinstance(attribute, (classmethod, staticmethod)):
+                    timed = type(attribute)(self._timed(category, attribute.__func__))
+                else:
+                    timed = self._timed(category, attribute)
+                self._installed.append((board_class, name, board_class.__dict__.get(name)))
+                setattr(board_class, name, timed)
+        if search is not None:
+            self._installed.append((search, 'evaluate', search.evaluate))
+            search.evaluate = self._timed('evaluation', search.evaluate)
+        self.reset()
+
+    def uninstall(self):
+        """Put the original methods back."""
+        for owner, name, original in reversed(self._installed):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._installed = []
+
+    def reset(self):
+        """Zero the counters and restart the clock the shares are measured against."""
+        for category in PROFILE_CATEGORIES:
+            self.calls[category] = 0
+            self.seconds[category] = 0.0
+        self._started = time.perf_counter()
+
+    def report(self, total: Optional[float] = None) -> dict:
+        """Return calls, seconds and share of the total time per category.
+
+        total defaults to the time since the last reset; time outside every category is reported as
+        'other'.
+        """
+        if total is None:
+            total = time.perf_counter() - self._started
+        report = {}
+        for category in PROFILE_CATEGORIES:
+            seconds = self.seconds[category]
+            report[category] = {'calls': self.calls[category], 'seconds': round(seconds, 4),
+                                'share': round(seconds / total, 4) if total else 0.0}
+        other = max(total - sum(self.seconds.values()), 0.0)
+        report['other'] = {'calls': 0, 'seconds': round(other, 4), 'share': round(other / total, 4) if total else 0.0}
+        return report
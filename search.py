@@ -0,0 +1,665 @@
+import time
+from typing import Callable, List, Optional, Tuple
+
+from board import (NUM_SQUARES, WHITE, PAWN, QUEEN, TYPE_MASK, TYPE_VALUES, MATERIAL_VALUES, EN_PASSANT_FLAG,
+                   FIFTY_MOVE_PLIES, Board, move_name)
+from tablebase import Tablebase
+
+# Score for delivering checkmate; the distance to mate in plies is subtracted so faster mates score higher
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000  # Scores beyond this are mate scores
+
+# Bound types stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
+DEFAULT_TT_BUCKETS = 1 << 17  # Two entries per bucket
+CHECK_INTERVAL = 1024          # Nodes between checks of the time budget
+MAX_PLY = 64                   # Deepest ply that keeps killer moves
+
+# Move ordering bands: hash/PV move, winning or even captures (MVV-LVA), killers, quiet moves
+# (history score), captures that lose material by static exchange evaluation
+ORDER_HASH_MOVE = 1 << 30
+ORDER_GOOD_CAPTURE = 1 << 28
+ORDER_KILLER = 1 << 27
+ORDER_BAD_CAPTURE = -(1 << 28)
+HISTORY_LIMIT = 1 << 20        # History scores are halved once one of them grows past this
+
+# Quiescence delta pruning: skip captures that cannot lift the score back to alpha even with this
+# much positional slack (centipawns) on top of the captured material
+DELTA_MARGIN = 200
+QUEEN_GAIN = MATERIAL_VALUES[QUEEN] + DELTA_MARGIN
+PROMOTION_GAIN = MATERIAL_VALUES[QUEEN] - MATERIAL_VALUES[PAWN]  # Material won by promoting to a queen
+
+# Null-move pruning: the pass is searched this many plies shallower (one more from NULL_MOVE_DEEP_DEPTH)
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_DEEP_DEPTH = 6
+
+# Late-move reductions: from LMR_MIN_DEPTH, quiet moves from the LMR_MIN_MOVES-th on lose a ply,
+# and from the LMR_DEEP_MOVES-th on two plies (outside the principal variation)
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+LMR_DEEP_MOVES = 8
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out mid-iteration."""
+
+
+class SearchStats:
+    """Counters and timings of one search, for finding out where a slow move spent its effort.
+
+    Every search leaves one in its stats attribute; to_dict() gives a JSON-ready summary with the
+    derived rates.
+    """
+
+    # Counters summed when the results of several searches are merged (see add())
+    COUNTERS = ('nodes', 'qnodes', 'tt_probes', 'tt_hits', 'expanded', 'cutoffs', 'first_move_cutoffs', 'tb_hits')
+
+    def __init__(self):
+        self.nodes = 0               # Nodes visited, quiescence nodes included
+        self.qnodes = 0              # Quiescence nodes visited
+        self.tt_probes = 0           # Transposition table lookups
+        self.tt_hits = 0             # Lookups that found an entry for the position
+        self.expanded = 0            # Full-width nodes whose moves were searched
+        self.cutoffs = 0             # Expanded nodes that stopped early on a beta cutoff
+        self.first_move_cutoffs = 0  # Cutoffs caused by the first move searched
+        self.tb_hits = 0             # Positions resolved by the endgame tablebase
+        self.seconds = 0.0           # Wall-clock time of the search
+        self.depth = 0               # Depth of the last completed iteration
+        self.score = None            # Score of the last completed iteration (positive favours White)
+        self.pv = []                 # Principal variation of the last completed iteration
+        self.iterations = []         # (depth, seconds, nodes, score) of every completed iteration
+        self.aborted = False         # Whether the search stopped mid-iteration
+        self.profile = None          # Profiler.report() for the search, when profiling is on
+
+    def add(self, other: 'SearchStats'):
+        """Add the counters of another search (e.g. a worker's share of a parallel search)."""
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    @property
+    def nps(self) -> float:
+        """Nodes searched per second."""
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        """Fraction of transposition table probes that found an entry."""
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def cutoff_rate(self) -> float:
+        """Fraction of expanded nodes that ended in a beta cutoff."""
+        return self.cutoffs / self.expanded if self.expanded else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of beta cutoffs found on the first move; near 1 means the move ordering works."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def to_dict(self) -> dict:
+        """Return the statistics as plain JSON-ready values, moves in coordinate notation."""
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats.update(
+            seconds=round(self.seconds, 4), nps=round(self.nps), tt_hit_rate=round(self.tt_hit_rate, 4),
+            cutoff_rate=round(self.cutoff_rate, 4), first_move_cutoff_rate=round(self.first_move_cutoff_rate, 4),
+            depth=self.depth, score=self.score, pv=[move_name(move) for move in self.pv],
+            iterations=[{'depth': depth, 'seconds': round(seconds, 4), 'nodes': nodes, 'score': score}
+                        for depth, seconds, nodes, score in self.iterations],
+            aborted=self.aborted)
+        if self.profile is not None:
+            stats['profile'] = self.profile
+        return stats
+
+
+class TranspositionTable:
+    """Fixed-size table of search results indexed by Zobrist hash.
+
+    Every bucket has two slots: the first keeps the deepest result of the current search (results
+    left over from earlier searches may always be replaced), the second always takes the newest
+    result. Entries are (key, depth, score, bound, best move, age) tuples.
+    """
+
+    def __init__(self, buckets: int = DEFAULT_TT_BUCKETS):
+        """Allocate a table with the given number of buckets (rounded down to a power of two)."""
+        buckets = 1 << max(buckets.bit_length() - 1, 0)
+        self.mask = buckets - 1
+        self.entries = [None] * (buckets * 2)
+        self.age = 0     # Bumped at the start of every search so stale entries can be replaced
+        self.probes = 0  # Lookup statistics since the last reset_stats()
+        self.hits = 0
+
+    def new_search(self):
+        """Mark the start of a new search; entries from earlier searches stay usable but replaceable."""
+        self.age += 1
+
+    def clear(self):
+        """Drop every stored entry."""
+        self.entries = [None] * len(self.entries)
+
+    def reset_stats(self):
+        """Reset the probe and hit counters."""
+        self.probes = 0
+        self.hits = 0
+
+    def hit_rate(self) -> float:
+        """Return the fraction of probes that found an entry."""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, key: int):
+        """Return the stored entry for the key, or None, counting the lookup in the statistics."""
+        self.probes += 1
+        entry = self.peek(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def peek(self, key: int):
+        """Return the stored entry for the key, or None, without touching the statistics."""
+        index = (key & self.mask) << 1
+        entries = self.entries
+        for entry in (entries[index], entries[index + 1]):
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: Optional[int]):
+        """Store a search result using depth-preferred replacement with an always-replace fallback."""
+        index = (key & self.mask) << 1
+        entries = self.entries
+        entry = (key, depth, score, bound, move, self.age)
+        preferred = entries[index]
+        if preferred is None or preferred[0] == key or preferred[5] != self.age or depth >= preferred[1]:
+            if preferred is not None and preferred[0] != key:
+                entries[index + 1] = preferred  # Keep the displaced entry in the always-replace slot
+            entries[index] = entry
+        else:
+            entries[index + 1] = entry
+
+
+def _score_to_tt(score: float, ply: int) -> float:
+    """Make mate scores relative to the stored node rather than the root."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: float, ply: int) -> float:
+    """Convert a stored mate score back to a distance from the root."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def tablebase_score(wdl: int, dtm: int, ply: int) -> float:
+    """Search score, for the side to move, of a tablebase result found ply plies from the root."""
+    if wdl > 0:
+        return MATE_SCORE - ply - dtm
+    if wdl < 0:
+        return -(MATE_SCORE - ply - dtm)
+    return 0
+
+
+class Search:
+    """Alpha-beta principal variation search over a compact Board, backed by a transposition table.
+
+    The tree is searched in negamax form (every node maximises its own score); results are reported
+    from White's point of view like the evaluation.
+    """
+
+    def __init__(self, evaluate: Callable[[Board], float] = Board.evaluate, tt_buckets: int = DEFAULT_TT_BUCKETS,
+                 use_tt: bool = True, use_ordering: bool = True, use_see: bool = False,
+                 use_quiescence: bool = True, use_pvs: bool = True, use_null_move: bool = True,
+                 use_lmr: bool = True, use_check_extensions: bool = True, tablebase: Optional[str] = None):
+        """Create a search using evaluate(board) for leaf scores (positive favours White).
+
+        The default is the board's incrementally updated tapered evaluation.
+
+        use_ordering sorts moves by MVV-LVA, killer moves and the history heuristic; use_see also
+        runs static exchange evaluation on captures, searching losing ones after the quiet moves and
+        skipping them in the quiescence search. use_quiescence resolves captures at the leaves
+        instead of evaluating the position in the middle of an exchange. use_pvs searches every move
+        after the first with a null window, use_null_move enables null-move pruning, use_lmr reduces
+        late quiet moves and use_check_extensions searches positions in check one ply deeper; with
+        all four off every move gets a full-window, full-depth alpha-beta search.
+
+        tablebase is a directory of endgame tables (see tablebase.py): positions they cover are
+        scored exactly inside the tree, and at the root the move is taken from the tables.
+        """
+        self.evaluate = evaluate
+        self.tt = TranspositionTable(tt_buckets) if use_tt else None  # Kept between calls to search()
+        self.use_ordering = use_ordering
+        self.use_see = use_see
+        self.use_quiescence = use_quiescence
+        self.use_pvs = use_pvs
+        self.use_null_move = use_null_move
+        self.use_lmr = use_lmr
+        self.use_check_extensions = use_check_extensions
+        self.tablebase = Tablebase(tablebase) if tablebase else None
+        self.killers = [[None, None] for _ in range(MAX_PLY)]  # Two quiet cutoff moves per ply
+        self.history = [[0] * 64 for _ in range(16)]           # Cutoff score per [piece code][target square]
+        self.nodes = 0            # Nodes visited by the last search (quiescence nodes included)
+        self.qnodes = 0           # Quiescence nodes visited by the last search
+        self.depth_reached = 0    # Depth of the last completed iteration
+        self.pv = []              # Principal variation of the last completed iteration
+        self.aborted = False      # Whether the last search stopped mid-iteration
+        self.expanded = 0         # Full-width nodes of the last search whose moves were searched
+        self.cutoffs = 0          # Of those, the ones that ended in a beta cutoff ...
+        self.first_move_cutoffs = 0  # ... and the ones whose cutoff came from the first move
+        self.tb_hits = 0          # Positions of the last search resolved by the tablebase
+        self.stats = SearchStats()   # Statistics of the last search
+        self._started = 0.0       # perf_counter() time at which the last search started
+        self._tt_counts = (0, 0)  # Table probes and hits before the last search
+        self._deadline = None     # perf_counter() time at which to abort, if any
+        self._node_limit = None   # Node count at which to abort, if any
+        self._abortable = False   # The first iteration always completes so there is a move to play
+        self.stop_requested = None  # Optional callable polled with the budget; a true result aborts the search
+
+    def search(self, board: Board, depth: int, time_limit: Optional[float] = None,
+               node_limit: Optional[int] = None) -> Tuple[float, Optional[int]]:
+        """Search the position by iterative deepening and return (score, best move) for the side to move.
+
+        Iterations run from depth 1 up to depth. When time_limit (seconds) or node_limit is given,
+        the search stops as soon as the budget is used up and returns the result of the last
+        completed iteration.
+        """
+        self._start(time_limit, node_limit)
+        # A position the tablebase covers needs no search: play the move with the best known result
+        probed = self.tablebase.best_move(board) if self.tablebase is not None else None
+        if probed is not None:
+            move, wdl, dtm = probed
+            score = tablebase_score(wdl, dtm, 0)
+            self.tb_hits += 1
+            self.depth_reached = depth
+            self.pv = [move]
+            score = score if board.side == WHITE else -score
+            self._finish_stats(score)
+            return score, move
+        result = (self.evaluate(board), None)
+        history_length = len(board.history)
+        for iteration in range(1, depth + 1):
+            self._abortable = iteration > 1
+            iteration_start, iteration_nodes = time.perf_counter(), self.nodes
+            try:
+                score, move = self._negamax(board, iteration, 0, float('-inf'), float('inf'))
+                score = score if board.side == WHITE else -score
+            except SearchAborted:
+                # Take back the moves still on the board from the interrupted iteration
+                while len(board.history) > history_length:
+                    board.unmake_move()
+                self.aborted = True
+                break
+            result = (score, move)
+            self.depth_reached = iteration
+            self.pv = self._principal_variation(board, move, iteration)
+            self.stats.iterations.append((iteration, time.perf_counter() - iteration_start,
+                                          self.nodes - iteration_nodes, score))
+            if move is None or abs(score) > MATE_BOUND:
+                break  # No legal moves, or a forced mate has been found
+        self._finish_stats(result[0])
+        return result
+
+    def search_root_moves(self, board: Board, moves: List[int], depth: int, alpha: float = float('-inf'),
+                          beta: float = float('inf'), time_limit: Optional[float] = None,
+                          node_limit: Optional[int] = None) -> List[Tuple[int, float, bool]]:
+        """Search the given root moves in order to a fixed depth, narrowing the window as better moves turn up.
+
+        Returns a (move, score, exact) triple per searched move. A move that was not strictly better
+        than the best score so far only gets a bound (exact is False), so ties go to the earlier move.
+        If the budget runs out the moves searched so far are returned and self.aborted is set.
+        """
+        self._start(time_limit, node_limit)
+        self._abortable = True
+        maximizing = board.side == WHITE
+        results = []
+        history_length = len(board.history)
+        try:
+            for move in moves:
+                board.make_move(move)
+                # The reply is searched from the opponent's point of view; scores here are White's
+                if maximizing:
+                    score = -self._negamax(board, depth - 1, 1, -beta, -alpha)[0]
+                else:
+                    score = self._negamax(board, depth - 1, 1, alpha, beta)[0]
+                board.unmake_move()
+                exact = alpha < score < beta
+                results.append((move, score, exact))
+                if exact:
+                    if maximizing:
+                        alpha = score
+                    else:
+                        beta = score
+        except SearchAborted:
+            while len(board.history) > history_length:
+                board.unmake_move()
+            self.aborted = True
+        self._finish_stats(None)
+        return results
+
+    def close(self):
+        """Close the endgame tables, if any."""
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+    def reset(self):
+        """Forget what earlier searches learned: table entries, killer moves and history scores."""
+        if self.tt is not None:
+            self.tt.clear()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 64 for _ in range(16)]
+
+    def _start(self, time_limit: Optional[float], node_limit: Optional[int]):
+        """Reset the counters and per-search heuristics and arm the time and node budgets."""
+        self.nodes = 0
+        self.qnodes = 0
+        self.depth_reached = 0
+        self.pv = []
+        self.aborted = False
+        self.expanded = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tb_hits = 0
+        self.stats = SearchStats()
+        self._started = time.perf_counter()
+        self._deadline = self._started + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+        if self.tt is not None:
+            self.tt.new_search()
+            self._tt_counts = (self.tt.probes, self.tt.hits)
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        for row in self.history:
+            for sq in range(64):
+                row[sq] >>= 1  # Age the history scores so older searches weigh less
+
+    def _finish_stats(self, score: Optional[float]):
+        """Copy the counters of the search that just ended into its statistics."""
+        stats = self.stats
+        stats.seconds = time.perf_counter() - self._started
+        stats.nodes = self.nodes
+        stats.qnodes = self.qnodes
+        stats.expanded = self.expanded
+        stats.cutoffs = self.cutoffs
+        stats.first_move_cutoffs = self.first_move_cutoffs
+        stats.tb_hits = self.tb_hits
+        if self.tt is not None:
+            stats.tt_probes = self.tt.probes - self._tt_counts[0]
+            stats.tt_hits = self.tt.hits - self._tt_counts[1]
+        stats.depth = self.depth_reached
+        stats.score = score
+        stats.pv = list(self.pv)
+        stats.aborted = self.aborted
+
+    def _out_of_budget(self) -> bool:
+        """Check whether the node or time budget of the current search is used up, or a stop was requested."""
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            return True
+        if self.stop_requested is not None and self.stop_requested():
+            return True
+        return self._deadline is not None and time.perf_counter() >= self._deadline
+
+    def _principal_variation(self, board: Board, best_move: Optional[int], depth: int) -> List[int]:
+        """Follow best moves through the transposition table to recover the principal variation."""
+        if best_move is None:
+            return []
+        pv = [best_move]
+        if self.tt is not None:
+            board.make_move(best_move)
+            while len(pv) < depth:
+                entry = self.tt.peek(board.hash)
+                if entry is None or entry[4] is None or entry[4] not in board.legal_moves():
+                    break
+                pv.append(entry[4])
+                board.make_move(entry[4])
+            for _ in pv:
+                board.unmake_move()
+        return pv
+
+    def order_moves(self, board: Board, moves: List[int], ply: int, first: Optional[int] = None) -> List[int]:
+        """Sort moves: the hash/PV move, good captures by MVV-LVA, killers, quiet moves by history, bad captures."""
+        squares = board.squares
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+        use_see = self.use_see
+        scored = []
+        for move in moves:
+            if move == first:
+                score = ORDER_HASH_MOVE
+            else:
+                piece = squares[move & 63]
+                to_sq = (move >> 6) & 63
+                victim = squares[to_sq] & TYPE_MASK
+                flag = move >> 12
+                if flag:
+                    # En passant takes a pawn; a queen promotion is ordered like winning a queen
+                    if flag == EN_PASSANT_FLAG:
+                        victim = PAWN
+                    elif flag == QUEEN:
+                        victim = QUEEN
+                if victim:
+                    # Most valuable victim first, least valuable attacker breaking ties
+                    score = TYPE_VALUES[victim] * 1000 - TYPE_VALUES[piece & TYPE_MASK]
+                    if use_see and board.static_exchange(move) < 0:
+                        score += ORDER_BAD_CAPTURE
+                    else:
+                        score += ORDER_GOOD_CAPTURE
+                elif move == killers[0]:
+                    score = ORDER_KILLER + 1
+                elif move == killers[1]:
+                    score = ORDER_KILLER
+                else:
+                    score = history[piece][to_sq]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _record_cutoff(self, board: Board, move: int, depth: int, ply: int):
+        """Remember a quiet move that caused a beta cutoff as a killer and in the history table."""
+        to_sq = (move >> 6) & 63
+        if board.squares[to_sq]:
+            return  # Captures are already ordered first
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        row = self.history[board.squares[move & 63]]
+        row[to_sq] += depth * depth
+        if row[to_sq] > HISTORY_LIMIT:
+            for table in self.history:
+                for sq in range(64):
+                    table[sq] >>= 1
+
+    def _negamax(self, board: Board, depth: int, ply: int, alpha: float, beta: float,
+                 allow_null: bool = True) -> Tuple[float, Optional[int]]:
+        """Principal variation search in negamax form: scores are from the side to move's point of view.
+
+        The first (best-ordered) move is searched with the full window and the others with a null
+        window around alpha, re-searched with the full window only if they beat it. Null-move pruning
+        and late-move reductions apply at nodes outside the principal variation (null window), and a
+        side in check is searched one ply deeper.
+        """
+        self.nodes += 1
+        if self._abortable and (self.nodes & (CHECK_INTERVAL - 1) == 0 or self._node_limit is not None):
+            if self._out_of_budget():
+                raise SearchAborted()
+        tt = self.tt
+        tt_move = None
+        # Draws by the fifty-move rule or by repeating a position; inside the tree one repetition is
+        # enough, since whatever held the first time holds again
+        if ply > 0 and (board.halfmove >= FIFTY_MOVE_PLIES or board.is_repetition()):
+            return 0, None
+        tablebase = self.tablebase
+        if ply > 0 and tablebase is not None and NUM_SQUARES - board.squares.count(0) <= tablebase.max_pieces:
+            probed = tablebase.probe(board)
+            if probed is not None:
+                self.tb_hits += 1
+                return tablebase_score(probed[0], probed[1], ply), None
+        pv_node = beta - alpha > 1
+        if tt is not None:
+            entry = tt.probe(board.hash)
+            if entry is not None:
+                tt_move = entry[4]
+                # Reuse the stored result if it was searched at least as deep (never at the root, which needs a move)
+                if ply > 0 and entry[1] >= depth:
+                    score = _score_from_tt(entry[2], ply)
+                    bound = entry[3]
+                    if bound == EXACT:
+                        return score, tt_move
+                    if bound == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score, tt_move
+
+        in_check = board.in_check(board.side)
+        if in_check and self.use_check_extensions and ply < MAX_PLY:
+            depth += 1  # Check extension: never drop into the quiescence search while in check
+        if depth <= 0 and self.use_quiescence:
+            return self._quiescence(board, ply, alpha, beta), None
+
+        # Null-move pruning: if passing the turn still fails high at reduced depth, a real move will too.
+        # Zugzwang guard: never while in check, and only with a piece besides pawns and the king, since
+        # in pawn endings passing is often the best "move" and the assumption breaks down.
+        if (self.use_null_move and allow_null and not pv_node and ply > 0 and depth >= NULL_MOVE_MIN_DEPTH
+                and not in_check and abs(beta) < MATE_BOUND and board.has_non_pawn_material(board.side)):
+            static = self.evaluate(board) if board.side == WHITE else -self.evaluate(board)
+            if static >= beta:
+                reduction = NULL_MOVE_REDUCTION + (depth >= NULL_MOVE_DEEP_DEPTH)
+                board.make_null_move()
+                score = -self._negamax(board, depth - 1 - reduction, ply + 1, -beta, -beta + 1, False)[0]
+                board.unmake_null_move()
+                if score >= beta:
+                    return beta if score > MATE_BOUND else score, None
+
+        moves = board.legal_moves()
+        if not moves:
+            # Checkmate scores as a loss for the side to move, stalemate as a draw
+            return (-MATE_SCORE + ply if in_check else 0), None
+        if depth <= 0:
+            return (self.evaluate(board) if board.side == WHITE else -self.evaluate(board)), None
+
+        # Search the previous iteration's principal move first at the root and the table's best move
+        # first elsewhere, they are the most likely to cause a cutoff
+        first = self.pv[0] if ply == 0 and self.pv else tt_move
+        if self.use_ordering:
+            moves = self.order_moves(board, moves, ply, first)
+        elif first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        alpha_orig = alpha
+        best_score = float('-inf')
+        best_move = None
+        self.expanded += 1
+        squares = board.squares
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        reduce_late = self.use_lmr and depth >= LMR_MIN_DEPTH and not in_check
+        for index, move in enumerate(moves):
+            # Late-move reductions: quiet moves ordered after the captures, killers and first few
+            # history moves are searched shallower, and again at full depth only if they beat alpha
+            reduction = 0
+            if (reduce_late and index >= LMR_MIN_MOVES and not squares[(move >> 6) & 63] and not move >> 12
+                    and move != killers[0] and move != killers[1]):
+                reduction = 1 if index < LMR_DEEP_MOVES or pv_node else 2
+            board.make_move(move)
+            if reduction and board.in_check(board.side):
+                reduction = 0  # Checking moves are searched in full
+            if index == 0 or not self.use_pvs:
+                score = -self._negamax(board, depth - 1 - reduction, ply + 1, -beta, -alpha)[0]
+                if reduction and score > alpha:
+                    score = -self._negamax(board, depth - 1, ply + 1, -beta, -alpha)[0]
+            else:
+                score = -self._negamax(board, depth - 1 - reduction, ply + 1, -alpha - 1, -alpha)[0]
+                if reduction and score > alpha:
+                    score = -self._negamax(board, depth - 1, ply + 1, -alpha - 1, -alpha)[0]
+                if alpha < score < beta:
+                    score = -self._negamax(board, depth - 1, ply + 1, -beta, -alpha)[0]
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    self.cutoffs += 1
+                    if index == 0:
+                        self.first_move_cutoffs += 1
+                    if self.use_ordering:
+                        self._record_cutoff(board, move, depth, ply)
+                    break  # Beta cutoff
+
+        if tt is not None:
+            if best_score <= alpha_orig:
+                bound = UPPER
+            elif best_score >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            tt.store(board.hash, depth, _score_to_tt(best_score, ply), bound, best_move)
+        return best_score, best_move
+
+    def _quiescence(self, board: Board, ply: int, alpha: float, beta: float) -> float:
+        """Search captures only until the position is quiet, so leaves are never scored mid-exchange.
+
+        Scores are from the side to move's point of view, as in _negamax.
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self._abortable and self.nodes & (CHECK_INTERVAL - 1) == 0 and self._out_of_budget():
+            raise SearchAborted()
+
+        if ply >= MAX_PLY:
+            return self.evaluate(board) if board.side == WHITE else -self.evaluate(board)
+
+        if board.in_check(board.side):
+            # No standing pat while in check: every evasion is searched, and having none is mate
+            moves = board.legal_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+            stand_pat = None
+            best = float('-inf')
+        else:
+            # Stand pat: the side to move may decline every capture and keep the static score
+            stand_pat = self.evaluate(board) if board.side == WHITE else -self.evaluate(board)
+            if stand_pat >= beta:
+                return stand_pat
+            # Big delta: not even winning a queen would reach alpha
+            if stand_pat + QUEEN_GAIN <= alpha:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = board.legal_captures()
+            if not moves:
+                return stand_pat
+            best = stand_pat
+
+        squares = board.squares
+        for move in self.order_moves(board, moves, MAX_PLY):
+            if stand_pat is not None:
+                # Delta pruning: even winning the victim outright cannot bring the score up to alpha
+                flag = move >> 12
+                if flag == EN_PASSANT_FLAG:
+                    gain = MATERIAL_VALUES[PAWN] + DELTA_MARGIN
+                else:
+                    gain = MATERIAL_VALUES[squares[(move >> 6) & 63] & TYPE_MASK] + DELTA_MARGIN
+                    if flag == QUEEN:
+                        gain += PROMOTION_GAIN
+                if stand_pat + gain <= alpha:
+                    continue
+                if self.use_see and board.static_exchange(move) < 0:
+                    continue  # Losing captures are not worth resolving
+            board.make_move(move)
+            score = -self._quiescence(board, ply + 1, -beta, -alpha)
+            board.unmake_move()
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from board import move_name
+from chess_game import AI_SEARCH_DEPTH, ENGINES, ChessGame
+from search import MAX_PLY, Search
+
+DEFAULT_PORT = 5555
+MOVES_TO_GO = 30           # Moves a clock is assumed to last for when no movestogo is given
+MOVE_OVERHEAD = 0.05       # Seconds kept back from every clocked move for messaging
+
+HELP = ("commands: new | fen <FEN> | move <e2e4|Nf3> | go [depth N] [movetime MS] [nodes N] [wtime MS] [btime MS] "
+        "[winc MS] [binc MS] [movestogo N] | stop | board | stats | quit")
+
+# Per-process state of the search workers: the stop flags shared with the server and a reusable search
+_stop_flags = None
+_worker_search = None
+
+
+def _init_worker(stop_flags):
+    """Keep the shared stop flags and create the worker's long-lived search."""
+    global _stop_flags, _worker_search
+    _stop_flags = stop_flags
+    _worker_search = Search()
+
+
+def _search_job(board_class, packed: bytes, slot: int, depth: int, time_limit: Optional[float],
+                node_limit: Optional[int]):
+    """Worker task: search a packed position, aborting once the server raises the job's stop flag."""
+    board = board_class.unpack(packed)
+    search = _worker_search
+    search.stop_requested = lambda: _stop_flags[slot]
+    start = time.perf_counter()
+    score, move = search.search(board, depth, time_limit, node_limit)
+    return score, move, search.nodes, search.depth_reached, search.aborted, time.perf_counter() - start
+
+
+def time_budget(side: str, options: dict) -> Optional[float]:
+    """Seconds to spend on a move from go options: movetime, or a share of the side's clock plus increment."""
+    if 'movetime' in options:
+        return options['movetime'] / 1000
+    clock = options.get('wtime' if side == 'white' else 'btime')
+    if clock is None:
+        return None
+    increment = options.get('winc' if side == 'white' else 'binc', 0)
+    moves_to_go = max(options.get('movestogo', MOVES_TO_GO), 1)
+    budget = (clock / moves_to_go + increment * 0.75) / 1000
+    return max(0.01, min(budget, clock / 1000 / 2) - MOVE_OVERHEAD)
+
+
+class SearchPool:
+    """Bounded pool of search processes shared by all sessions.
+
+    At most one job per worker is handed to the executor at a time; the others wait their turn in the
+    event loop, so the number of waiting jobs is the queue depth. Every running job owns a slot in a
+    shared array whose flag cancels it.
+    """
+
+    def __init__(self, workers: int):
+        """Start the worker processes."""
+        self.workers = workers
+        self.stop_flags = multiprocessing.Array('b', workers, lock=False)
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(self.stop_flags,))
+        self.free_slots = list(range(workers))
+        self.slot_ready = asyncio.Condition()
+        self.waiting = 0   # Jobs queued for a free worker
+
+    def close(self):
+        """Shut the worker processes down."""
+        self.executor.shutdown(cancel_futures=True)
+
+    async def run(self, job: 'SearchJob', board_class, packed: bytes, depth: int, time_limit: Optional[float],
+                  node_limit: Optional[int]):
+        """Wait for a free worker, then run the search; returns the worker's result tuple."""
+        self.waiting += 1
+        job.queue_depth = self.waiting
+        try:
+            async with self.slot_ready:
+                await self.slot_ready.wait_for(lambda: self.free_slots)
+                slot = self.free_slots.pop()
+        finally:
+            self.waiting -= 1
+        job.started = time.perf_counter()
+        job.slot = slot
+        self.stop_flags[slot] = 1 if job.stopped else 0
+        # A job stopped while it waited still searches the first iteration, so there is a move to report
+        if time_limit is not None:
+            time_limit = max(0.0, time_limit - (job.started - job.queued))
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _search_job, board_class, packed, slot, depth,
+                                              time_limit, node_limit)
+        finally:
+            job.slot = None
+            async with self.slot_ready:
+                self.free_slots.append(slot)
+                self.slot_ready.notify()
+
+    def stop(self, job: 'SearchJob'):
+        """Ask a running or queued job to finish as soon as possible."""
+        job.stopped = True
+        if job.slot is not None:
+            self.stop_flags[job.slot] = 1
+
+
+class SearchJob:
+    """Book-keeping of one search request of a session."""
+
+    __slots__ = ('queued', 'started', 'slot', 'stopped', 'queue_depth', 'task')
+
+    def __init__(self):
+        self.queued = time.perf_counter()  # When the session asked for the search
+        self.started = None                # When a worker picked it up
+        self.slot = None                   # Stop-flag slot while running
+        self.stopped = False               # Whether stop was requested
+        self.queue_depth = 0               # Jobs waiting for a worker when this one was queued
+        self.task = None                   # asyncio task awaiting the result
+
+
+class Session:
+    """One client connection hosting its own ChessGame.
+
+    The game only tracks the position and validates moves; searches run in the shared SearchPool, so
+    the game never creates a search (or its transposition table) of its own.
+    """
+
+    def __init__(self, pool: SearchPool, engine: str, default_depth: int, reader, writer):
+        self.pool = pool
+        self.engine = engine
+        self.default_depth = default_depth
+        self.reader = reader
+        self.writer = writer
+        self.game = ChessGame(engine=engine)
+        self.job = None        # Search in progress, if any
+        self.metrics = {'searches': 0, 'stopped': 0, 'queue_depth': 0, 'max_queue_depth': 0,
+                        'queue_wait_ms': 0.0, 'search_ms': 0.0, 'latency_ms': 0.0,
+                        'max_latency_ms': 0.0, 'total_latency_ms': 0.0, 'nodes': 0}
+
+    def send(self, line: str):
+        """Write one response line to the client."""
+        self.writer.write((line + '\n').encode())
+
+    async def serve(self):
+        """Read and handle commands until the client quits or disconnects."""
+        self.send(f"ready {HELP}")
+        try:
+            while True:
+                data = await self.reader.readline()
+                if not data:
+                    break
+                words = data.decode(errors='replace').split()
+                if not words:
+                    continue
+                if words[0] == 'quit':
+                    break
+                self.handle(words[0], words[1:])
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if self.job is not None:
+                self.pool.stop(self.job)
+            self.game.close()
+            self.writer.close()
+
+    def handle(self, command: str, args: List[str]):
+        """Dispatch a command; searches run as background tasks so stop can be read meanwhile."""
+        if command == 'stop':
+            if self.job is not None:
+                self.pool.stop(self.job)
+            return
+        if command == 'stats':
+            self.send('stats ' + json.dumps(self.stats()))
+            return
+        if command == 'board':
+            self.send(f"board {self.game.position.to_fen()}")
+            return
+        if self.job is not None:
+            self.send("error busy: a search is running (send stop)")
+            return
+        if command == 'new':
+            self.game.close()
+            self.game = ChessGame(engine=self.engine)
+            self.send('ok')
+        elif command == 'fen' and args:
+            try:
+                game = ChessGame(engine=self.engine, fen=' '.join(args))
+            except ValueError as error:
+                self.send(f"error {error}")
+                return
+            self.game.close()
+            self.game = game
+            self.send('ok')
+        elif command == 'move' and len(args) == 1:
+            self.play(args[0])
+        elif command == 'go':
+            try:
+                options = self.parse_go(args)
+            except ValueError as error:
+                self.send(f"error {error}")
+                return
+            self.job = SearchJob()
+            self.job.task = asyncio.ensure_future(self.go(self.job, options))
+        else:
+            self.send(f"error unknown command; {HELP}")
+
+    def play(self, text: str):
+        """Play a move in coordinate notation (e.g. 'e2e4', 'e7e8q') or SAN (e.g. 'Nf3') if it is legal."""
+        move = self.game.parse_move(text)
+        if move is None:
+            self.send(f"error invalid move {text!r}")
+            return
+        from_pos, to_pos = move
+        piece = self.game.board[from_pos[0]][from_pos[1]]
+        if (not piece or piece.color != self.game.current_player
+                or to_pos not in self.game.calculate_valid_moves(from_pos)):
+            self.send(f"error illegal move {text!r}")
+            return
+        self.game.make_move(from_pos, to_pos, self.game.promotion_choice(text))
+        status = self.game.draw_reason or ('checkmate' if self.game.is_checkmate else
+                                           'stalemate' if self.game.is_stalemate else None)
+        self.send(f"ok {status}" if status else 'ok')
+
+    @staticmethod
+    def parse_go(args: List[str]) -> dict:
+        """Parse go options given as name/value pairs."""
+        names = ('depth', 'movetime', 'nodes', 'wtime', 'btime', 'winc', 'binc', 'movestogo')
+        if len(args) % 2:
+            raise ValueError("go options come in name/value pairs")
+        options = {}
+        for name, value in zip(args[::2], args[1::2]):
+            if name not in names:
+                raise ValueError(f"unknown go option {name!r}")
+            options[name] = int(value)
+        return options
+
+    async def go(self, job: SearchJob, options: dict):
+        """Search the session's position on the pool and report the best move."""
+        time_limit = time_budget(self.game.current_player, options)
+        # With a clock and no depth the search deepens until the time is up
+        depth = options.get('depth', self.default_depth if time_limit is None else MAX_PLY)
+        position = self.game.position
+        try:
+            score, move, nodes, depth_reached, _, elapsed = await self.pool.run(
+                job, type(position), position.pack(), depth, time_limit, options.get('nodes'))
+        except Exception as error:
+            self.send(f"error search failed: {error}")
+        else:
+            finished = time.perf_counter()
+            self.record(job, nodes, elapsed, finished)
+            best = move_name(move) if move is not None else '(none)'
+            self.send(f"bestmove {best} score {score} depth {depth_reached} nodes {nodes} "
+                      f"time {elapsed * 1000:.0f} latency {(finished - job.queued) * 1000:.0f}"
+                      + (" stopped" if job.stopped else ""))
+        finally:
+            self.job = None
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    def record(self, job: SearchJob, nodes: int, elapsed: float, finished: float):
+        """Update the session's metrics with a finished search."""
+        metrics = self.metrics
+        latency = (finished - job.queued) * 1000
+        metrics['searches'] += 1
+        metrics['stopped'] += job.stopped
+        metrics['queue_depth'] = job.queue_depth
+        metrics['max_queue_depth'] = max(metrics['max_queue_depth'], job.queue_depth)
+        metrics['queue_wait_ms'] = round((job.started - job.queued) * 1000, 1)
+        metrics['search_ms'] = round(elapsed * 1000, 1)
+        metrics['latency_ms'] = round(latency, 1)
+        metrics['max_latency_ms'] = round(max(metrics['max_latency_ms'], latency), 1)
+        metrics['total_latency_ms'] += latency
+        metrics['nodes'] += nodes
+
+    def stats(self) -> dict:
+        """Return the session's metrics together with the pool's current queue depth."""
+        stats = dict(self.metrics)
+        total = stats.pop('total_latency_ms')
+        stats['mean_latency_ms'] = round(total / stats['searches'], 1) if stats['searches'] else 0.0
+        stats['searching'] = self.job is not None
+        stats['pool_queue_depth'] = self.pool.waiting
+        stats['pool_workers'] = self.pool.workers
+        return stats
+
+
+async def serve(host: str, port: int, workers: int, engine: str, depth: int):
+    """Accept sessions until interrupted."""
+    pool = SearchPool(workers)
+
+    async def on_connect(reader, writer):
+        await Session(pool, engine, depth, reader, writer).serve()
+
+    server = await asyncio.start_server(on_connect, host, port)
+    print(f"Serving on {host}:{port} with {workers} search workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main():
+    """Command-line entry point for the game server."""
+    parser = argparse.ArgumentParser(description="Host many games over a line-based TCP protocol.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="search processes")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='mailbox', help="board implementation")
+    parser.add_argument('--depth', type=int, default=AI_SEARCH_DEPTH, help="depth of go without a clock")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.engine, args.depth))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bitboard import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, SQUARE_BITS, bishop_attacks, rook_attacks
+from board import (NUM_SQUARES, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, TYPE_MASK, COLOR_MASK,
+                   MATERIAL_VALUES, PROMOTION_TYPES, Board, move_name)
+
+# File layout: header (magic, material name, entry count), then one byte per index of the material's layout.
+# A byte is 0 for a draw, 1-127 for a win in 2v-1 plies, 128-254 for a loss in 2(v-128) plies (0 is
+# checkmated) and 255 for an index that is not a legal position; wins and losses are for the side to move.
+HEADER = struct.Struct('>4s12sI')
+MAGIC = b'CTB1'
+EXTENSION = '.tb'
+LOSS_BASE = 128
+ILLEGAL = 255
+MAX_DTM = 253            # Longest distance to mate in plies the byte encoding holds
+MAX_PIECES = 4           # Largest material sets the generator builds (kings included)
+
+PIECE_LETTERS = {KING: 'K', QUEEN: 'Q', ROOK: 'R', BISHOP: 'B', KNIGHT: 'N', PAWN: 'P'}
+LETTER_TYPES = {letter: kind for kind, letter in PIECE_LETTERS.items()}
+NAME_ORDER = (QUEEN, ROOK, BISHOP, KNIGHT, PAWN)  # Order of the pieces after the king in a material name
+TRIVIAL_DRAWS = ('KvK', 'KBvK', 'KNvK')            # Materials that cannot mate; they need no table
+
+# Sets built by 'generate' when none are named: every 3-man ending and the common 4-man ones. Sets with
+# pawns on both sides are not supported: a double push there can allow an en-passant capture, which the
+# positions of a table (and so their results) do not account for.
+DEFAULT_SETS = ('KQvK', 'KRvK', 'KPvK', 'KQvKR', 'KQvKB', 'KQvKN', 'KQvKP', 'KRvKB', 'KRvKN', 'KRvKP', 'KBNvK')
+
+
+def _side_letters(kinds: List[int]) -> str:
+    """Letters of one side's pieces, king first, e.g. 'KRP'."""
+    return 'K' + ''.join(PIECE_LETTERS[kind] for kind in sorted(kinds, key=NAME_ORDER.index))
+
+
+def _strength(letters: str) -> Tuple[int, int, str]:
+    """Sort key of a side's material: the stronger side is White in a table's material name."""
+    return len(letters), sum(MATERIAL_VALUES[LETTER_TYPES[letter]] for letter in letters), letters
+
+
+def material_name(codes: List[int]) -> Tuple[str, bool]:
+    """Return the material name of a set of piece codes (e.g. 'KQvKR') and whether its colours are swapped.
+
+    The stronger side comes first, so a position with the colours swapped relative to the name is
+    looked up mirrored (see Tablebase.lookup).
+    """
+    sides = {WHITE: [], BLACK: []}
+    for code in codes:
+        if code & TYPE_MASK != KING:
+            sides[code & COLOR_MASK].append(code & TYPE_MASK)
+    white, black = _side_letters(sides[WHITE]), _side_letters(sides[BLACK])
+    if _strength(black) > _strength(white):
+        return f"{black}v{white}", True
+    return f"{white}v{black}", False
+
+
+def pawns_on_both_sides(codes: List[int]) -> bool:
+    """Whether both colours have a pawn; en passant is then possible, which tables do not model."""
+    return {code for code in codes if code & TYPE_MASK == PAWN} == {PAWN | WHITE, PAWN | BLACK}
+
+
+def _encode(dtm: int) -> int:
+    """Entry byte of a position won (odd dtm) or lost (even dtm) in dtm plies."""
+    return (dtm + 1) // 2 if dtm & 1 else LOSS_BASE + dtm // 2
+
+
+def _decode(value: int) -> Optional[Tuple[int, int]]:
+    """(wdl, dtm) of an entry byte: wdl is 1, 0 or -1 for the side to move; None for an illegal index."""
+    if value == ILLEGAL:
+        return None
+    if value == 0:
+        return 0, 0
+    if value < LOSS_BASE:
+        return 1, 2 * value - 1
+    return -1, 2 * (value - LOSS_BASE)
+
+
+class Layout:
+    """Index of the positions of one material set.
+
+    Pieces are listed kings first (White's, then Black's), then White's and Black's other pieces in
+    name order. Symmetry puts the White king on the a-d files, and for sets without pawns also on the
+    first four ranks, by mirroring the board; neither mirror fixes a square, so every position has
+    exactly one index. Identical pieces are stored in square order. The index is the side to move,
+    then the White king's square among the allowed ones, then one square per other piece (48 for a
+    pawn, which never stands on the first or last rank).
+    """
+
+    def __init__(self, name: str):
+        white, black = name.split('v')
+        self.name = name
+        self.codes = ([KING | WHITE, KING | BLACK] + [LETTER_TYPES[letter] | WHITE for letter in white[1:]] +
+                      [LETTER_TYPES[letter] | BLACK for letter in black[1:]])
+        self.pawns = any(code & TYPE_MASK == PAWN for code in self.codes)
+        # Mirror (XOR mask) that brings each White king square into the allowed area, and the area's squares
+        self.mirror = tuple((7 if sq & 7 >= 4 else 0) | (56 if not self.pawns and sq >> 3 < 4 else 0)
+                            for sq in range(NUM_SQUARES))
+        self.king_squares = tuple(sq for sq in range(NUM_SQUARES) if not self.mirror[sq])
+        self.king_index = {sq: i for i, sq in enumerate(self.king_squares)}
+        self.offsets = [8 if code & TYPE_MASK == PAWN else 0 for code in self.codes]
+        self.radix = [len(self.king_squares)] + [48 if offset else 64 for offset in self.offsets[1:]]
+        self.pair = next((i for i in range(2, len(self.codes) - 1) if self.codes[i] == self.codes[i + 1]), None)
+        self.size = 2
+        for radix in self.radix:
+            self.size *= radix
+
+    def index(self, side: int, squares: List[int]) -> int:
+        """Index of the position with the pieces on the given squares (in layout order); side is 0 or 1."""
+        mask = self.mirror[squares[0]]
+        mapped = [sq ^ mask for sq in squares]
+        pair = self.pair
+        if pair is not None and mapped[pair] > mapped[pair + 1]:
+            mapped[pair], mapped[pair + 1] = mapped[pair + 1], mapped[pair]
+        index = side * self.radix[0] + self.king_index[mapped[0]]
+        for i in range(1, len(mapped)):
+            index = index * self.radix[i] + mapped[i] - self.offsets[i]
+        return index
+
+    def decode(self, index: int) -> Tuple[int, List[int]]:
+        """Side to move (0 or 1) and piece squares of an index."""
+        squares = []
+        for i in range(len(self.codes) - 1, 0, -1):
+            index, square = divmod(index, self.radix[i])
+            squares.append(square + self.offsets[i])
+        index, king = divmod(index, self.radix[0])
+        squares.append(self.king_squares[king])
+        squares.reverse()
+        return index, squares
+
+    def arrange(self, codes: List[int], squares: List[int]) -> List[int]:
+        """Squares of the given pieces in layout order (the pieces must be this layout's)."""
+        slots = sorted(range(len(codes)), key=lambda i: self.codes.index(codes[i]))
+        return [squares[i] for i in slots]
+
+
+def _attacks(code: int, sq: int, occupied: int) -> int:
+    """Squares attacked by the piece with the given code on sq."""
+    kind = code & TYPE_MASK
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if kind == KING:
+        return KING_ATTACKS[sq]
+    if kind == PAWN:
+        return PAWN_ATTACKS[code & COLOR_MASK][sq]
+    if kind == ROOK:
+        return rook_attacks(sq, occupied)
+    if kind == BISHOP:
+        return bishop_attacks(sq, occupied)
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+def _attacked(target: int, color: int, codes: List[int], squares: List[int], occupied: int, skip: int = -1) -> bool:
+    """Whether a piece of the given colour other than the one at index skip attacks target."""
+    bit = SQUARE_BITS[target]
+    for i, code in enumerate(codes):
+        if i != skip and code & COLOR_MASK == color and _attacks(code, squares[i], occupied) & bit:
+            return True
+    return False
+
+
+def _occupancy(codes: List[int], squares: List[int], color: int) -> Tuple[int, int]:
+    """Bitboards of all pieces and of the given colour's pieces."""
+    occupied = own = 0
+    for code, sq in zip(codes, squares):
+        occupied |= SQUARE_BITS[sq]
+        if code & COLOR_MASK == color:
+            own |= SQUARE_BITS[sq]
+    return occupied, own
+
+
+def _moves(codes: List[int], squares: List[int], color: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (piece index, target, captured piece index or -1, promotion type or 0) for every legal move.
+
+    Positions in a table have no castling rights or en-passant square, so neither kind of move occurs;
+    with pawns on one side only (see generate) no move of the set can create an en-passant capture.
+    """
+    occupied, own = _occupancy(codes, squares, color)
+    enemy = color ^ COLOR_MASK
+    king = 0 if color == WHITE else 1
+    for i, code in enumerate(codes):
+        if code & COLOR_MASK != color:
+            continue
+        from_sq = squares[i]
+        kind = code & TYPE_MASK
+        if kind == PAWN:
+            step = -8 if color == WHITE else 8
+            targets = PAWN_ATTACKS[color][from_sq] & occupied & ~own
+            if not occupied & SQUARE_BITS[from_sq + step]:
+                targets |= SQUARE_BITS[from_sq + step]
+                if from_sq >> 3 == (6 if color == WHITE else 1) and not occupied & SQUARE_BITS[from_sq + 2 * step]:
+                    targets |= SQUARE_BITS[from_sq + 2 * step]
+        else:
+            targets = _attacks(code, from_sq, occupied) & ~own
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            to_sq = bit.bit_length() - 1
+            captured = squares.index(to_sq) if occupied & bit else -1
+            after = list(squares)
+            after[i] = to_sq
+            if _attacked(after[king], enemy, codes, after, (occupied & ~SQUARE_BITS[from_sq]) | bit, captured):
+                continue
+            if kind == PAWN and to_sq >> 3 in (0, 7):
+                for promotion in PROMOTION_TYPES:
+                    yield i, to_sq, captured, promotion
+            else:
+                yield i, to_sq, captured, 0
+
+
+def _unmoves(codes: List[int], squares: List[int], color: int) -> Iterator[Tuple[int, int]]:
+    """Yield (piece index, origin) for every non-capturing move of the colour that could have led here."""
+    occupied, _ = _occupancy(codes, squares, color)
+    for i, code in enumerate(codes):
+        if code & COLOR_MASK != color:
+            continue
+        sq = squares[i]
+        if code & TYPE_MASK == PAWN:
+            step = 8 if color == WHITE else -8
+            origin = sq + step
+            if 1 <= origin >> 3 <= 6 and not occupied & SQUARE_BITS[origin]:
+                yield i, origin
+                if sq >> 3 == (4 if color == WHITE else 3) and not occupied & SQUARE_BITS[origin + step]:
+                    yield i, origin + step
+            continue
+        origins = _attacks(code, sq, occupied) & ~occupied
+        while origins:
+            bit = origins & -origins
+            origins ^= bit
+            yield i, bit.bit_length() - 1
+
+
+def dependencies(name: str) -> List[str]:
+    """Materials reached from a set by a capture or a promotion, whose tables its generation reads."""
+    layout = Layout(name)
+    found = []
+    for i in range(2, len(layout.codes)):
+        codes = layout.codes[:i] + layout.codes[i + 1:]
+        found.append(material_name(codes)[0])
+        if layout.codes[i] & TYPE_MASK == PAWN:
+            for promotion in PROMOTION_TYPES:
+                codes = list(layout.codes)
+                codes[i] = promotion | (codes[i] & COLOR_MASK)
+                found.append(material_name(codes)[0])
+    return [dependency for dependency in dict.fromkeys(found) if dependency not in TRIVIAL_DRAWS]
+
+
+def generate(name: str, tablebase: 'Tablebase') -> bytearray:
+    """Solve a material set by retrograde analysis and return its entries.
+
+    Every position is first scored by its moves out of the set (captures and promotions, looked up in
+    the tablebase's smaller tables) and its moves inside the set are counted. Positions are then
+    settled in order of distance to mate: mates at 0 plies, and from each settled position the
+    positions one move earlier, found by taking moves back. A position with a move to one lost at n
+    plies is won at n + 1; one whose moves all lead to won positions is lost once the last of them is
+    settled. Whatever is never settled is a draw.
+    Raises ValueError for a set with pawns on both sides, whose results would ignore en passant.
+    """
+    layout = Layout(name)
+    if pawns_on_both_sides(layout.codes):
+        raise ValueError(f"{name} has pawns on both sides; en passant is not modelled in tables")
+    codes, size = layout.codes, layout.size
+    values = bytearray(size)      # Entry bytes; 0 while unsettled
+    counts = bytearray(size)      # Moves inside the set not yet known to lose
+    exit_win = bytearray(size)    # Fastest win by leaving the set, in plies (0 if none)
+    exit_loss = bytearray(size)   # Longest loss by leaving the set, or ILLEGAL if leaving draws
+    buckets = [[] for _ in range(MAX_DTM + 2)]  # Positions to settle at each distance to mate
+    for index in range(size):
+        side, squares = layout.decode(index)
+        color = side << 3
+        enemy = color ^ COLOR_MASK
+        occupied, _ = _occupancy(codes, squares, color)
+        if (bin(occupied).count('1') < len(codes) or KING_ATTACKS[squares[0]] & SQUARE_BITS[squares[1]]
+                or (layout.pair is not None and squares[layout.pair] > squares[layout.pair + 1])
+                or _attacked(squares[1 - side], color, codes, squares, occupied)):
+            values[index] = ILLEGAL
+            continue
+        inside, win, loss, draw = 0, 0, 0, False
+        for piece, to_sq, captured, promotion in _moves(codes, squares, color):
+            if captured < 0 and not promotion:
+                inside += 1
+                continue
+            child_codes, child_squares = list(codes), list(squares)
+            child_squares[piece] = to_sq
+            if promotion:
+                child_codes[piece] = promotion | color
+            if captured >= 0:
+                del child_codes[captured], child_squares[captured]
+            result = tablebase.lookup(child_codes, child_squares, enemy)
+            if result is None:
+                raise ValueError(f"{name} needs the {material_name(child_codes)[0]} table")
+            wdl, dtm = result
+            if wdl < 0:
+                win = min(win or MAX_DTM, dtm + 1)
+            elif wdl > 0:
+                loss = max(loss, dtm + 1)
+            else:
+                draw = True
+        counts[index] = inside
+        exit_win[index] = win
+        exit_loss[index] = ILLEGAL if draw else loss
+        if win:
+            buckets[win].append(index)
+        elif not inside and not draw:
+            if loss:
+                buckets[loss].append(index)
+            elif _attacked(squares[side], enemy, codes, squares, occupied):
+                buckets[0].append(index)  # Checkmate; stalemate stays a draw
+
+    for dtm, bucket in enumerate(buckets):
+        won = dtm & 1
+        for index in bucket:
+            if values[index]:
+                continue
+            values[index] = _encode(dtm)
+            side, squares = layout.decode(index)
+            mover = side ^ 1
+            for piece, origin in _unmoves(codes, squares, mover << 3):
+                before = list(squares)
+                before[piece] = origin
+                previous = layout.index(mover, before)
+                if values[previous]:
+                    continue
+                if not won:
+                    buckets[dtm + 1].append(previous)
+                    continue
+                counts[previous] -= 1
+                if not counts[previous] and not exit_win[previous] and exit_loss[previous] != ILLEGAL:
+                    buckets[max(dtm + 1, exit_loss[previous])].append(previous)
+        buckets[dtm] = None
+    return values
+
+
+def write_table(path: str, name: str, values: bytearray):
+    """Write a table file."""
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, name.encode(), len(values)))
+        out.write(values)
+
+
+class Tablebase:
+    """Read-only endgame tablebase: a directory of table files, one per material set, probed through mmap.
+
+    lookup() and probe() give the exact result of a position with the distance to mate; positions
+    whose material has no table, or with castling rights or an en-passant square, are not covered.
+    """
+
+    def __init__(self, directory: str):
+        """Map every table file in the directory (which may not exist yet)."""
+        self.directory = directory
+        self.tables = {}   # Material name -> (Layout, mapped entries)
+        self.files = []
+        self.max_pieces = 0  # Most pieces (kings included) of any table, checked before every probe
+        if os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(EXTENSION):
+                    self.add(os.path.join(directory, filename))
+
+    def add(self, path: str):
+        """Map one table file."""
+        file = open(path, 'rb')
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, name, count = HEADER.unpack_from(data)
+            name = name.rstrip(b'\0').decode()
+            if magic != MAGIC or count != Layout(name).size or len(data) != HEADER.size + count:
+                raise ValueError(f"Corrupt tablebase file {path!r}")
+        except (struct.error, UnicodeDecodeError, ValueError, KeyError):
+            data.close()
+            file.close()
+            raise ValueError(f"Corrupt tablebase file {path!r}")
+        layout = Layout(name)
+        if pawns_on_both_sides(layout.codes):
+            data.close()
+            file.close()
+            raise ValueError(f"Unsupported tablebase file {path!r}: {name} has pawns on both sides (en passant)")
+        self.files.append((file, data))
+        self.tables[name] = (layout, memoryview(data)[HEADER.size:])
+        self.max_pieces = max(self.max_pieces, len(layout.codes))
+
+    def close(self):
+        """Unmap and close the table files."""
+        for _, view in self.tables.values():
+            view.release()
+        self.tables = {}
+        self.max_pieces = 0
+        for file, data in self.files:
+            data.close()
+            file.close()
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tables or name in TRIVIAL_DRAWS
+
+    def lookup(self, codes: List[int], squares: List[int], side: int) -> Optional[Tuple[int, int]]:
+        """(wdl, dtm) for the side to move of the position with the given pieces, or None without a table."""
+        name, swapped = material_name(codes)
+        if name in TRIVIAL_DRAWS:
+            return 0, 0
+        table = self.tables.get(name)
+        if table is None:
+            return None
+        layout, entries = table
+        if swapped:
+            codes = [code ^ COLOR_MASK for code in codes]
+            squares = [sq ^ 56 for sq in squares]
+            side ^= COLOR_MASK
+        return _decode(entries[layout.index(side >> 3, layout.arrange(codes, squares))])
+
+    def probe(self, board: Board) -> Optional[Tuple[int, int]]:
+        """(wdl, dtm) for the side to move, or None if the position is not covered."""
+        if board.castling or board.ep_square >= 0 or NUM_SQUARES - board.squares.count(0) > self.max_pieces:
+            return None
+        codes, squares = [], []
+        for sq, code in enumerate(board.squares):
+            if code:
+                codes.append(code)
+                squares.append(sq)
+        return self.lookup(codes, squares, board.side)
+
+    def best_move(self, board: Board) -> Optional[Tuple[int, int, int]]:
+        """Return (move, wdl, dtm) of the move that wins fastest, holds the draw or loses slowest.
+
+        None if the position or any of its successors is not covered, or there are no legal moves.
+        """
+        if self.probe(board) is None:
+            return None
+        best, best_rank = None, None
+        for move in board.legal_moves():
+            board.make_move(move)
+            result = self.probe(board)
+            board.unmake_move()
+            if result is None:
+                return None
+            wdl, dtm = -result[0], result[1] + 1
+            rank = (wdl, -dtm if wdl > 0 else dtm if wdl < 0 else 0)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = (move, wdl, dtm), rank
+        return best
+
+
+def generate_all(names: List[str], directory: str, log=sys.stderr) -> Dict[str, float]:
+    """Generate the named tables and the smaller ones they depend on into the directory.
+
+    Tables already in the directory are kept. Returns the seconds spent per generated table.
+    """
+    os.makedirs(directory, exist_ok=True)
+    timings = {}
+    with Tablebase(directory) as tablebase:
+        def build(name: str):
+            if name in tablebase:
+                return
+            for dependency in dependencies(name):
+                build(dependency)
+            start = time.perf_counter()
+            values = generate(name, tablebase)
+            path = os.path.join(directory, name + EXTENSION)
+            write_table(path, name, values)
+            tablebase.add(path)
+            timings[name] = time.perf_counter() - start
+            longest = max((_decode(value)[1] for value in values if value != ILLEGAL), default=0)
+            print(f"{name:<7} {len(values):>10} positions, longest mate {longest:>3} plies "
+                  f"{timings[name]:>8.1f}s", file=log)
+
+        for name in names:
+            build(name)
+    return timings
+
+
+def main():
+    """Command-line entry point: generate tables, or probe a position."""
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases of up to four pieces.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('generate', help="solve material sets by retrograde analysis")
+    build.add_argument('materials', nargs='*', help=f"material sets such as KRvK or KQvKR (default: "
+                                                     f"{' '.join(DEFAULT_SETS)})")
+    build.add_argument('-d', '--directory', default='tablebases', help="directory of the table files")
+    probe = commands.add_parser('probe', help="show the result of a position and of each of its moves")
+    probe.add_argument('--fen', required=True, help="position to look up")
+    probe.add_argument('-d', '--directory', default='tablebases', help="directory of the table files")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        names = []
+        for material in args.materials or DEFAULT_SETS:
+            sides = material.upper().split('V')
+            try:
+                layout = Layout('v'.join(sides)) if len(sides) == 2 and all(
+                    side[:1] == 'K' and 'K' not in side[1:] for side in sides) else None
+            except KeyError:
+                layout = None
+            if layout is None or not 3 <= len(layout.codes) <= MAX_PIECES:
+                parser.error(f"invalid material {material!r}; expected e.g. KRvK or KQvKR (up to {MAX_PIECES} pieces)")
+            if pawns_on_both_sides(layout.codes):
+                parser.error(f"{material}: sets with pawns on both sides are not supported (en passant)")
+            names.append(material_name(layout.codes)[0])
+        generate_all(names, args.directory)
+        return
+
+    board = Board.from_fen(args.fen)
+    with Tablebase(args.directory) as tablebase:
+        result = tablebase.probe(board)
+        if result is None:
+            print("position not in the tablebase")
+            return
+        labels = {1: 'win', 0: 'draw', -1: 'loss'}
+        wdl, dtm = result
+        print(f"{labels[wdl]}" + (f" in {dtm} plies" if wdl else ""))
+        for move in board.legal_moves():
+            board.make_move(move)
+            child = tablebase.probe(board)
+            board.unmake_move()
+            if child is not None:
+                print(f"  {move_name(move):<6} {labels[-child[0]]}" + (f" in {child[1] + 1}" if child[0] else ""))
+
+
+if __name__ == "__main__":
+    main()
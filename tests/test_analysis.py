@@ -0,0 +1,47 @@
+import io
+import unittest
+
+from analysis import analyse_stream
+from notation import read_pgn
+
+BAD_THEN_GOOD = """[Event "Bad"]
+[FEN "garbage"]
+[Result "*"]
+
+1. e4 e5 *
+
+[Event "Good"]
+[Result "*"]
+
+1. e4 e5 *
+"""
+
+NO_RESULT_TAG = """[Event "Untagged"]
+
+1. f3 e5 2. g4 Qh4# 0-1
+"""
+
+
+class AnalyseStreamTest(unittest.TestCase):
+    def test_bad_fen_game_is_reported_and_the_stream_continues(self):
+        out = io.StringIO()
+        totals = analyse_stream(io.StringIO(BAD_THEN_GOOD).readlines(), 'pgn', out, workers=1, depth=1)
+        self.assertEqual(totals['records'], 2)
+        self.assertEqual(totals['errors'], 1)
+        games = list(read_pgn(out.getvalue().splitlines(True)))
+        self.assertEqual([tags['Event'] for tags, _ in games], ['Bad', 'Good'])
+        self.assertEqual(games[0][1], [])
+        self.assertEqual(games[1][1], ['e4', 'e5'])
+        self.assertIn('{', out.getvalue().split('[Event "Good"]')[1])
+
+    def test_result_comes_from_the_movetext_without_a_result_tag(self):
+        out = io.StringIO()
+        analyse_stream(io.StringIO(NO_RESULT_TAG).readlines(), 'pgn', out, workers=1, depth=1)
+        (tags, moves), = read_pgn(out.getvalue().splitlines(True))
+        self.assertEqual(tags['Result'], '0-1')
+        self.assertEqual(moves, ['f3', 'e5', 'g4', 'Qh4#'])
+        self.assertTrue(out.getvalue().rstrip().endswith('0-1'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+from batch import play_game
+from book import build_book
+
+OPENING = """[Event "Book"]
+[Result "*"]
+
+1. e4 e5 2. Nf3 Nc6 *
+"""
+DEPTH_ONE = {'white': {'depth': 1}, 'black': {'depth': 1}}
+
+
+class PlayGameTest(unittest.TestCase):
+    def test_book_moves_are_kept_out_of_the_per_move_statistics(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book.bin')
+            build_book(OPENING.splitlines(True), path)
+            record = play_game(1, 0, 'mailbox', DEPTH_ONE, 0, 10, book_path=path)
+        self.assertEqual(record['book_plies'], [0, 1, 2, 3])
+        self.assertEqual(record['book_moves'], 4)
+        self.assertEqual(record['moves'][:4], ['e2e4', 'e7e5', 'g1f3', 'b8c6'])
+        self.assertEqual(len(record['move_times']), len(record['moves']) - 4)
+        self.assertEqual(len(record['move_nodes']), len(record['moves']) - 4)
+        self.assertEqual(sum(record['move_nodes']), sum(record['nodes'].values()))
+        self.assertTrue(all(nodes > 0 for nodes in record['move_nodes']))
+
+
+if __name__ == "__main__":
+    unittest.main()
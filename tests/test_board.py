@@ -0,0 +1,149 @@
+import unittest
+
+from bitboard import BitboardBoard
+from board import FIFTY_MOVE_PLIES, Board, STARTING_FEN, move_name
+
+BOARD_CLASSES = (Board, BitboardBoard)
+
+
+def play(board, *names):
+    for name in names:
+        board.make_move(next(move for move in board.legal_moves() if move_name(move) == name))
+    return board
+
+
+def legal_names(board):
+    return {move_name(move) for move in board.legal_moves()}
+
+
+class FenTest(unittest.TestCase):
+    def test_fen_en_passant_square_matches_a_played_move(self):
+        for board_class in BOARD_CLASSES:
+            played = play(board_class.from_fen(STARTING_FEN), 'e2e4')
+            loaded = board_class.from_fen('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+            self.assertEqual(loaded.hash, played.hash)
+            self.assertEqual(loaded.to_fen(), played.to_fen())
+            self.assertEqual(loaded.ep_square, -1)
+
+    def test_fen_en_passant_square_is_kept_when_a_pawn_can_take(self):
+        played = play(Board.from_fen(STARTING_FEN), 'e2e4', 'a7a6', 'e4e5', 'd7d5')
+        loaded = Board.from_fen(played.to_fen())
+        self.assertEqual(loaded.to_fen().split()[3], 'd6')
+        self.assertEqual(loaded.hash, played.hash)
+
+
+class CastlingTest(unittest.TestCase):
+    def test_castling_both_ways(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+            self.assertLessEqual({'e1g1', 'e1c1'}, legal_names(board))
+            play(board, 'e1g1')
+            self.assertEqual(board.to_fen(), 'r3k2r/8/8/8/8/8/8/R4RK1 b kq - 1 1')
+            play(board, 'e8c8')
+            self.assertEqual(board.to_fen(), '2kr3r/8/8/8/8/8/8/R4RK1 w - - 2 2')
+            board.unmake_move()
+            board.unmake_move()
+            self.assertEqual(board.to_fen(), 'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+
+    def test_no_castling_out_of_through_or_into_check_or_past_pieces(self):
+        for board_class in BOARD_CLASSES:
+            for fen in ('r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1',      # No rights
+                        'r3k2r/8/8/8/4r3/8/8/R3K2R w KQ - 0 1',   # In check
+                        'r3k2r/8/8/8/8/8/8/RN2K1NR w KQ - 0 1'):  # Blocked
+                self.assertFalse({'e1g1', 'e1c1'} & legal_names(board_class.from_fen(fen)), fen)
+            # Crossing an attacked square is illegal, an attacked b1 only matters to the rook
+            names = legal_names(board_class.from_fen('3rkr2/8/8/8/8/8/8/R3K2R w KQ - 0 1'))
+            self.assertFalse({'e1g1', 'e1c1'} & names)
+            names = legal_names(board_class.from_fen('1r2k3/8/8/8/8/8/8/R3K2R w KQ - 0 1'))
+            self.assertLessEqual({'e1g1', 'e1c1'}, names)
+
+    def test_rights_are_lost_when_the_king_or_a_rook_moves_or_is_captured(self):
+        for board_class in BOARD_CLASSES:
+            board = play(board_class.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1'), 'a1a8')
+            self.assertEqual(board.to_fen().split()[2], 'Kk')
+            play(board, 'e8e7', 'h1h2')
+            self.assertEqual(board.to_fen().split()[2], '-')
+
+
+class EnPassantTest(unittest.TestCase):
+    def test_capture_removes_the_passed_pawn_and_unmake_restores_it(self):
+        for board_class in BOARD_CLASSES:
+            fen = '4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2'
+            board = board_class.from_fen(fen)
+            key = board.hash
+            play(board, 'e5d6')
+            self.assertEqual(board.to_fen(), '4k3/8/3P4/8/8/8/8/4K3 b - - 0 2')
+            board.unmake_move()
+            self.assertEqual((board.to_fen(), board.hash), (fen, key))
+
+    def test_capture_is_only_available_straight_after_the_double_step(self):
+        for board_class in BOARD_CLASSES:
+            board = play(board_class.from_fen('4k3/3p4/8/4P3/8/8/8/4K3 b - - 0 1'), 'd7d5')
+            self.assertIn('e5d6', legal_names(board))
+            play(board, 'e1e2', 'e8e7')
+            self.assertNotIn('e5d6', legal_names(board))
+
+    def test_capture_that_exposes_the_king_along_the_rank_is_illegal(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen('8/8/8/K2pP2r/8/8/8/4k3 w - d6 0 1')
+            self.assertNotIn('e5d6', legal_names(board))
+
+
+class PromotionTest(unittest.TestCase):
+    def test_every_piece_can_be_chosen_with_or_without_a_capture(self):
+        for board_class in BOARD_CLASSES:
+            fen = '3r2k1/4P3/8/8/8/8/8/4K3 w - - 0 1'
+            board = board_class.from_fen(fen)
+            promotions = {name for name in legal_names(board) if name.startswith('e7')}
+            self.assertEqual(promotions, {f'e7{to}{piece}' for to in ('e8', 'd8') for piece in 'qrbn'})
+            play(board, 'e7d8n')
+            self.assertEqual(board.to_fen(), '3N2k1/8/8/8/8/8/8/4K3 b - - 0 1')
+            board.unmake_move()
+            self.assertEqual(board.to_fen(), fen)
+            self.assertEqual(board.evaluate(), board_class.from_fen(fen).evaluate())
+
+
+class DrawRuleTest(unittest.TestCase):
+    def test_fifty_move_rule(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen(f'4k3/8/8/8/8/8/8/R3K3 w - - {FIFTY_MOVE_PLIES - 1} 80')
+            self.assertIsNone(board.draw_reason())
+            play(board, 'a1a2')
+            self.assertEqual(board.draw_reason(), 'fifty-move rule')
+            board.unmake_move()
+            self.assertIsNone(board.draw_reason())
+
+    def test_a_capture_or_pawn_move_resets_the_count(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen(f'4k3/8/8/8/1R6/8/P7/1n2K3 w - - {FIFTY_MOVE_PLIES - 1} 80')
+            play(board, 'b4b5')
+            self.assertEqual(board.draw_reason(), 'fifty-move rule')
+            board.unmake_move()
+            for move in ('a2a3', 'b4b1'):
+                play(board, move)
+                self.assertEqual(board.halfmove, 0)
+                self.assertIsNone(board.draw_reason())
+                board.unmake_move()
+
+    def test_threefold_repetition(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen(STARTING_FEN)
+            shuffle = ('g1f3', 'g8f6', 'f3g1', 'f6g8')
+            play(board, *shuffle)
+            self.assertIsNone(board.draw_reason())
+            play(board, *shuffle[:3])
+            self.assertIsNone(board.draw_reason())
+            play(board, shuffle[3])
+            self.assertEqual(board.draw_reason(), 'threefold repetition')
+
+    def test_repetition_needs_the_same_castling_rights(self):
+        for board_class in BOARD_CLASSES:
+            board = board_class.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+            play(board, 'e1f1', 'e8f8', 'f1e1', 'f8e8', 'e1f1', 'e8f8', 'f1e1', 'f8e8')
+            self.assertIsNone(board.draw_reason())
+            play(board, 'e1f1', 'e8f8', 'f1e1', 'f8e8')
+            self.assertEqual(board.draw_reason(), 'threefold repetition')
+
+
+if __name__ == "__main__":
+    unittest.main()
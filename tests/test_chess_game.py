@@ -0,0 +1,39 @@
+import unittest
+
+from chess_game import ChessGame
+
+
+class ParseMoveTest(unittest.TestCase):
+    def test_san_with_rank_disambiguator(self):
+        game = ChessGame(fen='4k3/8/8/R7/8/8/8/R3K3 w - - 0 1')
+        self.assertEqual(game.parse_move('R1a3'), ([7, 0], [5, 0]))
+        self.assertEqual(game.parse_move('R5a3'), ([3, 0], [5, 0]))
+        self.assertEqual(game.parse_move('a1a3'), ([7, 0], [5, 0]))
+        self.assertIsNone(game.parse_move('R2a3'))
+
+    def test_san_knight_with_rank_disambiguator(self):
+        game = ChessGame(fen='4k3/8/8/6N1/8/8/8/4K1N1 w - - 0 1')
+        self.assertEqual(game.parse_move('N5f3'), ([3, 6], [5, 5]))
+        self.assertEqual(game.parse_move('N1f3'), ([7, 6], [5, 5]))
+
+
+class CloseTest(unittest.TestCase):
+    def test_close_shuts_the_parallel_workers_down(self):
+        with ChessGame(max_depth=2, workers=2) as game:
+            self.assertIsNotNone(game.make_ai_move())
+            executor = game.search.executor
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
+    def test_search_is_only_created_when_needed(self):
+        game = ChessGame()
+        game.make_move(*game.parse_move('e2e4'))
+        self.assertIsNone(game._search)
+        game.make_ai_move()
+        self.assertIsNotNone(game._search)
+        game.close()
+        self.assertIsNone(game._search)
+
+
+if __name__ == "__main__":
+    unittest.main()
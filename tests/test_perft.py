@@ -0,0 +1,30 @@
+import unittest
+
+from chess_game import ENGINES
+from perft import REFERENCE_POSITIONS, divide, perft
+
+MAX_DEPTH = 3  # The deeper reference counts are left to python3 perft.py --suite
+
+
+class PerftTest(unittest.TestCase):
+    def test_reference_positions_on_every_engine(self):
+        for engine, board_class in ENGINES.items():
+            for name, fen, expected in REFERENCE_POSITIONS:
+                for depth, count in sorted(expected.items()):
+                    if depth > MAX_DEPTH:
+                        continue
+                    with self.subTest(engine=engine, position=name, depth=depth):
+                        board = board_class.from_fen(fen)
+                        self.assertEqual(perft(board, depth), count)
+                        self.assertEqual(board.to_fen(), board_class.from_fen(fen).to_fen())
+
+    def test_divide_adds_up_to_perft(self):
+        for engine, board_class in ENGINES.items():
+            _, fen, expected = REFERENCE_POSITIONS[1]
+            split = divide(board_class.from_fen(fen), 2)
+            self.assertEqual(len(split), expected[1])
+            self.assertEqual(sum(split.values()), expected[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
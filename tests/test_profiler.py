@@ -0,0 +1,43 @@
+import inspect
+import unittest
+
+from bitboard import BitboardBoard
+from board import Board
+from chess_game import ChessGame
+from profiler import PROFILE_CATEGORIES, Profiler
+
+WATCHED = [name for names in PROFILE_CATEGORIES.values() for name in names]
+
+
+def class_attributes(board_class):
+    return {name: inspect.getattr_static(board_class, name, None) for name in WATCHED}
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_uninstall_restores_the_class_methods(self):
+        for board_class in (Board, BitboardBoard):
+            before = class_attributes(board_class)
+            own = {name for name in WATCHED if name in board_class.__dict__}
+            profiler = Profiler()
+            profiler.install(board_class)
+            self.assertIsNot(inspect.getattr_static(board_class, 'make_move'), before['make_move'])
+            profiler.install(board_class)  # Installing twice must not wrap the timers themselves
+            profiler.uninstall()
+            self.assertEqual(class_attributes(board_class), before)
+            self.assertEqual({name for name in WATCHED if name in board_class.__dict__}, own)
+
+    def test_profiled_game_leaves_later_games_untouched(self):
+        before = class_attributes(Board)
+        profiled = ChessGame(max_depth=2, profile=True)
+        stats = profiled.make_ai_move()
+        self.assertGreater(stats.profile['move_generation']['calls'], 0)
+        self.assertEqual(class_attributes(Board), before)
+        calls = dict(profiled.profiler.calls)
+        ChessGame(max_depth=2).make_ai_move()
+        self.assertEqual(profiled.profiler.calls, calls)
+        ChessGame(max_depth=2, profile=True).make_ai_move()
+        self.assertEqual(class_attributes(Board), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+
+from board import Board
+from search import Search
+
+KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+
+class SearchResetTest(unittest.TestCase):
+    def test_reset_search_matches_a_fresh_one(self):
+        fresh = Search()
+        expected = fresh.search(Board.from_fen(KIWIPETE), 3)
+        reused = Search()
+        reused.search(Board.from_fen(KIWIPETE), 4)
+        reused.reset()
+        self.assertEqual(reused.search(Board.from_fen(KIWIPETE), 3), expected)
+        self.assertEqual(reused.nodes, fresh.nodes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import io
+import random
+import tempfile
+import unittest
+
+from board import BLACK, COLOR_MASK, KING, NUM_SQUARES, PAWN, QUEEN, ROOK, WHITE, Board
+from tablebase import ILLEGAL, Tablebase, _decode, generate_all
+
+SETS = {'KQvK': QUEEN | WHITE, 'KRvK': ROOK | WHITE, 'KPvK': PAWN | WHITE}
+
+
+def mirrored(board: Board, mask: int, swap_colors: bool) -> Board:
+    """The board with every square XORed by mask and, if asked, the colours and side to move swapped."""
+    result = Board()
+    for sq, code in enumerate(board.squares):
+        if code:
+            result.squares[sq ^ mask] = code ^ COLOR_MASK if swap_colors else code
+    result.side = board.side ^ COLOR_MASK if swap_colors else board.side
+    result.refresh()
+    return result
+
+
+class TablebaseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        generate_all(list(SETS), cls.directory.name, log=io.StringIO())
+        cls.tablebase = Tablebase(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.directory.cleanup()
+
+    def probe(self, fen: str):
+        return self.tablebase.probe(Board.from_fen(fen))
+
+    def test_longest_mates(self):
+        # The known longest KQ v K and KR v K mates are 10 and 16 moves: 19 and 31 plies for the winner to move
+        for name, plies in (('KQvK', 19), ('KRvK', 31)):
+            _, entries = self.tablebase.tables[name]
+            results = [_decode(value) for value in entries if value != ILLEGAL]
+            self.assertEqual(max(dtm for wdl, dtm in results if wdl > 0), plies, name)
+            self.assertEqual(max(dtm for wdl, dtm in results if wdl < 0), plies + 1, name)
+
+    def test_queen_mate_and_stalemate(self):
+        self.assertEqual(self.probe('7k/8/6K1/8/8/8/8/1Q6 w - - 0 1'), (1, 1))
+        self.assertEqual(self.probe('1Q5k/8/6K1/8/8/8/8/8 b - - 0 1'), (-1, 0))
+        self.assertEqual(self.probe('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'), (0, 0))
+        _, wdl, dtm = self.tablebase.best_move(Board.from_fen('7k/8/6K1/8/8/8/8/1Q6 w - - 0 1'))
+        self.assertEqual((wdl, dtm), (1, 1))
+
+    def test_rook_ending_is_won_unless_the_rook_hangs(self):
+        self.assertEqual(self.probe('8/8/8/3k4/8/8/8/R3K3 w - - 0 1')[0], 1)
+        self.assertEqual(self.probe('8/8/8/8/8/8/1k6/R3K3 w - - 0 1')[0], 1)
+        self.assertEqual(self.probe('8/8/8/8/8/8/1k6/R3K3 b - - 0 1'), (0, 0))
+
+    def test_pawn_ending(self):
+        # King in front of the pawn on the sixth rank: a win whoever moves, except for the stalemate
+        self.assertEqual(self.probe('4k3/8/4K3/4P3/8/8/8/8 w - - 0 1')[0], 1)
+        self.assertEqual(self.probe('4k3/8/4K3/4P3/8/8/8/8 b - - 0 1')[0], -1)
+        self.assertEqual(self.probe('4k3/4P3/4K3/8/8/8/8/8 w - - 0 1')[0], 1)
+        self.assertEqual(self.probe('4k3/4P3/4K3/8/8/8/8/8 b - - 0 1'), (0, 0))
+        # A rook pawn with the defending king in the corner is a draw
+        self.assertEqual(self.probe('k7/8/8/8/8/8/P7/K7 w - - 0 1'), (0, 0))
+        self.assertEqual(self.probe('k7/8/1K6/P7/8/8/8/8 w - - 0 1'), (0, 0))
+
+    def test_mirrored_positions_have_the_same_result(self):
+        # Pawns fix the direction of play, so their boards only mirror ranks together with the colours
+        rng = random.Random(1)
+        for name, code in SETS.items():
+            pawn = code == PAWN | WHITE
+            symmetries = ([(0, False), (7, False), (56, True), (63, True)] if pawn else
+                          [(mask, swap_colors) for mask in (0, 7, 56, 63) for swap_colors in (False, True)])
+            checked = 0
+            while checked < 200:
+                board = Board()
+                board.squares[rng.randrange(8, 56) if pawn else rng.randrange(NUM_SQUARES)] = code
+                for king in (KING | WHITE, KING | BLACK):
+                    board.squares[rng.choice([sq for sq in range(NUM_SQUARES) if not board.squares[sq]])] = king
+                board.side = rng.choice((WHITE, BLACK))
+                board.refresh()
+                result = self.tablebase.probe(board)
+                if result is None:
+                    continue  # Illegal: the kings touch or the side not to move is in check
+                for mask, swap_colors in symmetries:
+                    with self.subTest(name=name, fen=board.to_fen(), mask=mask, swap_colors=swap_colors):
+                        self.assertEqual(self.tablebase.probe(mirrored(board, mask, swap_colors)), result)
+                checked += 1
+
+
+if __name__ == "__main__":
+    unittest.main()